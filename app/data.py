@@ -0,0 +1,398 @@
+"""
+Cached data access for the Streamlit app.
+Every read is memoized with st.cache_data and keyed on the version stamps of the tables it reads
+(feat.feat_table_version, bumped by the jobs when they publish), so widget reruns cost no database
+round trips and a publish only turns over the loaders reading what it changed. App writes clear the
+affected caches.
+Read-only dashboard data (KPIs, triage, calendar) comes from the memory-mapped columnar snapshot
+for the published version when one is on disk, and from SQL otherwise.
+"""
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+import streamlit as st
+import pandas as pd
+
+from models.db import get_connection, database_identity, publish_data_version
+from models import snapshot as snap
+from jobs.publish_dashboard import publish_dashboard
+
+if snap.available():
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+# How long a rerun may trust the last version stamp before re-reading it (seconds)
+VERSION_TTL_S = 30
+# Data-version scopes the app reads; bumps of other scopes (e.g. "raw") don't turn the caches over
+APP_SCOPES = ("core", "feat")
+# Calendar is loaded once for the widest horizon and filtered client-side
+MAX_CALENDAR_DAYS = 90
+
+TRIAGE_COLUMNS = [
+    "Ticker", "Weight", "24h", "7d", "MTD", "QTD", "YTD",
+    "Vol spike", "Drawdown 52w", "What changed", "Next earnings", "Val pct", "RPO", "Est", "vs peers 7d", "Peer z", "Why",
+]
+TOP_MOVER_COLUMNS = ["#", "Ticker", "Score", "Why", "Contribution"]
+CALENDAR_COLUMNS = ["Ticker", "Date", "Time", "Fiscal period", "Expected move", "Notes", "Reported rev", "Guide rev", "Post notes", "Thesis impact"]
+
+@st.cache_resource(show_spinner=False)
+def _shared_connection():
+    """One autocommit connection per app process, shared by all sessions for reads and the odd write."""
+    conn = get_connection()
+    conn.autocommit = True
+    return conn
+
+def _conn():
+    conn = _shared_connection()
+    if conn.closed:
+        _shared_connection.clear()
+        conn = _shared_connection()
+    return conn
+
+def _fetchall(sql: str, params: tuple = ()) -> list:
+    with _conn().cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+def _fetchone(sql: str, params: tuple = ()):
+    with _conn().cursor() as cur:
+        cur.execute(sql, params)
+        return cur.fetchone()
+
+@st.cache_data(ttl=VERSION_TTL_S, show_spinner=False)
+def data_version() -> tuple:
+    """
+    Published stamps: (scope, version) for the app's scopes, (table, version) for every published table,
+    ("unsnapshotted", tables published since the "feat" snapshot) and ("database", identity). Pass the
+    result to the loaders; each keys its cache on stamps() of the tables it reads. The identity turns the
+    caches over when the database is reset and versions start again at 1.
+    """
+    scopes = _fetchall("SELECT scope, version FROM feat.feat_data_version WHERE scope = ANY(%s) ORDER BY scope", (list(APP_SCOPES),))
+    rows = _fetchall("""
+        SELECT t.table_name, t.version, t.published_at > COALESCE(f.published_at, '-infinity')
+        FROM feat.feat_table_version t LEFT JOIN feat.feat_data_version f ON f.scope = 'feat'
+        ORDER BY t.table_name
+    """)
+    unsnapshotted = tuple(t for t, _, after in rows if after)
+    return (*scopes, *((t, v) for t, v, _ in rows), ("unsnapshotted", unsnapshotted), ("database", database_identity(_conn())))
+
+def stamps(version: tuple, *tables) -> tuple:
+    """The part of a data version that loaders reading tables depend on: their stamps and the database identity."""
+    stamps = dict(version)
+    return (("database", stamps.get("database")), *((t, stamps.get(t, 0)) for t in tables))
+
+# Table -> loaders reading it; app/live.py clears them when a publish names the table
+TABLE_LOADERS = {}
+
+def cached_on(*tables):
+    """
+    st.cache_data for a loader of the tables named, keyed on stamps(version, *tables) rather than the whole
+    data version. The loader is written as fn(key, _version, *args) (_version, the full data version, is not
+    hashed) and called as loader(version, *args).
+    """
+    def decorate(fn):
+        cached = st.cache_data(show_spinner=False)(fn)
+
+        @functools.wraps(fn)
+        def loader(version: tuple, *args):
+            return cached(stamps(version, *tables), version, *args)
+        loader.clear = cached.clear
+        for t in tables:
+            TABLE_LOADERS.setdefault(t, []).append(loader)
+        return loader
+    return decorate
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _open_snapshot(feat_version: int, identity: str):
+    """One memory map per snapshot version, shared by every session in the process."""
+    return snap.open_snapshot(feat_version, identity)
+
+def snapshot(version: tuple, *tables):
+    """
+    {name: pyarrow.Table} for the published "feat" version, or None to read from SQL: also when one of
+    tables has been published since (e.g. an earnings edit the next feature publish will snapshot).
+    """
+    stamps = dict(version)
+    feat_version, identity = stamps.get("feat"), stamps.get("database")
+    if feat_version is None or identity is None or not snap.available():
+        return None
+    if set(tables) & set(stamps.get("unsnapshotted", ())):
+        return None
+    # The directory appears atomically once complete; don't cache a miss while the job is still writing
+    if not os.path.isdir(snap.snapshot_path(feat_version, identity)):
+        return None
+    return _open_snapshot(feat_version, identity)
+
+@cached_on("feat.feat_portfolio")
+def load_kpis(key: tuple, _version: tuple):
+    tables = snapshot(_version, "feat.feat_portfolio")
+    if tables is not None:
+        rows = tables["kpis"].to_pylist()
+        return tuple(rows[0][c] for c in snap.KPI_COLUMNS) if rows else None
+    return _fetchone("""
+        SELECT as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
+               alpha_vs_sp500_24h, alpha_vs_sp500_7d, alpha_vs_sp500_mtd, alpha_vs_sp500_qtd, alpha_vs_sp500_ytd,
+               alpha_vs_nasdaq_24h, alpha_vs_nasdaq_7d, alpha_vs_nasdaq_mtd, alpha_vs_nasdaq_qtd, alpha_vs_nasdaq_ytd,
+               alpha_vs_tbill_24h, alpha_vs_tbill_7d, alpha_vs_tbill_mtd, alpha_vs_tbill_qtd, alpha_vs_tbill_ytd
+        FROM feat.feat_portfolio ORDER BY as_of_date DESC LIMIT 1
+    """)
+
+@cached_on("feat.feat_triage")
+def latest_feat_date(key: tuple, _version: tuple):
+    tables = snapshot(_version, "feat.feat_triage")
+    if tables is not None:
+        return pc.max(tables["triage"]["as_of_date"]).as_py() if tables["triage"].num_rows else None
+    return _fetchone("SELECT MAX(as_of_date) FROM feat.feat_triage")[0]
+
+@cached_on("feat.feat_top_movers")
+def load_top_movers(key: tuple, _version: tuple) -> pd.DataFrame:
+    """Precomputed top-K by what-changed score (feat.feat_top_movers), highest first."""
+    tables = snapshot(_version, "feat.feat_top_movers")
+    if tables is not None:
+        df = tables["top_movers"].to_pandas()
+    else:
+        df = pd.DataFrame(_fetchall(f"""
+            SELECT {', '.join(snap.TOP_MOVER_COLUMNS)} FROM feat.feat_top_movers
+            WHERE as_of_date = (SELECT MAX(as_of_date) FROM feat.feat_top_movers) ORDER BY rank
+        """))
+    if df.empty:
+        return pd.DataFrame(columns=TOP_MOVER_COLUMNS)
+    df.columns = TOP_MOVER_COLUMNS
+    return df
+
+ATTRIBUTION_GROUP_COLUMNS = ["Group", "Weight", "Return", "Bench weight", "Bench return", "Contribution", "Alpha contribution",
+                             "Allocation", "Selection", "Interaction"]
+ATTRIBUTION_POSITION_COLUMNS = ["Ticker", "Weight", "Return", "Contribution", "Alpha contribution"]
+
+@cached_on("feat.feat_attribution_groups", "feat.feat_attribution_positions", "core.core_security_master")
+def load_attribution(key: tuple, _version: tuple, period: str, grouping: str) -> tuple:
+    """Latest attribution for a period: (groups frame, positions frame by |contribution|, highest first)."""
+    groups = pd.DataFrame(_fetchall("""
+        SELECT group_name, port_weight, port_return, bench_weight, bench_return, contribution, alpha_contribution,
+               allocation, selection, interaction
+        FROM feat.feat_attribution_groups
+        WHERE as_of_date = (SELECT MAX(as_of_date) FROM feat.feat_attribution_groups) AND period = %s AND grouping = %s
+        ORDER BY ABS(allocation + selection + interaction) DESC
+    """, (period, grouping)), columns=ATTRIBUTION_GROUP_COLUMNS)
+    positions = pd.DataFrame(_fetchall("""
+        SELECT s.ticker, a.weight, a.return, a.contribution, a.alpha_contribution
+        FROM feat.feat_attribution_positions a JOIN core.core_security_master s ON s.id = a.security_id
+        WHERE a.as_of_date = (SELECT MAX(as_of_date) FROM feat.feat_attribution_positions) AND a.period = %s
+        ORDER BY ABS(COALESCE(a.contribution, 0)) DESC
+    """, (period,)), columns=ATTRIBUTION_POSITION_COLUMNS)
+    return groups, positions
+
+# Monitor sort orders: SQL sort key over feat.feat_triage (each backed by an expression index)
+TRIAGE_SORTS = {
+    "what_changed": "COALESCE(what_changed_score, 0)",
+    "dislocation": "COALESCE(ABS(drawdown_52w), 0)",
+    "vol_spike": "COALESCE(vol_spike_ratio, -1)",
+    "peer_outliers": "COALESCE(ABS(peer_z_7d), 0)",
+}
+
+def triage_query(sort: str, earnings_14d: bool, big_weights_only: bool, limit: int, after: tuple = None) -> tuple:
+    """
+    Compile the monitor filters into parameterized SQL over feat.feat_triage, highest sort key first.
+    after is the (sort_key, security_id) of the last row already shown (keyset pagination).
+    Returns (sql, params).
+    """
+    key = TRIAGE_SORTS[sort]
+    where, params = [], []
+    if earnings_14d:
+        where.append("EXISTS (SELECT 1 FROM UNNEST(earnings_dates) d WHERE d BETWEEN CURRENT_DATE AND CURRENT_DATE + 14)")
+    if big_weights_only:
+        where.append("weight >= 0.05")
+    if after is not None:
+        where.append(f"({key}, security_id) < (%s, %s)")
+        params.extend(after)
+    sql = f"""
+        SELECT ticker, weight, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
+               vol_spike_ratio, drawdown_52w, what_changed_score,
+               (SELECT MIN(d) FROM UNNEST(earnings_dates) d WHERE d >= CURRENT_DATE) AS next_earnings_date, val_pct,
+               has_rpo, has_estimates, peer_rel_7d, peer_z_7d, top_factor, {key} AS sort_key, security_id
+        FROM feat.feat_triage
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY {key} DESC, security_id DESC
+        LIMIT %s
+    """
+    params.append(limit)
+    return sql, tuple(params)
+
+TRIAGE_SELECT = [
+    "ticker", "weight", "return_24h", "return_7d", "return_mtd", "return_qtd", "return_ytd",
+    "vol_spike_ratio", "drawdown_52w", "what_changed_score", "next_earnings_date", "val_pct",
+    "has_rpo", "has_estimates", "peer_rel_7d", "peer_z_7d", "top_factor", "sort_key", "security_id",
+]
+
+def _next_dates(dates, today: date):
+    """First date on or after today in each (ascending) list of a list<date32> column; null if none."""
+    dates = dates.combine_chunks() if isinstance(dates, pa.ChunkedArray) else dates
+    if pa.types.is_null(dates.type):
+        # Snapshot written before earnings_dates had an explicit type, with no upcoming events at all
+        return pa.nulls(len(dates), type=pa.date32())
+    flat = pc.list_flatten(dates).to_numpy(zero_copy_only=False).astype("datetime64[D]")
+    parents = pc.list_parent_indices(dates).to_numpy(zero_copy_only=False)
+    upcoming = flat >= np.datetime64(today, "D")
+    rows, first = np.unique(parents[upcoming], return_index=True)
+    out = np.full(len(dates), np.datetime64("NaT"), dtype="datetime64[D]")
+    out[rows] = flat[upcoming][first]
+    return pa.array(out, type=pa.date32(), mask=np.isnat(out))
+
+def triage_page_from_snapshot(table, sort: str, earnings_14d: bool, big_weights_only: bool, limit: int, after: tuple = None) -> pd.DataFrame:
+    """Same semantics as triage_query(), evaluated with Arrow compute over the mapped snapshot."""
+    columns = TRIAGE_COLUMNS + ["sort_key", "security_id"]
+    if table.num_rows == 0:
+        return pd.DataFrame(columns=columns)
+    if sort == "what_changed":
+        key = pc.fill_null(table["what_changed_score"].cast(pa.float64()), 0.0)
+    elif sort == "dislocation":
+        key = pc.fill_null(pc.abs(table["drawdown_52w"].cast(pa.float64())), 0.0)
+    elif sort == "peer_outliers":
+        key = pc.fill_null(pc.abs(table["peer_z_7d"].cast(pa.float64())), 0.0)
+    else:
+        key = pc.fill_null(table["vol_spike_ratio"].cast(pa.float64()), -1.0)
+    table = table.append_column("sort_key", key).append_column(
+        "next_earnings_date", _next_dates(table["earnings_dates"], date.today()))
+    mask = None
+    def _and(m, cond):
+        return cond if m is None else pc.and_(m, cond)
+    if earnings_14d:
+        today = date.today()
+        ned = table["next_earnings_date"]
+        mask = _and(mask, pc.and_(pc.greater_equal(ned, pa.scalar(today)), pc.less_equal(ned, pa.scalar(today + timedelta(days=14)))))
+    if big_weights_only:
+        mask = _and(mask, pc.greater_equal(table["weight"].cast(pa.float64()), 0.05))
+    if after is not None:
+        k, sid = float(after[0]), int(after[1])
+        sk, ids = table["sort_key"], table["security_id"]
+        mask = _and(mask, pc.or_(pc.less(sk, k), pc.and_(pc.equal(sk, k), pc.less(ids, sid))))
+    if mask is not None:
+        table = table.filter(mask)
+    order = [("sort_key", "descending"), ("security_id", "descending")]
+    top = pc.select_k_unstable(table, k=min(limit, table.num_rows), sort_keys=order)
+    page = table.take(top).sort_by(order).select(TRIAGE_SELECT).to_pandas()
+    page.columns = columns
+    return page
+
+@cached_on("feat.feat_triage")
+def load_triage_page(key: tuple, _version: tuple, sort: str, earnings_14d: bool, big_weights_only: bool, limit: int, after: tuple = None) -> pd.DataFrame:
+    """One page of the monitor; the last two columns (sort_key, security_id) are the cursor for the next page."""
+    tables = snapshot(_version, "feat.feat_triage")
+    if tables is not None:
+        return triage_page_from_snapshot(tables["triage"], sort, earnings_14d, big_weights_only, limit, after)
+    sql, params = triage_query(sort, earnings_14d, big_weights_only, limit, after)
+    return pd.DataFrame(_fetchall(sql, params), columns=TRIAGE_COLUMNS + ["sort_key", "security_id"])
+
+@cached_on("core.core_events_earnings", "core.core_security_master")
+def load_calendar(key: tuple, _version: tuple) -> pd.DataFrame:
+    """Upcoming earnings for the next MAX_CALENDAR_DAYS; narrower horizons filter this frame."""
+    tables = snapshot(_version, "core.core_events_earnings", "core.core_security_master")
+    if tables is not None:
+        cal = tables["calendar"]
+        if cal.num_rows:
+            today = date.today()
+            d = cal["event_date"]
+            cal = cal.filter(pc.and_(pc.greater_equal(d, pa.scalar(today)), pc.less_equal(d, pa.scalar(today + timedelta(days=MAX_CALENDAR_DAYS)))))
+        df = cal.to_pandas()
+        df.columns = CALENDAR_COLUMNS
+        return df
+    rows = _fetchall("""
+        SELECT m.ticker, e.event_date, e.event_time, e.fiscal_period, e.expected_move, e.notes,
+               e.reported_rev, e.guide_rev, e.post_notes, e.thesis_impact
+        FROM core.core_events_earnings e
+        JOIN core.core_security_master m ON m.id = e.security_id
+        WHERE e.event_date >= CURRENT_DATE AND e.event_date <= CURRENT_DATE + %s
+        ORDER BY e.event_date, m.ticker
+    """, (MAX_CALENDAR_DAYS,))
+    return pd.DataFrame(rows, columns=CALENDAR_COLUMNS)
+
+@cached_on("core.core_security_master")
+def load_security_ids(key: tuple, _version: tuple) -> dict:
+    """Ticker -> security_id, ordered by ticker."""
+    return dict(_fetchall("SELECT ticker, id FROM core.core_security_master ORDER BY ticker"))
+
+def load_tickers(version: tuple) -> list:
+    return list(load_security_ids(version))
+
+def security_index(version: tuple) -> tuple:
+    """
+    Session-scoped (ticker -> id, id -> ticker) maps, rebuilt only when the security master is republished.
+    Fragments call this on every rerun, so it must not touch the cache hashing or the database.
+    """
+    key = stamps(version, "core.core_security_master")
+    idx = st.session_state.get("_security_index")
+    if idx is None or idx["key"] != key:
+        by_ticker = load_security_ids(version)
+        idx = {"key": key, "by_ticker": by_ticker, "by_id": {v: k for k, v in by_ticker.items()}}
+        st.session_state["_security_index"] = idx
+    return idx["by_ticker"], idx["by_id"]
+
+@cached_on("core.core_events_earnings")
+def load_next_event(key: tuple, _version: tuple, security_id: int):
+    return _fetchone(
+        "SELECT event_date, fiscal_period, expected_move, expected_move_source, notes FROM core.core_events_earnings WHERE security_id = %s AND event_date >= CURRENT_DATE ORDER BY event_date LIMIT 1",
+        (security_id,),
+    )
+
+@cached_on("feat.feat_event_moves")
+def load_event_moves(key: tuple, _version: tuple, security_id: int) -> dict:
+    """Event-study move statistics (fractions) by window: {window: (n_events, avg, p50, p75, p90)}."""
+    rows = _fetchall(
+        "SELECT event_window, n_events, avg_abs_move, p50_abs_move, p75_abs_move, p90_abs_move FROM feat.feat_event_moves WHERE security_id = %s",
+        (security_id,),
+    )
+    return {r[0]: tuple(r[1:]) for r in rows}
+
+@cached_on("core.core_events_earnings")
+def load_recent_events(key: tuple, _version: tuple, security_id: int) -> list:
+    """Last 10 events for a security: (id, event_date, fiscal_period, reported_rev, guide_rev, post_notes, thesis_impact)."""
+    return _fetchall(
+        """
+        SELECT id, event_date, fiscal_period, reported_rev, guide_rev, post_notes, thesis_impact
+        FROM core.core_events_earnings WHERE security_id = %s ORDER BY event_date DESC LIMIT 10
+        """,
+        (security_id,),
+    )
+
+def _clear_event_caches() -> None:
+    for fn in (data_version, *TABLE_LOADERS["core.core_events_earnings"]):
+        fn.clear()
+
+@st.cache_resource(show_spinner=False)
+def _publisher() -> ThreadPoolExecutor:
+    """One background worker per app process for the triage refresh + snapshot after an app write."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard-publish")
+
+def _publish_in_background(tables: list) -> None:
+    """Refresh the triage view and publish on a dedicated connection; sessions pick it up via NOTIFY."""
+    conn = get_connection()
+    try:
+        publish_dashboard(conn, tables=tables)
+    except Exception as e:
+        print(f"Dashboard publish after app write failed: {e}")
+    finally:
+        conn.close()
+
+def save_earnings_event(security_id: int, event_date, event_time, fiscal_period, expected_move, notes) -> None:
+    with _conn().cursor() as cur:
+        cur.execute("""
+            INSERT INTO core.core_events_earnings (security_id, event_date, event_time, fiscal_period, expected_move, expected_move_source, notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (security_id, event_date, event_time, fiscal_period, expected_move, "manual" if expected_move is not None else None, notes))
+    # The event loaders read it from SQL right away; the triage view and snapshot follow from a worker,
+    # so the form submit doesn't hold the shared connection through a view refresh
+    publish_data_version(_conn(), "core", tables=["core.core_events_earnings"])
+    _clear_event_caches()
+    _publisher().submit(_publish_in_background, ["core.core_events_earnings"])
+
+def save_post_earnings(event_id: int, reported_rev, guide_rev, post_notes, thesis_impact) -> None:
+    with _conn().cursor() as cur:
+        cur.execute("""
+            UPDATE core.core_events_earnings SET reported_rev = %s, guide_rev = %s, post_notes = %s, thesis_impact = %s WHERE id = %s
+        """, (reported_rev, guide_rev, post_notes, thesis_impact, event_id))
+    # Nothing the triage view reads: only the event loaders turn over
+    publish_data_version(_conn(), "core", tables=["core.core_events_earnings"])
+    _clear_event_caches()
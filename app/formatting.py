@@ -0,0 +1,89 @@
+"""
+Display formatting for the app's tables. Values stay numeric, so the grid can sort them client-side.
+Percent, multiple and date formats come from st.column_config, not from per-cell string conversion.
+"""
+import pandas as pd
+import streamlit as st
+
+# Stored as fractions (0.0123), shown as percents (1.23%)
+TRIAGE_PERCENT_COLUMNS = ["Weight", "24h", "7d", "MTD", "QTD", "YTD", "Drawdown 52w", "vs peers 7d"]
+TRIAGE_NUMERIC_COLUMNS = TRIAGE_PERCENT_COLUMNS + ["Vol spike", "What changed", "Val pct", "Peer z"]
+
+# Scoring factor keys (config/scoring.py) -> the "Why" column
+FACTOR_LABELS = {
+    "move_7d": "7d move", "move_24h": "24h move", "vol_spike": "Vol spike", "drawdown": "Drawdown",
+    "peer_move": "Move vs peers", "revision": "Estimate revision", "earnings_soon": "Earnings soon",
+}
+
+def factor_label(factor) -> str:
+    return FACTOR_LABELS.get(factor, factor) if isinstance(factor, str) else None
+
+# Row height used by st.dataframe; tables taller than MAX_TABLE_HEIGHT scroll (the grid only renders visible rows)
+ROW_HEIGHT = 35
+MAX_TABLE_HEIGHT = 640
+
+def table_height(n_rows: int) -> int:
+    return min(MAX_TABLE_HEIGHT, ROW_HEIGHT * (n_rows + 1) + 3)
+
+def triage_display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Vectorized: NUMERIC/Decimal -> float64, fractions -> percent points, dates -> datetime64, flags -> bool."""
+    out = df.copy()
+    for c in TRIAGE_NUMERIC_COLUMNS:
+        out[c] = pd.to_numeric(out[c], errors="coerce").astype("float64")
+    out[TRIAGE_PERCENT_COLUMNS] = out[TRIAGE_PERCENT_COLUMNS] * 100.0
+    out["Next earnings"] = pd.to_datetime(out["Next earnings"], errors="coerce")
+    out["RPO"] = out["RPO"].fillna(False).astype(bool)
+    out["Est"] = out["Est"].fillna(False).astype(bool)
+    out["Why"] = out["Why"].map(factor_label)
+    return out
+
+def triage_column_config() -> dict:
+    cfg = {c: st.column_config.NumberColumn(c, format="%.2f%%") for c in TRIAGE_PERCENT_COLUMNS}
+    cfg["Vol spike"] = st.column_config.NumberColumn("Vol spike", format="%.2fx")
+    cfg["What changed"] = st.column_config.NumberColumn("What changed", format="%.2f")
+    cfg["Val pct"] = st.column_config.NumberColumn("Val pct", format="%.0f%%")
+    cfg["Why"] = st.column_config.TextColumn("Why", help="Factor contributing most to the what-changed score")
+    cfg["Peer z"] = st.column_config.NumberColumn("Peer z", format="%+.2f", help="7d return z-score within its peer set(s)")
+    cfg["Next earnings"] = st.column_config.DateColumn("Next earnings", format="YYYY-MM-DD")
+    cfg["RPO"] = st.column_config.CheckboxColumn("RPO")
+    cfg["Est"] = st.column_config.CheckboxColumn("Est")
+    return cfg
+
+def top_movers_display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    for c in ("Score", "Contribution"):
+        out[c] = pd.to_numeric(out[c], errors="coerce").astype("float64")
+    out["Why"] = out["Why"].map(factor_label)
+    return out
+
+def top_movers_column_config() -> dict:
+    return {
+        "Score": st.column_config.NumberColumn("Score", format="%.2f"),
+        "Contribution": st.column_config.NumberColumn("Contribution", format="%.2f", help="Weighted z-score of the top factor"),
+    }
+
+def calendar_display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    out["Date"] = pd.to_datetime(out["Date"], errors="coerce")
+    out["Expected move"] = pd.to_numeric(out["Expected move"], errors="coerce").astype("float64")
+    return out
+
+def calendar_column_config() -> dict:
+    return {
+        "Date": st.column_config.DateColumn("Date", format="YYYY-MM-DD"),
+        "Expected move": st.column_config.NumberColumn("Expected move", format="%.2f%%"),
+    }
+
+# Attribution tables (app/data.py load_attribution): every numeric column is a fraction
+def attribution_display_frame(df: pd.DataFrame) -> pd.DataFrame:
+    out = df.copy()
+    for c in out.columns[1:]:
+        out[c] = pd.to_numeric(out[c], errors="coerce").astype("float64") * 100.0
+    return out
+
+def attribution_column_config(df: pd.DataFrame) -> dict:
+    cfg = {c: st.column_config.NumberColumn(c, format="%.2f%%") for c in df.columns[1:]}
+    if "Allocation" in cfg:
+        cfg["Allocation"] = st.column_config.NumberColumn("Allocation", format="%.2f%%", help="Over / underweight in the group vs the equal-weighted universe")
+        cfg["Selection"] = st.column_config.NumberColumn("Selection", format="%.2f%%", help="Picks within the group vs the group's universe return")
+    return cfg
@@ -0,0 +1,71 @@
+"""
+Live refresh: one background thread per app process LISTENs on the data-version channel that
+jobs NOTIFY when they publish (models.db.publish_data_version). A notification clears the version
+stamp and the caches of the loaders reading the changed tables (data.TABLE_LOADERS); the others are
+keyed on the stamps of their own tables, so they keep their entries. Open sessions pick it up through
+a watcher fragment that only checks an in-process counter, so waiting costs the database nothing.
+"""
+import json
+import select
+import threading
+import time
+from contextlib import closing
+
+import streamlit as st
+
+from models.db import get_connection, NOTIFY_CHANNEL
+from app import data
+
+# How often each open session checks the in-process counter (seconds)
+WATCH_INTERVAL_S = 3
+# Reconnect backoff after the listener connection drops (seconds)
+RECONNECT_S = 5
+
+class DataListener:
+    """Background LISTEN loop. seq increments on every relevant notification; last holds its payload."""
+
+    def __init__(self):
+        self.seq = 0
+        self.last = None
+        self._thread = threading.Thread(target=self._run, name="data-version-listener", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                # Closed on the way out, so each reconnect doesn't leave the dropped connection open
+                with closing(get_connection()) as conn:
+                    conn.autocommit = True
+                    with conn.cursor() as cur:
+                        cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    while True:
+                        if select.select([conn], [], [], 60) == ([], [], []):
+                            continue
+                        conn.poll()
+                        while conn.notifies:
+                            self._handle(conn.notifies.pop(0).payload)
+            except Exception:
+                time.sleep(RECONNECT_S)
+
+    def _handle(self, payload: str) -> None:
+        try:
+            msg = json.loads(payload)
+        except ValueError:
+            return
+        if msg.get("scope") not in data.APP_SCOPES:
+            return
+        data.data_version.clear()
+        for table in msg.get("tables") or []:
+            for loader in data.TABLE_LOADERS.get(table, []):
+                loader.clear()
+        self.last = msg
+        self.seq += 1
+
+@st.cache_resource(show_spinner=False)
+def listener() -> DataListener:
+    return DataListener()
+
+def describe(msg: dict) -> str:
+    tables = ", ".join(t.split(".")[-1] for t in msg.get("tables") or []) or msg.get("scope")
+    as_of = f" (as of {msg['as_of_date']})" if msg.get("as_of_date") else ""
+    return f"New data published: {tables}{as_of}."
@@ -13,7 +13,11 @@ sys.path.insert(0, ROOT)
 import streamlit as st
 import pandas as pd
 
-from models.db import get_connection
+from config.event_study import EVENT_WINDOWS, EVENT_BENCHMARK, EXPECTED_MOVE_WINDOW
+from models.db import emit_profile_report
+from app import data
+from app import formatting as fmt
+from app import live
 
 # Page config (match PEG)
 st.set_page_config(
@@ -134,6 +138,32 @@ st.markdown("""
         color: white;
         border-bottom: 3px solid #0a2e4f;
     }
+    /* View switcher (horizontal radio styled as the tab strip) */
+    .st-key-view [role="radiogroup"] {
+        gap: 0;
+        background: linear-gradient(to bottom, #FFFFFF 0%, #F3F4F6 100%);
+        border-bottom: 2px solid #D1D5DB;
+        margin-bottom: 1.5rem;
+    }
+    .st-key-view [role="radiogroup"] label {
+        height: 2.5rem;
+        padding: 0 1.25rem;
+        margin: 0;
+        border-right: 1px solid #E5E7EB;
+    }
+    .st-key-view [role="radiogroup"] label p {
+        font-size: 11px;
+        font-weight: 600;
+        color: #4B5563;
+        text-transform: uppercase;
+        letter-spacing: 0.05em;
+    }
+    .st-key-view [role="radiogroup"] label > div:first-child { display: none; }
+    .st-key-view [role="radiogroup"] label:has(input:checked) {
+        background: linear-gradient(to bottom, #0F4C81 0%, #0d3d6b 100%);
+        border-bottom: 3px solid #0a2e4f;
+    }
+    .st-key-view [role="radiogroup"] label:has(input:checked) p { color: white; }
     .dataframe {
         font-size: 12px !important;
         border: none !important;
@@ -223,208 +253,210 @@ def pct(x):
         return "—"
     return f"{float(x) * 100:.2f}%"
 
-conn = get_connection()
-cur = conn.cursor()
 
-# --- Portfolio KPIs (above tabs) ---
-cur.execute("""
-    SELECT as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
-           alpha_vs_sp500_24h, alpha_vs_sp500_7d, alpha_vs_sp500_mtd, alpha_vs_sp500_qtd, alpha_vs_sp500_ytd,
-           alpha_vs_nasdaq_24h, alpha_vs_nasdaq_7d, alpha_vs_nasdaq_mtd, alpha_vs_nasdaq_qtd, alpha_vs_nasdaq_ytd,
-           alpha_vs_tbill_24h, alpha_vs_tbill_7d, alpha_vs_tbill_mtd, alpha_vs_tbill_qtd, alpha_vs_tbill_ytd
-    FROM feat.feat_portfolio ORDER BY as_of_date DESC LIMIT 1
-""")
-row = cur.fetchone()
-if row:
-    as_of, r24, r7, rm, rq, ry, a_sp24, a_sp7, a_spm, a_spq, a_spy, a_na24, a_na7, a_nam, a_naq, a_nay, a_tb24, a_tb7, a_tbm, a_tbq, a_tby = row
-    st.markdown(f"### Portfolio KPIs (as of {as_of})")
-    c1, c2, c3, c4, c5 = st.columns(5)
-    c1.metric("24h", pct(r24), None)
-    c2.metric("7d", pct(r7), None)
-    c3.metric("MTD", pct(rm), None)
-    c4.metric("QTD", pct(rq), None)
-    c5.metric("YTD", pct(ry), None)
-    st.caption("Alpha vs S&P 500: " + " | ".join([f"24h {pct(a_sp24)}", f"7d {pct(a_sp7)}", f"MTD {pct(a_spm)}", f"QTD {pct(a_spq)}", f"YTD {pct(a_spy)}"]) +
-               "  |  vs Nasdaq: " + " | ".join([f"24h {pct(a_na24)}", f"YTD {pct(a_nay)}"]) +
-               "  |  vs 3M T-bill: YTD " + pct(a_tby))
-else:
-    st.info("No portfolio KPIs yet. Run bootstrap → ingest → feat_returns.")
-
-tab1, tab2 = st.tabs(["Portfolio Monitor (Triage)", "Earnings Control Room"])
+VIEWS = ["Portfolio Monitor (Triage)", "Earnings Control Room"]
 
-# ---------- Tab 1: Portfolio Monitor (Triage) ----------
-with tab1:
-    cur.execute("SELECT MAX(as_of_date) FROM feat.feat_returns")
-    latest_ret = cur.fetchone()[0]
-    if not latest_ret:
-        st.write("Run feat_returns job to populate monitor.")
+# ---------- Portfolio KPIs (above views) ----------
+def render_kpis():
+    row = data.load_kpis(data.data_version())
+    if row:
+        as_of, r24, r7, rm, rq, ry, a_sp24, a_sp7, a_spm, a_spq, a_spy, a_na24, a_na7, a_nam, a_naq, a_nay, a_tb24, a_tb7, a_tbm, a_tbq, a_tby = row
+        st.markdown(f"### Portfolio KPIs (as of {as_of})")
+        c1, c2, c3, c4, c5 = st.columns(5)
+        c1.metric("24h", pct(r24), None)
+        c2.metric("7d", pct(r7), None)
+        c3.metric("MTD", pct(rm), None)
+        c4.metric("QTD", pct(rq), None)
+        c5.metric("YTD", pct(ry), None)
+        st.caption("Alpha vs S&P 500: " + " | ".join([f"24h {pct(a_sp24)}", f"7d {pct(a_sp7)}", f"MTD {pct(a_spm)}", f"QTD {pct(a_spq)}", f"YTD {pct(a_spy)}"]) +
+                   "  |  vs Nasdaq: " + " | ".join([f"24h {pct(a_na24)}", f"YTD {pct(a_nay)}"]) +
+                   "  |  vs 3M T-bill: YTD " + pct(a_tby))
+        attribution_panel()
     else:
-        pos_date_sql = "(SELECT MAX(as_of_date) FROM core.core_positions)"
-        q = f"""
-        SELECT m.ticker, COALESCE(p.weight, 0) AS weight,
-               r.return_24h, r.return_7d, r.return_mtd, r.return_qtd, r.return_ytd,
-               r.vol_spike_ratio, r.drawdown_52w, r.what_changed_score,
-               e.next_earnings_date,
-               COALESCE(v.pct_historical, 0) AS val_pct,
-               (SELECT EXISTS (SELECT 1 FROM feat.feat_rpo fr WHERE fr.security_id = m.id)) AS has_rpo,
-               (SELECT EXISTS (SELECT 1 FROM core.core_estimates ce WHERE ce.security_id = m.id)) AS has_estimates
-        FROM core.core_security_master m
-        LEFT JOIN core.core_positions p ON p.security_id = m.id AND p.as_of_date = {pos_date_sql}
-        LEFT JOIN feat.feat_returns r ON r.security_id = m.id AND r.as_of_date = %s
-        LEFT JOIN (
-            SELECT security_id, MIN(event_date) AS next_earnings_date
-            FROM core.core_events_earnings WHERE event_date >= CURRENT_DATE GROUP BY security_id
-        ) e ON e.security_id = m.id
-        LEFT JOIN (
-            SELECT security_id, pct_historical FROM feat.feat_valuation
-            WHERE as_of_date = (SELECT MAX(as_of_date) FROM feat.feat_valuation)
-        ) v ON v.security_id = m.id
-        """
-        cur.execute(q, (latest_ret,))
-        rows = cur.fetchall()
-        df_raw = pd.DataFrame(rows, columns=[
-            "Ticker", "Weight", "24h", "7d", "MTD", "QTD", "YTD",
-            "Vol spike", "Drawdown 52w", "What changed", "Next earnings", "Val pct", "RPO", "Est"
-        ])
-        df_raw["Weight"] = df_raw["Weight"].fillna(0)
-        df_raw["What changed"] = df_raw["What changed"].fillna(0)
-        df_raw["Vol spike"] = pd.to_numeric(df_raw["Vol spike"], errors="coerce")
-        df_raw["Drawdown 52w"] = pd.to_numeric(df_raw["Drawdown 52w"], errors="coerce")
+        st.info("No portfolio KPIs yet. Run bootstrap → ingest → feat_returns.")
 
-        with st.expander("Filters", expanded=True):
-            earnings_14d = st.checkbox("Earnings in next 14d", value=False)
-            largest_dislocations = st.checkbox("Largest dislocations (by |drawdown|)", value=False)
-            largest_vol_spikes = st.checkbox("Largest vol spikes", value=False)
-            big_weights_only = st.checkbox("Big weights only (≥5%)", value=False)
+@st.fragment
+def attribution_panel():
+    with st.expander("Where it came from", expanded=False):
+        c1, c2 = st.columns(2)
+        period = c1.selectbox("Period", ["24h", "7d", "mtd", "qtd", "ytd"], index=4, format_func=str.upper, key="attr_period")
+        grouping = c2.selectbox("Group by", ["sector", "peer_set"], format_func=lambda g: g.replace("_", " ").title(), key="attr_grouping")
+        groups, positions = data.load_attribution(data.data_version(), period, grouping)
+        if groups.empty and positions.empty:
+            st.caption("No attribution yet. Run feat_attribution.")
+            return
+        st.caption("Allocation + selection + interaction = portfolio vs the equal-weighted universe; alpha contributions add up to alpha vs S&P 500.")
+        st.dataframe(fmt.attribution_display_frame(groups), use_container_width=True, hide_index=True,
+                     column_config=fmt.attribution_column_config(groups), height=fmt.table_height(len(groups)))
+        top = positions.head(20)
+        st.dataframe(fmt.attribution_display_frame(top), use_container_width=True, hide_index=True,
+                     column_config=fmt.attribution_column_config(top), height=fmt.table_height(len(top)))
 
-        out = df_raw.copy()
-        if earnings_14d:
-            today = date.today()
-            out = out[out["Next earnings"].notna() & out["Next earnings"].apply(lambda d: (d - today).days <= 14 and (d - today).days >= 0)]
-        if big_weights_only:
-            out = out[out["Weight"] >= 0.05]
-        if largest_dislocations:
-            out = out.copy()
-            out["_abs_dd"] = out["Drawdown 52w"].abs().fillna(0)
-            out = out.sort_values("_abs_dd", ascending=False).head(50).drop(columns=["_abs_dd"]).reset_index(drop=True)
-        elif largest_vol_spikes:
-            out = out.sort_values("Vol spike", ascending=False, na_position="last").head(50).reset_index(drop=True)
-        else:
-            out = out.sort_values("What changed", ascending=False).reset_index(drop=True)
+# ---------- View 1: Portfolio Monitor (Triage) ----------
+@st.fragment
+def triage_panel():
+    version = data.data_version()
+    if not data.latest_feat_date(version):
+        st.write("Run feat_returns job to populate monitor.")
+        return
+    movers = data.load_top_movers(version)
+    if not movers.empty:
+        st.markdown("#### Biggest movers")
+        st.dataframe(fmt.top_movers_display_frame(movers.head(10)), use_container_width=True, hide_index=True,
+                     column_config=fmt.top_movers_column_config(), height=fmt.table_height(min(len(movers), 10)))
+    with st.expander("Filters", expanded=True):
+        earnings_14d = st.checkbox("Earnings in next 14d", value=False)
+        largest_dislocations = st.checkbox("Largest dislocations (by |drawdown|)", value=False)
+        largest_vol_spikes = st.checkbox("Largest vol spikes", value=False)
+        peer_outliers = st.checkbox("Largest moves vs peers (|z| 7d)", value=False)
+        big_weights_only = st.checkbox("Big weights only (≥5%)", value=False)
+        page_size = st.selectbox("Rows per page", [50, 200, 1000, 5000], index=0)
+
+    sort = ("dislocation" if largest_dislocations else "vol_spike" if largest_vol_spikes
+            else "peer_outliers" if peer_outliers else "what_changed")
+    # Keyset pagination: a stack of cursors, reset whenever the filters change
+    filters = (sort, earnings_14d, big_weights_only, page_size)
+    if st.session_state.get("triage_filters") != filters:
+        st.session_state["triage_filters"] = filters
+        st.session_state["triage_cursors"] = [None]
+    cursors = st.session_state["triage_cursors"]
+    page = data.load_triage_page(version, sort, earnings_14d, big_weights_only, page_size, cursors[-1])
+    nav_prev, nav_info, nav_next = st.columns([1, 4, 1])
+    if nav_prev.button("◀ Prev", disabled=len(cursors) == 1, key="triage_prev"):
+        cursors.pop()
+        st.rerun(scope="fragment")
+    nav_info.caption(f"Page {len(cursors)} — rows {(len(cursors) - 1) * page_size + 1}–{(len(cursors) - 1) * page_size + len(page)}")
+    if nav_next.button("Next ▶", disabled=len(page) < page_size, key="triage_next"):
+        last = page.iloc[-1]
+        cursors.append((last["sort_key"], int(last["security_id"])))
+        st.rerun(scope="fragment")
 
-        # Format for display
-        out = out.copy()
-        out["Weight"] = out["Weight"].apply(lambda x: pct(x))
-        out["RPO"] = out["RPO"].apply(lambda x: "Y" if x else "—")
-        out["Est"] = out["Est"].apply(lambda x: "Y" if x else "—")
-        for c in ["24h", "7d", "MTD", "QTD", "YTD"]:
-            out[c] = out[c].apply(lambda x: pct(x) if x is not None and not (isinstance(x, float) and pd.isna(x)) else "—")
-        out["Vol spike"] = out["Vol spike"].apply(lambda x: f"{float(x):.2f}x" if x is not None and not (isinstance(x, float) and pd.isna(x)) else "—")
-        out["Drawdown 52w"] = out["Drawdown 52w"].apply(lambda x: pct(x) if x is not None and not (isinstance(x, float) and pd.isna(x)) else "—")
-        out["Next earnings"] = out["Next earnings"].astype(str).replace("NaT", "—").replace("nan", "—")
-        out["Val pct"] = out["Val pct"].apply(lambda x: f"{float(x):.0f}%" if x is not None else "—")
-        out["What changed"] = out["What changed"].apply(lambda x: f"{float(x):.2f}" if x is not None and not (isinstance(x, float) and pd.isna(x)) else "—")
-        st.dataframe(out, use_container_width=True, hide_index=True)
+    out = fmt.triage_display_frame(page.drop(columns=["sort_key", "security_id"]))
+    st.dataframe(out, use_container_width=True, hide_index=True,
+                 column_config=fmt.triage_column_config(), height=fmt.table_height(len(out)))
 
-# ---------- Tab 2: Earnings Control Room ----------
-with tab2:
+# ---------- View 2: Earnings Control Room (one fragment per panel) ----------
+@st.fragment
+def calendar_panel():
     horizon = st.radio("Calendar horizon", [30, 60, 90], horizontal=True, format_func=lambda x: f"{x} days")
     end = date.today() + timedelta(days=horizon)
-    cur.execute("""
-        SELECT m.ticker, e.event_date, e.event_time, e.fiscal_period, e.expected_move, e.notes,
-               e.reported_rev, e.guide_rev, e.post_notes, e.thesis_impact
-        FROM core.core_events_earnings e
-        JOIN core.core_security_master m ON m.id = e.security_id
-        WHERE e.event_date >= CURRENT_DATE AND e.event_date <= %s
-        ORDER BY e.event_date, m.ticker
-    """, (end,))
-    cal = cur.fetchall()
-    if cal:
-        cal_df = pd.DataFrame(cal, columns=["Ticker", "Date", "Time", "Fiscal period", "Expected move", "Notes", "Reported rev", "Guide rev", "Post notes", "Thesis impact"])
+    cal_df = data.load_calendar(data.data_version())
+    cal_df = cal_df[cal_df["Date"] <= end]
+    if not cal_df.empty:
         display_cols = ["Ticker", "Date", "Time", "Fiscal period", "Expected move", "Notes"]
         st.markdown(f"#### Earnings calendar (next {horizon} days)")
-        st.dataframe(cal_df[display_cols], use_container_width=True, hide_index=True)
+        st.dataframe(fmt.calendar_display_frame(cal_df[display_cols]), use_container_width=True, hide_index=True,
+                     column_config=fmt.calendar_column_config())
     else:
         st.write("No earnings dates in the next " + str(horizon) + " days. Add events below.")
 
+@st.fragment
+def add_event_panel():
     st.markdown("#### Add / edit earnings event")
-    cur.execute("SELECT ticker FROM core.core_security_master ORDER BY ticker")
-    tickers_list = [r[0] for r in cur.fetchall()]
-    add_ticker = st.selectbox("Ticker", tickers_list, key="add_ticker")
+    by_ticker, _ = data.security_index(data.data_version())
+    add_ticker = st.selectbox("Ticker", list(by_ticker), key="add_ticker")
     add_date = st.date_input("Event date", key="add_date")
     add_time = st.text_input("Time (optional)", placeholder="e.g. 16:00", key="add_time")
     add_fiscal = st.text_input("Fiscal period (optional)", placeholder="e.g. Q3 FY25", key="add_fiscal")
     add_expected_move = st.number_input("Expected move % (manual)", value=None, format="%.2f", placeholder="e.g. 5.0", key="add_em")
     add_notes = st.text_area("Notes (optional)", key="add_notes")
     if st.button("Save earnings event"):
-        cur.execute("SELECT id FROM core.core_security_master WHERE ticker = %s", (add_ticker,))
-        sid = cur.fetchone()
+        sid = by_ticker.get(add_ticker)
         if sid:
             t = None
             if add_time and add_time.strip():
                 try:
-                    from datetime import datetime as dt
-                    t = dt.strptime(add_time.strip(), "%H:%M").time()
+                    t = datetime.strptime(add_time.strip(), "%H:%M").time()
                 except Exception:
                     pass
-            cur.execute("""
-                INSERT INTO core.core_events_earnings (security_id, event_date, event_time, fiscal_period, expected_move, notes)
-                VALUES (%s, %s, %s, %s, %s, %s)
-            """, (sid[0], add_date, t, add_fiscal or None, add_expected_move, add_notes or None))
-            conn.commit()
-            st.success("Saved.")
+            data.save_earnings_event(sid, add_date, t, add_fiscal or None, add_expected_move, add_notes or None)
+            st.session_state["flash"] = "Saved."
+            # The calendar and monitor read the same events: rerun the whole page once
+            st.rerun()
         else:
             st.error("Ticker not found.")
 
+@st.fragment
+def prep_panel():
     st.markdown("#### Prep checklist (auto)")
-    prep_tickers = [""] + tickers_list
-    selected_ticker = st.selectbox("For ticker", prep_tickers, key="prep_ticker")
+    version = data.data_version()
+    by_ticker, _ = data.security_index(version)
+    selected_ticker = st.selectbox("For ticker", [""] + list(by_ticker), key="prep_ticker")
     if selected_ticker:
-        cur.execute("SELECT id FROM core.core_security_master WHERE ticker = %s", (selected_ticker,))
-        sid = cur.fetchone()
+        sid = by_ticker.get(selected_ticker)
         if sid:
-            cur.execute("SELECT event_date, fiscal_period, expected_move, notes FROM core.core_events_earnings WHERE security_id = %s AND event_date >= CURRENT_DATE ORDER BY event_date LIMIT 1", (sid[0],))
-            ev = cur.fetchone()
+            ev = data.load_next_event(version, sid)
             if ev:
-                ed, fp, em, n = ev
+                ed, fp, em, em_source, n = ev
                 em_str = f"{em}%" if em is not None else "—"
+                em_note = "history" if em_source == "event_study" else "manual" if em is not None else "no history"
+                moves = data.load_event_moves(version, sid)
+                hist = moves.get(EXPECTED_MOVE_WINDOW)
+                lo, hi = EVENT_WINDOWS[EXPECTED_MOVE_WINDOW]
+                hist_str = (f"|day {lo:+d}..{hi:+d}| vs {EVENT_BENCHMARK}, last {hist[0]} events: avg {pct(hist[1])} | p50 {pct(hist[2])} | p75 {pct(hist[3])} | p90 {pct(hist[4])}"
+                            if hist else "—")
                 checklist = f"""• Earnings date: {ed} | Period: {fp or '—'}
-• Expected move: {em_str} (manual) — use for sizing / strangles
+• Expected move: {em_str} ({em_note}) — use for sizing / strangles
+• Historical moves: {hist_str}
 • Notes: {n or '—'}
 • Pre: Review thesis, recent guide, consensus rev/EPS
 • Post: Log reported rev, guide, and thesis impact"""
-                st.text_area("Checklist", value=checklist, height=140, disabled=True, key="checklist")
+                st.text_area("Checklist", value=checklist, height=160, disabled=True, key="checklist")
             else:
                 st.write("No upcoming earnings for this ticker.")
 
+@st.fragment
+def post_earnings_panel():
     st.markdown("#### Post-earnings input")
-    post_ticker = st.selectbox("Ticker", tickers_list, key="post_ticker")
-    cur.execute("SELECT id FROM core.core_security_master WHERE ticker = %s", (post_ticker,))
-    post_sid = cur.fetchone()
+    version = data.data_version()
+    by_ticker, _ = data.security_index(version)
+    post_ticker = st.selectbox("Ticker", list(by_ticker), key="post_ticker")
+    post_sid = by_ticker.get(post_ticker)
     if post_sid:
-        cur.execute("SELECT id, event_date, fiscal_period FROM core.core_events_earnings WHERE security_id = %s ORDER BY event_date DESC LIMIT 10", (post_sid[0],))
-        events = cur.fetchall()
+        events = data.load_recent_events(version, post_sid)
         if events:
-            event_options = {f"{r[1]} {r[2] or ''}": r[0] for r in events}
+            event_options = {f"{r[1]} {r[2] or ''}": r for r in events}
             chosen_label = st.selectbox("Event", list(event_options.keys()), key="post_event")
-            eid = event_options[chosen_label]
-            cur.execute("SELECT reported_rev, guide_rev, post_notes, thesis_impact FROM core.core_events_earnings WHERE id = %s", (eid,))
-            existing = cur.fetchone()
-            post_rev = st.number_input("Reported rev (optional)", value=int(existing[0]) if existing and existing[0] is not None else None, format="%d", key="post_rev")
-            post_guide = st.number_input("Guide rev (optional)", value=int(existing[1]) if existing and existing[1] is not None else None, format="%d", key="post_guide")
+            eid, _, _, *existing = event_options[chosen_label]
+            post_rev = st.number_input("Reported rev (optional)", value=int(existing[0]) if existing[0] is not None else None, format="%d", key="post_rev")
+            post_guide = st.number_input("Guide rev (optional)", value=int(existing[1]) if existing[1] is not None else None, format="%d", key="post_guide")
             post_notes = st.text_area("Notes", value=existing[2] or "", key="post_notes")
             thesis_opts = ["", "Bullish", "Neutral", "Bearish", "Mixed"]
-            thesis_idx = thesis_opts.index(existing[3]) if existing and existing[3] in thesis_opts else 0
+            thesis_idx = thesis_opts.index(existing[3]) if existing[3] in thesis_opts else 0
             post_thesis = st.selectbox("Thesis impact", thesis_opts, index=thesis_idx, key="thesis")
             if st.button("Save post-earnings"):
-                cur.execute("""
-                    UPDATE core.core_events_earnings SET reported_rev = %s, guide_rev = %s, post_notes = %s, thesis_impact = %s WHERE id = %s
-                """, (post_rev, post_guide, post_notes or None, post_thesis or None, eid))
-                conn.commit()
+                data.save_post_earnings(eid, post_rev, post_guide, post_notes or None, post_thesis or None)
                 st.success("Saved.")
         else:
             st.write("No earnings events for this ticker.")
 
+# ---------- Live refresh ----------
+@st.fragment(run_every=live.WATCH_INTERVAL_S)
+def live_watcher():
+    """Rerun the page once a job publishes; between notifications this only reads a counter."""
+    listener = live.listener()
+    seen = st.session_state.setdefault("live_seq", listener.seq)
+    if listener.seq != seen:
+        st.session_state["live_seq"] = listener.seq
+        if listener.last:
+            st.session_state["flash"] = live.describe(listener.last)
+        st.rerun()
+
+live_watcher()
+render_kpis()
+
+# Only the selected view is built on each run (st.tabs would execute both)
+view = st.radio("View", VIEWS, horizontal=True, key="view", label_visibility="collapsed")
+if "flash" in st.session_state:
+    st.success(st.session_state.pop("flash"))
+if view == VIEWS[0]:
+    triage_panel()
+else:
+    calendar_panel()
+    add_event_panel()
+    prep_panel()
+    post_earnings_panel()
+
 st.markdown("---")
 st.markdown(
     '<div style="text-align: center; color: #6B7280; padding: 1.5rem 0;">'
@@ -432,4 +464,6 @@ st.markdown(
     '</div>',
     unsafe_allow_html=True
 )
-conn.close()
+
+# Query profile for this app process, written at most every 5 minutes
+emit_profile_report("app", min_interval_s=300)
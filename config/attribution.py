@@ -0,0 +1,10 @@
+# Return attribution (jobs/feat_attribution.py): feat.feat_portfolio return and alpha split by position and by group
+ATTRIBUTION_PERIODS = ["24h", "7d", "mtd", "qtd", "ytd"]
+# Benchmark the per-position / per-group alpha contributions add up to (feat_portfolio.alpha_vs_sp500_*)
+ATTRIBUTION_ALPHA_BENCHMARK = "SPY"
+# Brinson groupings: core_security_master.sector, and core_peer_sets (a name in several sets is split evenly
+# between them; names in none go to ATTRIBUTION_OTHER). The Brinson benchmark is the equal-weighted universe.
+ATTRIBUTION_GROUPINGS = ["sector", "peer_set"]
+ATTRIBUTION_OTHER = "(other)"
+# Weight not in any position (or in positions without a return): a group earning 0
+ATTRIBUTION_CASH = "(cash)"
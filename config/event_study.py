@@ -0,0 +1,12 @@
+# Earnings event study (jobs/feat_event_study.py). Windows are trading-day offsets around day 0, the first
+# session to trade on the news; returns are measured close to close and taken relative to EVENT_BENCHMARK.
+EVENT_WINDOWS = {"day0": (0, 0), "pm1d": (-1, 1)}
+EVENT_BENCHMARK = "SPY"
+# Events with an event_time at or after this are reported after the close: day 0 is the next session
+AFTER_CLOSE_HOUR = 16
+# Most recent past events per security the move statistics use, and the fewest worth reporting
+EVENT_HISTORY = 12
+EVENT_MIN_EVENTS = 4
+# Statistic (feat.feat_event_moves column, fraction) and window pre-filled into core_events_earnings.expected_move
+EXPECTED_MOVE_WINDOW = "pm1d"
+EXPECTED_MOVE_STAT = "avg_abs_move"
@@ -0,0 +1,17 @@
+# Data-quality scan (jobs/dq_scan.py), run after ingestion and before the feature jobs
+# Calendar days of prices rescanned on every run (findings in the window are replaced)
+DQ_LOOKBACK_DAYS = 120
+# Its trading days are the calendar for missing-day checks (falls back to days most names traded)
+DQ_CALENDAR_BENCHMARK = "SPY"
+# This many identical closes in a row (or more) is a stale price
+DQ_STALE_RUN = 5
+# Jump: daily log move vs the universe median beyond both DQ_JUMP_MIN and DQ_JUMP_SIGMAS robust sigmas of the
+# name's own moves. A jump the next day reverses by DQ_SPIKE_REVERSAL or more is a bad print (price_spike).
+DQ_JUMP_MIN = 0.25
+DQ_JUMP_SIGMAS = 8.0
+DQ_SPIKE_REVERSAL = 0.8
+# Balance sheet tie-out: |assets - (liabilities + equity)| above this fraction of assets
+DQ_BALANCE_TOLERANCE = 0.02
+# Findings whose rows are quarantined (left out of feature computation); the rest are reported only.
+# Price checks only: no feature job reads core_fundamentals_quarterly yet, so balance_mismatch is report-only
+DQ_QUARANTINE_CHECKS = ["non_positive_price", "stale_close", "price_spike"]
@@ -0,0 +1,19 @@
+# Raw-table compaction (jobs/compact_raw.py): hot raw tables keep the newest versions per natural key,
+# older ones move to compressed archive files (restore with --restore)
+# Versions kept per natural key (newest asof_loaded_at first)
+RAW_KEEP_VERSIONS = 2
+# Table -> (natural key columns, rows archived per batch). Every batch is its own short transaction.
+RAW_COMPACT_TABLES = {
+    "raw.raw_prices_daily": (["provider", "ticker", "trade_date"], 20_000),
+    "raw.raw_simfin_income_q": (["provider", "ticker", "period"], 5_000),
+    "raw.raw_simfin_balance_q": (["provider", "ticker", "period"], 5_000),
+    "raw.raw_simfin_cashflow_q": (["provider", "ticker", "period"], 5_000),
+    "raw.raw_simfin_shares_q": (["provider", "ticker", "period"], 5_000),
+    "raw.raw_simfin_derived_metrics_q": (["provider", "ticker", "period"], 5_000),
+    "raw.raw_corporate_actions": (["provider", "ticker", "ex_date", "action_type"], 5_000),
+    # Multi-MB JSONB payloads: small batches
+    "raw.raw_sec_companyfacts": (["provider", "cik"], 20),
+    "raw.raw_sec_submissions": (["provider", "cik"], 50),
+}
+# A batch gives up (and is retried on the next run) rather than wait longer than this for a lock
+RAW_LOCK_TIMEOUT = "2s"
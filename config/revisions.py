@@ -0,0 +1,8 @@
+from datetime import timedelta
+
+# Estimate-revision windows (calendar days) computed by jobs/feat_revisions.py, and the estimate columns tracked
+REVISION_WINDOWS = [30, 90]
+REVISION_METRICS = {"revenue": "revenue_est", "eps": "eps_est"}
+# Incremental runs re-read estimates written this long before the last watermark: rows committed late by a
+# transaction that started before the previous run still get picked up
+REVISION_WATERMARK_OVERLAP = timedelta(hours=1)
@@ -0,0 +1,13 @@
+# Portfolio risk (jobs/feat_portfolio_risk.py): VaR / expected shortfall of the latest book in core.core_positions
+# Return history the covariance (Monte Carlo) and the scenarios (historical) come from, in trading days
+RISK_LOOKBACK_DAYS = 252
+# Names with fewer daily returns than this in the lookback are left out of the simulation
+RISK_MIN_HISTORY = 60
+RISK_HORIZONS = [1, 10]
+RISK_CONFIDENCES = [0.95, 0.99]
+# Monte Carlo: scenario count, scenarios per batch (bounds memory at RISK_CHUNK x lookback floats) and RNG seed
+RISK_SCENARIOS = 200_000
+RISK_CHUNK = 20_000
+RISK_SEED = 7
+# Component VaR averages position P&L over scenarios within this quantile distance of the VaR quantile
+RISK_COMPONENT_BAND = 0.0025
@@ -0,0 +1,19 @@
+# "What changed" scoring (jobs/feat_scores.py). Each factor is winsorized and z-scored across the universe,
+# then weighted; a security's score is the sum of its factor contributions.
+# factor -> (input column, transform, weight). transform: "abs" = size of the move counts, "raw" = as is,
+# "proximity" = days until an event -> EARNINGS_HORIZON_DAYS - days, 0 with no event in the horizon.
+SCORING_FACTORS = {
+    "move_7d": ("return_7d", "abs", 1.0),
+    "move_24h": ("return_24h", "abs", 0.5),
+    "vol_spike": ("vol_spike_ratio", "raw", 1.0),
+    "drawdown": ("drawdown_52w", "abs", 1.0),
+    "peer_move": ("peer_z_7d", "abs", 1.0),
+    "revision": ("revision_30d", "abs", 0.5),
+    "earnings_soon": ("days_to_earnings", "proximity", 0.5),
+}
+# Quantiles each factor is clipped to before z-scoring
+WINSOR_LIMITS = (0.01, 0.99)
+# Earnings further out than this don't count towards earnings_soon
+EARNINGS_HORIZON_DAYS = 30
+# Rows kept in feat.feat_top_movers
+TOP_K = 25
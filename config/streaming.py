@@ -0,0 +1,11 @@
+# Streaming intraday mode (jobs/stream_prices.py)
+# Ticks are folded into the in-memory last-price table and flushed as one micro-batch at least this often
+STREAM_FLUSH_MS = 500
+# ... or as soon as this many securities have ticked since the last flush
+STREAM_MAX_BATCH = 5_000
+# Ticks buffered between the source and the consumer (the source waits when it is full)
+STREAM_QUEUE = 100_000
+# Dashboard publishes (triage refresh, data version, snapshot) at most this often while streaming
+STREAM_PUBLISH_S = 15
+# Closes per security kept for the features, as in jobs/feat_returns.py
+STREAM_LOOKBACK = 400
@@ -0,0 +1,174 @@
+"""
+Raw-table compaction: keep the newest RAW_KEEP_VERSIONS versions per natural key in the hot raw tables
+and move older ones to gzip JSON-lines archive files, partitioned by load date, listed in ops.raw_archive
+(config/raw_archive.py). Online: every batch is a short transaction that locks just its rows, writes and
+fsyncs the file, records it and deletes the rows, giving up after RAW_LOCK_TIMEOUT if a lock is held
+(the batch is retried on the next run).
+Restore for audits: --restore TABLE reads the archived rows back (checksums verified) into
+<table>_restored, never into the hot table the core merges read.
+Usage: python jobs/compact_raw.py [--tables a,b] [--keep N] [--dry-run]
+       python jobs/compact_raw.py --restore raw.raw_prices_daily [--from DATE] [--to DATE] [--where ticker=AAPL]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+from datetime import date
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.raw_archive import RAW_KEEP_VERSIONS, RAW_COMPACT_TABLES, RAW_LOCK_TIMEOUT
+from models.db import get_connection, emit_profile_report
+from models.ledger import job_run
+
+ARCHIVE_DIR = os.getenv("RAW_ARCHIVE_DIR", os.path.join(ROOT, "data", "raw_archive"))
+
+def _superseded_ids(cur, table: str, key: list, keep: int) -> list:
+    cur.execute(f"""
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY {', '.join(key)} ORDER BY asof_loaded_at DESC, id DESC) AS n
+            FROM {table}
+        ) v WHERE n > %s ORDER BY id
+    """, (keep,))
+    return [r[0] for r in cur.fetchall()]
+
+def _write_file(rel_path: str, lines: list) -> str:
+    """Write gzip JSON lines atomically and durably. Returns the sha256 of the file."""
+    path = os.path.join(ARCHIVE_DIR, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = gzip.compress(("\n".join(lines) + "\n").encode(), mtime=0)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return hashlib.sha256(data).hexdigest()
+
+def _archive_batch(conn, table: str, ids: list, run_id) -> int:
+    """Archive and delete one batch of rows in one transaction. Returns rows archived."""
+    written = []
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL lock_timeout = %s", (RAW_LOCK_TIMEOUT,))
+            # Row locks only: readers and inserts carry on, and the rows cannot change before the delete
+            cur.execute(f"""
+                SELECT asof_loaded_at::date, id, row_to_json(t)::text FROM {table} t
+                WHERE id = ANY(%s) ORDER BY id FOR UPDATE OF t
+            """, (ids,))
+            by_date = {}
+            for loaded, row_id, line in cur.fetchall():
+                by_date.setdefault(loaded, []).append((row_id, line))
+            manifest = []
+            for loaded, rows in sorted(by_date.items()):
+                lo, hi = rows[0][0], rows[-1][0]
+                rel = f"{table}/loaded={loaded.isoformat()}/{table.split('.')[-1]}_{lo}-{hi}.jsonl.gz"
+                sha = _write_file(rel, [line for _, line in rows])
+                written.append(rel)
+                manifest.append((run_id, table, loaded, rel, len(rows), lo, hi, sha))
+            execute_values(cur, """INSERT INTO ops.raw_archive (run_id, table_name, loaded_date, path, n_rows, min_id, max_id, sha256)
+                VALUES %s""", manifest)
+            cur.execute(f"DELETE FROM {table} WHERE id = ANY(%s)", ([r[0] for rows in by_date.values() for r in rows],))
+            n = cur.rowcount
+        conn.commit()
+        return n
+    except BaseException:
+        conn.rollback()
+        # Not committed: the rows are still hot, so the files must not linger as archived
+        for rel in written:
+            try:
+                os.remove(os.path.join(ARCHIVE_DIR, rel))
+            except OSError:
+                pass
+        raise
+
+def job_compact_raw(tables: list = None, keep: int = RAW_KEEP_VERSIONS, dry_run: bool = False) -> dict:
+    """Returns {table: rows archived} (rows that would be, with dry_run)."""
+    conn = get_connection()
+    archived = {}
+    with job_run("compact_raw") as run:
+        for table in tables or list(RAW_COMPACT_TABLES):
+            key, batch = RAW_COMPACT_TABLES[table]
+            with run.stage(table.split(".")[-1]) as stage:
+                with conn.cursor() as cur:
+                    ids = _superseded_ids(cur, table, key, keep)
+                conn.rollback()
+                stage.add(rows_read=len(ids))
+                if dry_run:
+                    archived[table] = len(ids)
+                    continue
+                n = 0
+                for i in range(0, len(ids), batch):
+                    try:
+                        n += _archive_batch(conn, table, ids[i:i + batch], run.id)
+                    except psycopg2.errors.LockNotAvailable as e:
+                        stage.error(e)
+                        stage.add(rows_skipped=len(ids[i:i + batch]))
+                stage.add(rows_updated=n)
+                archived[table] = n
+    conn.close()
+    verb = "would archive" if dry_run else "archived"
+    print("compact_raw: " + ", ".join(f"{t} {verb} {n}" for t, n in archived.items()))
+    return archived
+
+def restore_raw(table: str, loaded_from: date = None, loaded_to: date = None, where: dict = None, into: str = None) -> int:
+    """
+    Read archived rows of table (loaded between the dates, optionally matching where {column: value})
+    back into `into` (default <table>_restored, created like table). Returns rows restored.
+    """
+    into = into or f"{table}_restored"
+    conn = get_connection()
+    n = 0
+    with job_run("restore_raw") as run:
+        with run.stage("restore") as stage:
+            with conn.cursor() as cur:
+                cur.execute(f"CREATE TABLE IF NOT EXISTS {into} (LIKE {table} INCLUDING DEFAULTS)")
+                cur.execute("""
+                    SELECT path, sha256 FROM ops.raw_archive
+                    WHERE table_name = %s AND loaded_date >= COALESCE(%s, '-infinity'::date) AND loaded_date <= COALESCE(%s, 'infinity'::date)
+                    ORDER BY loaded_date, min_id
+                """, (table, loaded_from, loaded_to))
+                for rel, sha in cur.fetchall():
+                    with open(os.path.join(ARCHIVE_DIR, rel), "rb") as f:
+                        data = f.read()
+                    if hashlib.sha256(data).hexdigest() != sha:
+                        raise ValueError(f"Archive file {rel} does not match its checksum")
+                    rows = [json.loads(line) for line in gzip.decompress(data).decode().splitlines() if line]
+                    if where:
+                        rows = [r for r in rows if all(str(r.get(k)) == str(v) for k, v in where.items())]
+                    stage.add(rows_read=len(rows))
+                    if not rows:
+                        continue
+                    cur.execute(f"""
+                        INSERT INTO {into} SELECT r.* FROM json_populate_recordset(NULL::{table}, %s::json) r
+                        WHERE NOT EXISTS (SELECT 1 FROM {into} x WHERE x.id = r.id)
+                    """, (json.dumps(rows),))
+                    n += cur.rowcount
+            conn.commit()
+            stage.add(rows_inserted=n)
+    conn.close()
+    print(f"restore_raw: {n} rows of {table} restored into {into}")
+    return n
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive superseded raw versions / restore them for audits")
+    parser.add_argument("--tables", help="comma-separated raw tables (default: all in config/raw_archive.py)")
+    parser.add_argument("--keep", type=int, default=RAW_KEEP_VERSIONS, help="versions kept per natural key")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be archived")
+    parser.add_argument("--restore", metavar="TABLE", help="restore archived rows of TABLE into TABLE_restored")
+    parser.add_argument("--from", dest="loaded_from", type=date.fromisoformat, help="restore: first load date")
+    parser.add_argument("--to", dest="loaded_to", type=date.fromisoformat, help="restore: last load date")
+    parser.add_argument("--where", action="append", default=[], metavar="COLUMN=VALUE", help="restore: only matching rows")
+    args = parser.parse_args()
+    if args.restore:
+        restore_raw(args.restore, args.loaded_from, args.loaded_to, dict(w.split("=", 1) for w in args.where))
+        emit_profile_report("restore_raw")
+    else:
+        job_compact_raw(args.tables.split(",") if args.tables else None, keep=args.keep, dry_run=args.dry_run)
+        emit_profile_report("compact_raw")
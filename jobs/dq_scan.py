@@ -0,0 +1,179 @@
+"""
+Data-quality scan, run after ingestion and before the feature jobs. One vectorized pass over the
+recent prices of the whole universe (config/quality.py) and over the quarterly fundamentals:
+    non_positive_price  error  open / high / low / close <= 0
+    missing_day         warn   no price on a trading day between a name's first and last price in the window
+    stale_close         error  DQ_STALE_RUN or more identical closes in a row (the repeats are flagged)
+    price_jump          warn   adjusted daily log move vs the universe median far outside the name's own range
+    price_spike         error  a jump the next day reverses: a bad print
+    balance_mismatch    error  total assets != total liabilities + total equity (reported, not quarantined)
+Writes ops.dq_findings (findings in the scanned window are replaced) and quarantines the rows of the
+DQ_QUARANTINE_CHECKS findings in ops.dq_quarantine, which price readers exclude (models/quality.py):
+the price errors. Warnings are reported only and never remove data.
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.quality import (DQ_LOOKBACK_DAYS, DQ_CALENDAR_BENCHMARK, DQ_STALE_RUN, DQ_JUMP_MIN, DQ_JUMP_SIGMAS,
+                            DQ_SPIKE_REVERSAL, DQ_BALANCE_TOLERANCE, DQ_QUARANTINE_CHECKS)
+from models.db import get_connection, emit_profile_report, publish_data_version
+from models.ledger import job_run
+from models import price_cube
+from models.quality import PRICES_TABLE
+from jobs.feat_returns import _decimal
+
+FUNDAMENTALS_TABLE = "core.core_fundamentals_quarterly"
+FINDING_COLUMNS = ["check_name", "severity", "table_name", "security_id", "ref_date", "value", "detail"]
+# Universes smaller than this are compared with the calendar benchmark instead of their own median
+MIN_UNIVERSE = 5
+
+def _findings(check: str, severity: str, table: str, security_id, ref_date, value, detail) -> pd.DataFrame:
+    return pd.DataFrame({"check_name": check, "severity": severity, "table_name": table, "security_id": security_id,
+                         "ref_date": ref_date, "value": value, "detail": detail}, columns=FINDING_COLUMNS)
+
+def _stacked(mask: pd.DataFrame, values: pd.DataFrame) -> pd.DataFrame:
+    """(trade_date, security_id, value) where a dates x securities mask is true."""
+    hits = mask.stack(future_stack=True)
+    hits = hits[hits]
+    return pd.DataFrame({"trade_date": hits.index.get_level_values(0), "security_id": hits.index.get_level_values(1),
+                         "value": values.stack(future_stack=True).reindex(hits.index).to_numpy()})
+
+def price_checks(prices: pd.DataFrame, calendar: list, bench_returns: pd.Series = None) -> pd.DataFrame:
+    """
+    prices: security_id, trade_date, open, high, low, close, adj_close (adj_close may be null).
+    calendar: the trading days. bench_returns: benchmark daily returns by date, for small universes.
+    """
+    df = prices.sort_values(["security_id", "trade_date"]).reset_index(drop=True)
+    for c in ("open", "high", "low", "close", "adj_close"):
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    out = []
+
+    bad = (df[["open", "high", "low", "close"]] <= 0).any(axis=1)
+    out.append(_findings("non_positive_price", "error", PRICES_TABLE, df["security_id"][bad], df["trade_date"][bad],
+                         df["close"][bad], "price <= 0"))
+
+    # Runs of identical closes: a run starts wherever the close (or the security) changes
+    same = (df["close"] == df["close"].shift()) & (df["security_id"] == df["security_id"].shift())
+    run = same.groupby((~same).cumsum()).transform("size")
+    stale = same & (run >= DQ_STALE_RUN)
+    out.append(_findings("stale_close", "error", PRICES_TABLE, df["security_id"][stale], df["trade_date"][stale],
+                         df["close"][stale], run[stale].astype(str) + " identical closes"))
+
+    # Jumps in log moves (a bad print and its reversal are then the same size) on adjusted closes,
+    # bad prints left out
+    adj = df["adj_close"].fillna(df["close"]).where(~bad)
+    px = df.assign(adj=adj).pivot(index="trade_date", columns="security_id", values="adj").sort_index()
+    ret = px.pct_change(fill_method=None).replace([np.inf, -np.inf], np.nan)
+    if px.shape[1] >= MIN_UNIVERSE or bench_returns is None:
+        market = ret.median(axis=1)
+    else:
+        market = bench_returns.reindex(ret.index).fillna(0.0)
+    excess = np.log1p(ret).sub(np.log1p(market), axis=0)
+    sigma = 1.4826 * excess.sub(excess.median()).abs().median()
+    jump = excess.abs().gt(np.maximum(DQ_JUMP_MIN, DQ_JUMP_SIGMAS * sigma), axis=1)
+    nxt = excess.shift(-1)
+    spike = jump & (nxt * excess < 0) & (nxt.abs() >= DQ_SPIKE_REVERSAL * excess.abs())
+    # The day after a spike is its reversal, not a jump of its own
+    jump = jump & ~spike & ~spike.shift(1, fill_value=False)
+    for check, severity, mask in (("price_spike", "error", spike), ("price_jump", "warn", jump)):
+        hits = _stacked(mask, ret)
+        out.append(_findings(check, severity, PRICES_TABLE, hits["security_id"], hits["trade_date"], hits["value"], "daily return"))
+
+    # Trading days with no price row, between each name's first and last price
+    rows = df.pivot(index="trade_date", columns="security_id", values="close")
+    present = rows.reindex(sorted(set(calendar) | set(rows.index))).notna().reindex(calendar)
+    inside = present.cummax() & present[::-1].cummax()[::-1]
+    hits = _stacked(inside & ~present, present.astype(float) * np.nan)
+    out.append(_findings("missing_day", "warn", PRICES_TABLE, hits["security_id"], hits["trade_date"], None, "no price"))
+    return pd.concat(out, ignore_index=True)
+
+def fundamentals_checks(fund: pd.DataFrame, tolerance: float = DQ_BALANCE_TOLERANCE) -> pd.DataFrame:
+    """fund: security_id, period_end, total_assets, total_liabilities, total_equity."""
+    a, l, e = (pd.to_numeric(fund[c], errors="coerce").astype("float64") for c in ("total_assets", "total_liabilities", "total_equity"))
+    gap = (a - (l + e)) / a.abs().replace(0, np.nan)
+    bad = gap.abs() > tolerance
+    return _findings("balance_mismatch", "error", FUNDAMENTALS_TABLE, fund["security_id"][bad], fund["period_end"][bad],
+                     gap[bad], "assets - (liabilities + equity), fraction of assets")
+
+def job_dq_scan(as_of_date: date = None):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("dq_scan") as run:
+        with run.stage("load") as stage:
+            cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily WHERE trade_date <= %s", (as_of_date or date.today(),))
+            latest = cur.fetchone()[0]
+            if latest is None:
+                print("No prices yet.")
+                conn.close()
+                return
+            window_start = latest - timedelta(days=DQ_LOOKBACK_DAYS)
+            # A month before the window: previous closes for returns and stale runs
+            cur.execute("""
+                SELECT security_id, trade_date, open, high, low, close, adj_close FROM core.core_prices_daily
+                WHERE trade_date >= %s AND trade_date <= %s
+            """, (window_start - timedelta(days=30), latest))
+            prices = pd.DataFrame(cur.fetchall(), columns=["security_id", "trade_date", "open", "high", "low", "close", "adj_close"])
+            cur.execute("""
+                SELECT bp.trade_date, bp.close FROM core.core_benchmark_prices_daily bp
+                JOIN core.core_benchmarks b ON b.id = bp.benchmark_id
+                WHERE b.ticker = %s AND bp.trade_date >= %s AND bp.trade_date <= %s ORDER BY bp.trade_date
+            """, (DQ_CALENDAR_BENCHMARK, window_start - timedelta(days=30), latest))
+            bench = pd.DataFrame(cur.fetchall(), columns=["trade_date", "close"]).set_index("trade_date")["close"].astype("float64")
+            cur.execute("SELECT security_id, period_end, total_assets, total_liabilities, total_equity FROM core.core_fundamentals_quarterly")
+            fund = pd.DataFrame(cur.fetchall(), columns=["security_id", "period_end", "total_assets", "total_liabilities", "total_equity"])
+            stage.add(rows_read=len(prices) + len(bench) + len(fund))
+
+        with run.stage("scan") as stage:
+            if bench.empty:
+                # No benchmark: days on which at least half the names traded
+                counts = prices.groupby("trade_date").size()
+                calendar = sorted(counts.index[counts >= counts.max() / 2])
+            else:
+                calendar = list(bench.index)
+            calendar = [d for d in calendar if d >= window_start]
+            findings = pd.concat([price_checks(prices, calendar, bench.pct_change()), fundamentals_checks(fund)], ignore_index=True)
+            in_window = (findings["table_name"] != PRICES_TABLE) | (findings["ref_date"] >= window_start)
+            findings = findings[in_window].assign(quarantined=lambda f: f["check_name"].isin(DQ_QUARANTINE_CHECKS))
+            stage.add(rows_skipped=int(findings["quarantined"].sum()))
+
+        with run.stage("write") as stage:
+            scope = "(table_name = %s AND ref_date >= %s) OR table_name = %s"
+            params = (PRICES_TABLE, window_start, FUNDAMENTALS_TABLE)
+            cur.execute(f"SELECT table_name, security_id, ref_date FROM ops.dq_quarantine WHERE {scope}", params)
+            before = set(cur.fetchall())
+            cur.execute(f"DELETE FROM ops.dq_findings WHERE {scope}", params)
+            cur.execute(f"DELETE FROM ops.dq_quarantine WHERE {scope}", params)
+            rows = [
+                (run.id, r.check_name, r.severity, r.table_name, int(r.security_id), r.ref_date,
+                 None if r.value is None or pd.isna(r.value) else _decimal(float(r.value)), r.detail, bool(r.quarantined))
+                for r in findings.itertuples(index=False)
+            ]
+            execute_values(cur, """INSERT INTO ops.dq_findings (run_id, check_name, severity, table_name, security_id, ref_date,
+                value, detail, quarantined) VALUES %s""", rows, page_size=5000)
+            quarantine = findings[findings["quarantined"]].drop_duplicates(["table_name", "security_id", "ref_date"])
+            q_rows = [(r.table_name, int(r.security_id), r.ref_date, r.check_name) for r in quarantine.itertuples(index=False)]
+            execute_values(cur, "INSERT INTO ops.dq_quarantine (table_name, security_id, ref_date, check_name) VALUES %s", q_rows, page_size=5000)
+            conn.commit()
+            stage.add(rows_inserted=len(rows) + len(q_rows))
+        # Quarantine changes what the feature jobs read: refresh the price cube and publish so their fingerprints change
+        if {(t, s, d) for t, s, d, _ in q_rows} != before:
+            with run.stage("price_cube") as stage:
+                version = price_cube.append(conn)
+                if version:
+                    stage.watermark("price_cube", version)
+            publish_data_version(conn, "core", tables=["ops.dq_quarantine"])
+    conn.close()
+    summary = findings.groupby("check_name").size()
+    print("dq_scan: " + (", ".join(f"{k} {v}" for k, v in summary.items()) or "no findings") + f"; {len(q_rows)} rows quarantined")
+
+if __name__ == "__main__":
+    job_dq_scan()
+    emit_profile_report("dq_scan")
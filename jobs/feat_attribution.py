@@ -0,0 +1,198 @@
+"""
+Feature job: return attribution. Splits feat.feat_portfolio's return and alpha into per-position
+contributions and into Brinson-Fachler allocation / selection / interaction effects by sector and by
+peer set (config/attribution.py), for every feat_returns date and period at once: the book in force on
+each date is a dates x securities weight matrix, returns a periods x dates x securities cube, and group
+memberships a securities x groups matrix, so every sum is a matrix product.
+The Brinson benchmark is the equal-weighted universe of names with a return that date; weight not
+invested (or in names without a return) is the (cash) group earning 0, so allocation + selection +
+interaction add up to portfolio - benchmark return exactly.
+Writes feat.feat_attribution_positions and feat.feat_attribution_groups from the last attributed date
+on (every date with full=True).
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.attribution import (ATTRIBUTION_PERIODS, ATTRIBUTION_ALPHA_BENCHMARK, ATTRIBUTION_GROUPINGS,
+                                ATTRIBUTION_OTHER, ATTRIBUTION_CASH)
+from models.db import get_connection, emit_profile_report
+from jobs.feat_returns import _decimal
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_attribution_positions", "feat.feat_attribution_groups")
+
+POSITION_COLUMNS = ["weight", "return", "contribution", "alpha_contribution"]
+GROUP_COLUMNS = ["port_weight", "port_return", "bench_weight", "bench_return", "contribution", "alpha_contribution",
+                 "allocation", "selection", "interaction"]
+
+def membership(security_ids: np.ndarray, labels: dict) -> tuple:
+    """
+    labels: security_id -> list of group names. Returns (securities x groups matrix, group names); a name in
+    k groups has 1/k in each, a name in none 1 in ATTRIBUTION_OTHER.
+    """
+    names = sorted({g for gs in labels.values() for g in gs} | {ATTRIBUTION_OTHER})
+    col = {g: j for j, g in enumerate(names)}
+    m = np.zeros((len(security_ids), len(names)))
+    for i, sid in enumerate(security_ids.tolist()):
+        gs = labels.get(sid) or [ATTRIBUTION_OTHER]
+        m[i, [col[g] for g in gs]] = 1.0 / len(gs)
+    return m, names
+
+def _div(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.divide(a, b, out=np.full(np.broadcast(a, b).shape, np.nan), where=b != 0)
+
+def position_attribution(weights: np.ndarray, returns: np.ndarray, bench: np.ndarray) -> dict:
+    """
+    weights: dates x securities (0 = not held); returns: periods x dates x securities (NaN = none);
+    bench: periods x dates alpha-benchmark returns. Returns periods x dates x securities arrays.
+    """
+    return {"weight": np.broadcast_to(weights, returns.shape), "return": returns, "contribution": weights * returns,
+            "alpha_contribution": weights * (returns - bench[..., None])}
+
+def group_attribution(weights: np.ndarray, returns: np.ndarray, bench: np.ndarray, member: np.ndarray) -> dict:
+    """
+    Brinson-Fachler per group (same shapes as position_attribution; member: securities x groups). Returns
+    periods x dates x (groups + 1) arrays, the last group being cash.
+    """
+    valid = ~np.isnan(returns)
+    r = np.where(valid, returns, 0.0)
+    w = weights * valid
+    wg = w @ member
+    cg = (w * r) @ member
+    # Benchmark: every name with a return, equally weighted
+    ug = valid.astype("float64") @ member
+    bw = _div(ug, ug.sum(axis=-1, keepdims=True))
+    bg = _div((valid * r) @ member, ug)
+    btot = np.nansum(bw * bg, axis=-1, keepdims=True)
+    rg = np.where(wg != 0, _div(cg, wg), bg)
+    bg0 = np.nan_to_num(bg)
+    rg0 = np.where(np.isnan(rg), 0.0, rg)
+    # Cash: the rest of the book, earning 0, absent from the benchmark
+    cash = 1.0 - wg.sum(axis=-1, keepdims=True)
+    zero = np.zeros_like(cash)
+    return {
+        "port_weight": np.concatenate([wg, cash], axis=-1),
+        "port_return": np.concatenate([np.where(wg != 0, rg, np.nan), zero], axis=-1),
+        "bench_weight": np.concatenate([bw, zero], axis=-1),
+        "bench_return": np.concatenate([bg, np.full_like(cash, np.nan)], axis=-1),
+        "contribution": np.concatenate([cg, zero], axis=-1),
+        "alpha_contribution": np.concatenate([cg - wg * bench[..., None], -cash * bench[..., None]], axis=-1),
+        "allocation": np.concatenate([(wg - np.nan_to_num(bw)) * (bg0 - btot), -cash * btot], axis=-1),
+        "selection": np.concatenate([np.nan_to_num(bw) * (rg0 - bg0), zero], axis=-1),
+        "interaction": np.concatenate([(wg - np.nan_to_num(bw)) * (rg0 - bg0), zero], axis=-1),
+    }
+
+def _book(positions: pd.DataFrame, dates: np.ndarray, ids: np.ndarray) -> tuple:
+    """Dates x securities weights of the book in force on each date, and which dates have a book."""
+    pos_dates = np.sort(positions["as_of_date"].unique()).astype("datetime64[D]")
+    book = np.zeros((len(pos_dates), len(ids)))
+    book[np.searchsorted(pos_dates, positions["as_of_date"].to_numpy(dtype="datetime64[D]")),
+         np.searchsorted(ids, positions["security_id"].to_numpy(dtype="int64"))] = positions["weight"].to_numpy(dtype="float64")
+    idx = np.searchsorted(pos_dates, dates, side="right") - 1
+    # The latest date is rolled up with the latest book (as feat_returns does), even one dated after it
+    idx[-1] = len(pos_dates) - 1
+    return book[np.maximum(idx, 0)], idx >= 0
+
+def job_feat_attribution(full: bool = False, publish: bool = True):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_attribution") as run:
+        with run.stage("load") as stage:
+            cur.execute("SELECT MAX(as_of_date) FROM feat.feat_attribution_positions")
+            since = None if full else cur.fetchone()[0]
+            cur.execute(
+                "SELECT security_id, as_of_date, " + ", ".join(f"return_{p}" for p in ATTRIBUTION_PERIODS)
+                + " FROM feat.feat_returns WHERE as_of_date >= %s", (since or date.min,),
+            )
+            rets = pd.DataFrame(cur.fetchall(), columns=["security_id", "as_of_date"] + ATTRIBUTION_PERIODS)
+            cur.execute("SELECT security_id, as_of_date, weight FROM core.core_positions")
+            positions = pd.DataFrame(cur.fetchall(), columns=["security_id", "as_of_date", "weight"])
+            cur.execute(
+                "SELECT br.as_of_date, " + ", ".join(f"br.return_{p}" for p in ATTRIBUTION_PERIODS) + """
+                FROM feat.feat_benchmark_returns br JOIN core.core_benchmarks b ON b.id = br.benchmark_id
+                WHERE b.ticker = %s AND br.as_of_date >= %s
+            """, (ATTRIBUTION_ALPHA_BENCHMARK, since or date.min))
+            bench = pd.DataFrame(cur.fetchall(), columns=["as_of_date"] + ATTRIBUTION_PERIODS)
+            cur.execute("SELECT id, sector FROM core.core_security_master WHERE sector IS NOT NULL")
+            sectors = {sid: [s] for sid, s in cur.fetchall()}
+            cur.execute("SELECT UNNEST(security_ids), name FROM core.core_peer_sets")
+            peer_sets = {}
+            for sid, name in cur.fetchall():
+                peer_sets.setdefault(sid, []).append(name)
+            stage.add(rows_read=len(rets) + len(positions) + len(bench))
+            if rets.empty or positions.empty:
+                print("No feat_returns or positions to attribute.")
+                conn.close()
+                return
+
+        with run.stage("attribute") as stage:
+            dates = np.sort(rets["as_of_date"].unique()).astype("datetime64[D]")
+            ids = np.union1d(rets["security_id"].to_numpy(dtype="int64"), positions["security_id"].to_numpy(dtype="int64"))
+            returns = np.full((len(ATTRIBUTION_PERIODS), len(dates), len(ids)), np.nan)
+            ti = np.searchsorted(dates, rets["as_of_date"].to_numpy(dtype="datetime64[D]"))
+            ni = np.searchsorted(ids, rets["security_id"].to_numpy(dtype="int64"))
+            returns[:, ti, ni] = rets[ATTRIBUTION_PERIODS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64").T
+            bench_r = np.full((len(ATTRIBUTION_PERIODS), len(dates)), np.nan)
+            bench = bench[bench["as_of_date"].isin(rets["as_of_date"])]
+            bench_r[:, np.searchsorted(dates, bench["as_of_date"].to_numpy(dtype="datetime64[D]"))] = \
+                bench[ATTRIBUTION_PERIODS].apply(pd.to_numeric, errors="coerce").to_numpy(dtype="float64").T
+            weights, has_book = _book(positions, dates, ids)
+            stage.add(rows_skipped=int((~has_book).sum()))
+
+            pos = position_attribution(weights, returns, bench_r)
+            p, t, n = np.nonzero(np.broadcast_to((weights != 0) & has_book[:, None], returns.shape))
+            vals = [pos[c][p, t, n] for c in POSITION_COLUMNS]
+            day = dates.astype(object)
+            pos_rows = [
+                (day[t[k]], ATTRIBUTION_PERIODS[p[k]], int(ids[n[k]]), *[_decimal(float(v[k])) for v in vals])
+                for k in range(len(p))
+            ]
+            group_rows = []
+            labels = {"sector": sectors, "peer_set": peer_sets}
+            for grouping in ATTRIBUTION_GROUPINGS:
+                member, names = membership(ids, labels[grouping])
+                names = names + [ATTRIBUTION_CASH]
+                grp = group_attribution(weights, returns, bench_r, member)
+                # Groups with neither portfolio nor benchmark weight are left out
+                keep = (np.abs(grp["port_weight"]) > 1e-12) | (np.nan_to_num(grp["bench_weight"]) > 0)
+                gp, gt, gg = np.nonzero(keep & has_book[None, :, None])
+                vals = [grp[c][gp, gt, gg] for c in GROUP_COLUMNS]
+                group_rows += [
+                    (day[gt[k]], ATTRIBUTION_PERIODS[gp[k]], grouping, names[gg[k]], *[_decimal(float(v[k])) for v in vals])
+                    for k in range(len(gp))
+                ]
+
+        with run.stage("write") as stage:
+            # Replace the recomputed dates so positions sold or regrouped since disappear too
+            cur.execute("DELETE FROM feat.feat_attribution_positions WHERE as_of_date >= %s", (since or date.min,))
+            cur.execute("DELETE FROM feat.feat_attribution_groups WHERE as_of_date >= %s", (since or date.min,))
+            execute_values(cur, f"INSERT INTO feat.feat_attribution_positions (as_of_date, period, security_id, {', '.join(POSITION_COLUMNS)}) VALUES %s",
+                           pos_rows, page_size=5000)
+            execute_values(cur, f"INSERT INTO feat.feat_attribution_groups (as_of_date, period, grouping, group_name, {', '.join(GROUP_COLUMNS)}) VALUES %s",
+                           group_rows, page_size=5000)
+            conn.commit()
+            stage.add(rows_inserted=len(pos_rows) + len(group_rows))
+
+        if publish:
+            with run.stage("publish"):
+                publish_dashboard(conn, dates[-1].astype(object), FEAT_TABLES)
+    conn.close()
+    print(f"feat_attribution: {len(dates)} dates, {len(pos_rows)} position rows, {len(group_rows)} group rows")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute feat.feat_attribution_positions / feat_attribution_groups")
+    parser.add_argument("--full", action="store_true", help="recompute every feat_returns date")
+    args = parser.parse_args()
+    job_feat_attribution(full=args.full)
+    emit_profile_report("feat_attribution")
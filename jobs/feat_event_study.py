@@ -0,0 +1,162 @@
+"""
+Feature job: earnings event study. Aligns every past event in core.core_events_earnings with the price
+matrix by binary search on the sorted trading dates (np.searchsorted: day 0 is the first session on or
+after the event date, the next one for after-close reports) and pulls every event's window returns at
+once with fancy indexing, each relative to the benchmark (config/event_study.py).
+Writes feat.feat_event_returns (one row per event and window) and feat.feat_event_moves (average and
+percentile absolute abnormal moves over each security's recent events), then pre-fills expected_move
+on upcoming events that have no manual value.
+"""
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.event_study import (EVENT_WINDOWS, EVENT_BENCHMARK, AFTER_CLOSE_HOUR, EVENT_HISTORY, EVENT_MIN_EVENTS,
+                                EXPECTED_MOVE_WINDOW, EXPECTED_MOVE_STAT)
+from models.db import get_connection, emit_profile_report
+from jobs.feat_returns import _decimal
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run
+from models.quality import price_ok
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_event_returns", "feat.feat_event_moves", "core.core_events_earnings")
+
+MOVE_COLUMNS = ["n_events", "avg_abs_move", "p50_abs_move", "p75_abs_move", "p90_abs_move", "last_event_date"]
+
+def event_returns(events: pd.DataFrame, closes: pd.DataFrame, bench: pd.Series, windows: dict = EVENT_WINDOWS) -> pd.DataFrame:
+    """
+    events: event_id, security_id, event_date, event_time. closes: trading dates x security_id (sorted,
+    gaps carried forward); bench: benchmark closes on the same dates. Returns one row per event and
+    window with day0_date, return, benchmark_return, abnormal_return; events whose window runs off the
+    price history are dropped.
+    """
+    dates = closes.index.to_numpy(dtype="datetime64[D]")
+    ev_dates = events["event_date"].to_numpy(dtype="datetime64[D]")
+    d0 = np.searchsorted(dates, ev_dates, side="left")
+    hours = pd.to_datetime(events["event_time"].astype(str), format="%H:%M:%S", errors="coerce").dt.hour.to_numpy()
+    on_session = dates[np.minimum(d0, len(dates) - 1)] == ev_dates
+    d0 = d0 + (on_session & (hours >= AFTER_CLOSE_HOUR))
+    col = closes.columns.get_indexer(events["security_id"])
+    px, bx = closes.to_numpy(dtype="float64"), bench.to_numpy(dtype="float64")
+    out = []
+    for name, (lo, hi) in windows.items():
+        start, end = d0 + lo - 1, d0 + hi
+        ok = (col >= 0) & (start >= 0) & (end < len(dates))
+        s, e, c = start[ok], end[ok], col[ok]
+        ret = px[e, c] / px[s, c] - 1.0
+        bret = bx[e] / bx[s] - 1.0
+        frame = pd.DataFrame({
+            "event_id": events["event_id"].to_numpy()[ok], "event_window": name,
+            "security_id": events["security_id"].to_numpy()[ok], "event_date": events["event_date"].to_numpy()[ok],
+            "day0_date": dates[d0[ok]], "return": ret, "benchmark_return": bret, "abnormal_return": ret - bret,
+        })
+        out.append(frame[np.isfinite(frame["abnormal_return"])])
+    return pd.concat(out, ignore_index=True) if out else pd.DataFrame()
+
+def event_moves(returns: pd.DataFrame, history: int = EVENT_HISTORY) -> pd.DataFrame:
+    """Per (security_id, event_window): |abnormal_return| statistics over the latest `history` events."""
+    df = returns.sort_values("event_date").groupby(["security_id", "event_window"]).tail(history)
+    df = df.assign(abs_move=df["abnormal_return"].abs())
+    g = df.groupby(["security_id", "event_window"])
+    moves = g["abs_move"].agg(n_events="size", avg_abs_move="mean")
+    q = g["abs_move"].quantile([0.5, 0.75, 0.9]).unstack()
+    moves["p50_abs_move"], moves["p75_abs_move"], moves["p90_abs_move"] = q[0.5], q[0.75], q[0.9]
+    moves["last_event_date"] = g["event_date"].max()
+    return moves.reset_index()
+
+def job_feat_event_study(as_of_date: date = None, publish: bool = True):
+    as_of = as_of_date or date.today()
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_event_study") as run:
+        with run.stage("load") as stage:
+            # Latest EVENT_HISTORY past events per security
+            cur.execute("""
+                SELECT id, security_id, event_date, event_time FROM (
+                    SELECT id, security_id, event_date, event_time,
+                           ROW_NUMBER() OVER (PARTITION BY security_id ORDER BY event_date DESC) AS n
+                    FROM core.core_events_earnings WHERE event_date < %s
+                ) e WHERE n <= %s
+            """, (as_of, EVENT_HISTORY))
+            events = pd.DataFrame(cur.fetchall(), columns=["event_id", "security_id", "event_date", "event_time"])
+            if events.empty:
+                print("No past earnings events.")
+                conn.close()
+                return
+            since = events["event_date"].min() - timedelta(days=14)
+            cur.execute(
+                f"SELECT security_id, trade_date, COALESCE(adj_close, close) FROM core.core_prices_daily WHERE security_id = ANY(%s) AND trade_date >= %s AND trade_date <= %s AND {price_ok()}",
+                (events["security_id"].unique().tolist(), since, as_of),
+            )
+            prices = pd.DataFrame(cur.fetchall(), columns=["security_id", "trade_date", "close"])
+            cur.execute("""
+                SELECT bp.trade_date, bp.close FROM core.core_benchmark_prices_daily bp
+                JOIN core.core_benchmarks b ON b.id = bp.benchmark_id
+                WHERE b.ticker = %s AND bp.trade_date >= %s AND bp.trade_date <= %s
+            """, (EVENT_BENCHMARK, since, as_of))
+            bench = pd.DataFrame(cur.fetchall(), columns=["trade_date", "close"])
+            stage.add(rows_read=len(events) + len(prices) + len(bench))
+            if prices.empty or bench.empty:
+                print(f"No prices or {EVENT_BENCHMARK} history for the event windows.")
+                conn.close()
+                return
+
+        with run.stage("event_returns") as stage:
+            closes = prices.pivot(index="trade_date", columns="security_id", values="close").sort_index()
+            bench = bench.set_index("trade_date")["close"].sort_index()
+            # Trading calendar = dates the benchmark traded; securities carried forward over their gaps
+            closes = closes.reindex(bench.index.union(closes.index)).ffill().reindex(bench.index)
+            returns = event_returns(events, closes, bench)
+            moves = event_moves(returns) if not returns.empty else pd.DataFrame(columns=["security_id", "event_window"] + MOVE_COLUMNS)
+            stage.add(rows_skipped=len(events) * len(EVENT_WINDOWS) - len(returns))
+
+        with run.stage("write") as stage:
+            # Full replace: the statistics cover each security's latest events, which shift as events are added
+            cur.execute("DELETE FROM feat.feat_event_returns")
+            cur.execute("DELETE FROM feat.feat_event_moves")
+            ret_rows = [
+                (int(r.event_id), r.event_window, int(r.security_id), r.event_date, pd.Timestamp(r.day0_date).date(),
+                 _decimal(r.ret), _decimal(r.benchmark_return), _decimal(r.abnormal_return))
+                for r in returns.rename(columns={"return": "ret"}).itertuples(index=False)
+            ]
+            execute_values(cur, """INSERT INTO feat.feat_event_returns (event_id, event_window, security_id, event_date, day0_date,
+                return, benchmark_return, abnormal_return) VALUES %s""", ret_rows, page_size=5000)
+            move_rows = [
+                (int(r.security_id), r.event_window, as_of, int(r.n_events), _decimal(r.avg_abs_move), _decimal(r.p50_abs_move),
+                 _decimal(r.p75_abs_move), _decimal(r.p90_abs_move), r.last_event_date)
+                for r in moves.itertuples(index=False)
+            ]
+            execute_values(cur, """INSERT INTO feat.feat_event_moves (security_id, event_window, as_of_date, n_events, avg_abs_move,
+                p50_abs_move, p75_abs_move, p90_abs_move, last_event_date) VALUES %s""", move_rows, page_size=5000)
+            stage.add(rows_inserted=len(ret_rows) + len(move_rows))
+
+        with run.stage("prefill_expected_move") as stage:
+            # Percent points, like the manual entry; manual values are never overwritten
+            cur.execute(f"""
+                UPDATE core.core_events_earnings e
+                SET expected_move = ROUND(m.{EXPECTED_MOVE_STAT} * 100, 2), expected_move_source = 'event_study'
+                FROM feat.feat_event_moves m
+                WHERE m.security_id = e.security_id AND m.event_window = %s AND m.n_events >= %s
+                  AND e.event_date >= %s AND (e.expected_move IS NULL OR e.expected_move_source = 'event_study')
+                  AND e.expected_move IS DISTINCT FROM ROUND(m.{EXPECTED_MOVE_STAT} * 100, 2)
+            """, (EXPECTED_MOVE_WINDOW, EVENT_MIN_EVENTS, as_of))
+            stage.add(rows_updated=cur.rowcount)
+            conn.commit()
+
+        if publish:
+            with run.stage("publish"):
+                publish_dashboard(conn, None, FEAT_TABLES)
+    conn.close()
+    print(f"feat_event_study: {len(ret_rows)} event windows, {len(move_rows)} move rows")
+
+if __name__ == "__main__":
+    job_feat_event_study()
+    emit_profile_report("feat_event_study")
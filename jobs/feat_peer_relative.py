@@ -0,0 +1,120 @@
+"""
+Feature job: peer-relative performance. Seeds core.core_peer_sets from config/peer_sets.py, expands
+the memberships into one (peer set, security) row each (a name may sit in several sets), and in one
+group-by pass over the latest feat_returns computes, per set and period, the peer median, each name's
+return relative to it and its cross-sectional z-score. Writes feat.feat_peer_relative.
+"""
+import os
+import sys
+from datetime import date
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.peer_sets import PEER_SETS
+from models.db import get_connection, emit_profile_report
+from jobs.feat_returns import _decimal
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("core.core_peer_sets", "feat.feat_peer_relative")
+
+PERIODS = ["24h", "7d", "mtd", "qtd", "ytd"]
+# Fewer members with a return than this and the set's z-scores are left null
+MIN_PEERS = 3
+
+def seed_peer_sets(cur) -> int:
+    """Upsert PEER_SETS by name, tickers resolved to security ids (unknown tickers dropped). Returns sets written."""
+    cur.execute("SELECT ticker, id FROM core.core_security_master")
+    id_by_ticker = dict(cur.fetchall())
+    n = 0
+    for name, tickers in PEER_SETS.items():
+        ids = [id_by_ticker[t] for t in tickers if t in id_by_ticker]
+        cur.execute(
+            """
+            INSERT INTO core.core_peer_sets (name, security_ids) VALUES (%s, %s)
+            ON CONFLICT (name) DO UPDATE SET security_ids = EXCLUDED.security_ids
+            """,
+            (name, ids),
+        )
+        n += 1
+    return n
+
+def peer_relative(members: pd.DataFrame, returns: pd.DataFrame) -> pd.DataFrame:
+    """
+    members: (peer_set_id, security_id), one row per membership. returns: security_id + return_<period>.
+    Returns one row per membership with peer_count, peer_median_*, rel_return_*, zscore_*.
+    The peer median and z-score are over the whole set, the name itself included.
+    """
+    ret_cols = [f"return_{p}" for p in PERIODS]
+    df = members.drop_duplicates().merge(returns[["security_id"] + ret_cols], on="security_id", how="inner")
+    if df.empty:
+        return df
+    df[ret_cols] = df[ret_cols].astype("float64")
+    g = df.groupby("peer_set_id")[ret_cols]
+    median, mean, std, count = g.transform("median"), g.transform("mean"), g.transform("std"), g.transform("count")
+    out = df[["peer_set_id", "security_id"]].copy()
+    out["peer_count"] = df.groupby("peer_set_id")["security_id"].transform("size")
+    for p, c in zip(PERIODS, ret_cols):
+        out[f"peer_median_{p}"] = median[c]
+        out[f"rel_return_{p}"] = df[c] - median[c]
+        ok = (count[c] >= MIN_PEERS) & (std[c] > 0)
+        out[f"zscore_{p}"] = ((df[c] - mean[c]) / std[c]).where(ok)
+    return out
+
+OUT_COLUMNS = ["peer_count"] + [f"{k}_{p}" for k in ("peer_median", "rel_return", "zscore") for p in PERIODS]
+
+def job_feat_peer_relative(as_of_date: date = None, publish: bool = True):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_peer_relative") as run:
+        with run.stage("seed_peer_sets") as stage:
+            stage.add(rows_updated=seed_peer_sets(cur))
+            conn.commit()
+
+        with run.stage("compute") as stage:
+            cur.execute("SELECT MAX(as_of_date) FROM feat.feat_returns WHERE as_of_date <= %s", (as_of_date or date.today(),))
+            latest = cur.fetchone()[0]
+            if latest is None:
+                print("No feat_returns yet; run feat_returns first.")
+                conn.close()
+                return
+            cur.execute("SELECT id AS peer_set_id, UNNEST(security_ids) AS security_id FROM core.core_peer_sets")
+            members = pd.DataFrame(cur.fetchall(), columns=["peer_set_id", "security_id"])
+            cur.execute(
+                "SELECT security_id, " + ", ".join(f"return_{p}" for p in PERIODS) + " FROM feat.feat_returns WHERE as_of_date = %s",
+                (latest,),
+            )
+            returns = pd.DataFrame(cur.fetchall(), columns=["security_id"] + [f"return_{p}" for p in PERIODS])
+            stage.add(rows_read=len(members) + len(returns))
+            out = peer_relative(members, returns)
+
+        with run.stage("write") as stage:
+            # Replace the date's rows so memberships dropped from a set disappear too
+            cur.execute("DELETE FROM feat.feat_peer_relative WHERE as_of_date = %s", (latest,))
+            rows = [
+                (int(r["security_id"]), int(r["peer_set_id"]), latest, int(r["peer_count"]),
+                 *[_decimal(None if pd.isna(r[c]) else float(r[c])) for c in OUT_COLUMNS[1:]])
+                for r in out.to_dict("records")
+            ]
+            if rows:
+                execute_values(
+                    cur,
+                    f"INSERT INTO feat.feat_peer_relative (security_id, peer_set_id, as_of_date, {', '.join(OUT_COLUMNS)}) VALUES %s",
+                    rows, page_size=5000,
+                )
+            conn.commit()
+            stage.add(rows_inserted=len(rows))
+
+        if publish:
+            with run.stage("publish"):
+                publish_dashboard(conn, latest, FEAT_TABLES)
+    conn.close()
+
+if __name__ == "__main__":
+    job_feat_peer_relative()
+    emit_profile_report("feat_peer_relative")
@@ -0,0 +1,198 @@
+"""
+Feature job: portfolio VaR and expected shortfall for the latest book in core.core_positions, plus each
+position's component VaR / ES (Euler allocation: the components add up to the portfolio number).
+    monte_carlo  correlated normal scenarios with the sample covariance of the aligned daily returns in
+                 core.core_prices_daily (split / dividend adjusted; read from the price cube, models/price_cube.py,
+                 when it is current). Scenarios are drawn as Z @ F, F the demeaned returns scaled by
+                 1/sqrt(T-1), so F'F is the covariance and no Cholesky is needed even when names outnumber
+                 days. Runs in batches of RISK_CHUNK scenarios, each with its own seeded RNG, so a second
+                 pass regenerates just the tail scenarios for the components. Longer horizons scale the
+                 1-day P&L by sqrt(horizon).
+    historical   the book revalued over every overlapping horizon-day window of the lookback.
+Writes feat.feat_portfolio_risk and feat.feat_portfolio_risk_components (settings in config/risk.py).
+"""
+import argparse
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.risk import (RISK_LOOKBACK_DAYS, RISK_MIN_HISTORY, RISK_HORIZONS, RISK_CONFIDENCES,
+                         RISK_SCENARIOS, RISK_CHUNK, RISK_SEED, RISK_COMPONENT_BAND)
+from models.db import get_connection, emit_profile_report, database_identity
+from jobs.feat_returns import _decimal
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run
+from models.quality import price_ok
+from models import price_cube
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_portfolio_risk", "feat.feat_portfolio_risk_components")
+
+METHODS = ["monte_carlo", "historical"]
+
+def aligned_prices(prices: pd.DataFrame, n_prices: int) -> pd.DataFrame:
+    """prices: security_id, trade_date, close. Returns the last n_prices dates x security_id, gaps carried forward."""
+    px = prices.pivot(index="trade_date", columns="security_id", values="close").sort_index().astype("float64")
+    return px.ffill().iloc[-n_prices:]
+
+def tail_risk(pnl: np.ndarray, blocks, confidences: list = RISK_CONFIDENCES, band: float = RISK_COMPONENT_BAND) -> dict:
+    """
+    pnl: portfolio P&L per scenario (fraction of value). blocks: (start, stop, position_pnl) covering pnl,
+    position_pnl(mask) -> per-position P&L of the selected scenarios in pnl[start:stop].
+    Component ES averages the tail (P&L at or below -VaR); component VaR averages the scenarios within
+    `band` of the VaR quantile, rescaled to add up to VaR.
+    Returns {confidence: (var, es, component_var, component_es)}, losses positive.
+    """
+    n = len(pnl)
+    srt = np.sort(pnl)
+    half = max(1, int(band * n))
+    levels = {}
+    for c in confidences:
+        k = int(np.floor((1 - c) * (n - 1)))
+        levels[c] = (np.quantile(pnl, 1 - c), srt[max(k - half, 0)], srt[min(k + half, n - 1)])
+    cut = max(max(q, hi) for q, _, hi in levels.values())
+    sums = {c: {"band": 0.0, "n_band": 0, "tail": 0.0, "n_tail": 0} for c in confidences}
+    for start, stop, position_pnl in blocks:
+        p = pnl[start:stop]
+        sel = p <= cut
+        if not sel.any():
+            continue
+        rows, ps = position_pnl(sel), p[sel]
+        for c, (q, lo, hi) in levels.items():
+            in_band, in_tail = (ps >= lo) & (ps <= hi), ps <= q
+            s = sums[c]
+            s["band"] = s["band"] + rows[in_band].sum(axis=0)
+            s["n_band"] += int(in_band.sum())
+            s["tail"] = s["tail"] + rows[in_tail].sum(axis=0)
+            s["n_tail"] += int(in_tail.sum())
+    out = {}
+    for c, (q, _, _) in levels.items():
+        s = sums[c]
+        comp_var = -np.asarray(s["band"]) / max(s["n_band"], 1)
+        comp_es = -np.asarray(s["tail"]) / max(s["n_tail"], 1)
+        if comp_var.sum() != 0:
+            comp_var = comp_var * (-q / comp_var.sum())
+        out[c] = (-q, float(comp_es.sum()), comp_var, comp_es)
+    return out
+
+def _normal_chunks(n: int, chunk: int, seed: int, dims: int):
+    """(start, stop, Z) batches of standard normals; batch i always comes from RNG (seed, i)."""
+    for i, start in enumerate(range(0, n, chunk)):
+        stop = min(start + chunk, n)
+        yield start, stop, np.random.default_rng([seed, i]).standard_normal((stop - start, dims))
+
+def monte_carlo(returns: np.ndarray, weights: np.ndarray, n: int = RISK_SCENARIOS, chunk: int = RISK_CHUNK,
+                seed: int = RISK_SEED, confidences: list = RISK_CONFIDENCES) -> dict:
+    """returns: T x N daily returns, weights: N. 1-day tail_risk() of n zero-mean scenarios with the sample covariance."""
+    f = (returns - returns.mean(axis=0)) / np.sqrt(max(len(returns) - 1, 1))
+    fw = f @ weights
+    pnl = np.concatenate([z @ fw for _, _, z in _normal_chunks(n, chunk, seed, len(f))])
+    blocks = ((start, stop, lambda sel, z=z: (z[sel] @ f) * weights) for start, stop, z in _normal_chunks(n, chunk, seed, len(f)))
+    return tail_risk(pnl, blocks, confidences)
+
+def historical(prices: np.ndarray, weights: np.ndarray, horizon: int, confidences: list = RISK_CONFIDENCES) -> dict:
+    """prices: dates x N. tail_risk() over the overlapping horizon-day returns."""
+    scenarios = prices[horizon:] / prices[:-horizon] - 1.0
+    scenarios = np.nan_to_num(scenarios, nan=0.0)
+    pnl = scenarios @ weights
+    return tail_risk(pnl, [(0, len(pnl), lambda sel: scenarios[sel] * weights)], confidences)
+
+def job_feat_portfolio_risk(as_of_date: date = None, methods: list = METHODS, n_scenarios: int = RISK_SCENARIOS, seed: int = RISK_SEED,
+                            publish: bool = True):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_portfolio_risk") as run:
+        with run.stage("load_history") as stage:
+            cur.execute("""
+                SELECT p.security_id, p.weight FROM core.core_positions p
+                WHERE p.as_of_date = (SELECT MAX(as_of_date) FROM core.core_positions) AND p.weight <> 0
+            """)
+            book = pd.DataFrame(cur.fetchall(), columns=["security_id", "weight"])
+            cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily WHERE trade_date <= %s", (as_of_date or date.today(),))
+            latest = cur.fetchone()[0]
+            if book.empty or latest is None:
+                print("No positions or prices yet.")
+                conn.close()
+                return
+            n_prices = RISK_LOOKBACK_DAYS + max(RISK_HORIZONS)
+            # Trading days -> calendar days, with room for holidays
+            since = latest - timedelta(days=n_prices * 7 // 5 + 14)
+            cube = price_cube.open_cube(database_identity(conn))
+            if cube is not None and cube.last_date == latest and (cube.rows(book["security_id"]) >= 0).all():
+                # Mapped price cube, current with the latest prices and holding every name in the book: same
+                # rows as the query below, without the round trip
+                wide = cube.frame(book["security_id"], since + timedelta(days=1), latest)
+                prices = wide.stack(future_stack=True).dropna().rename("close").reset_index()[["security_id", "trade_date", "close"]]
+            else:
+                cur.execute(
+                    f"SELECT security_id, trade_date, COALESCE(adj_close, close) FROM core.core_prices_daily WHERE security_id = ANY(%s) AND trade_date > %s AND trade_date <= %s AND {price_ok()}",
+                    (book["security_id"].tolist(), since, latest),
+                )
+                prices = pd.DataFrame(cur.fetchall(), columns=["security_id", "trade_date", "close"])
+            stage.add(rows_read=len(book) + len(prices))
+            px = aligned_prices(prices, n_prices) if not prices.empty else pd.DataFrame()
+            daily = px.pct_change(fill_method=None).iloc[-RISK_LOOKBACK_DAYS:]
+            covered = daily.columns[daily.notna().sum() >= RISK_MIN_HISTORY]
+            n_book = len(book)
+            book = book[book["security_id"].isin(covered)]
+            stage.add(rows_skipped=n_book - len(book))
+            if book.empty:
+                print("No positions with enough price history.")
+                conn.close()
+                return
+            ids = book["security_id"].to_numpy()
+            weights = book["weight"].astype("float64").to_numpy()
+            results = {}
+
+        if "monte_carlo" in methods:
+            with run.stage("monte_carlo") as stage:
+                one_day = monte_carlo(daily[ids].fillna(0.0).to_numpy(), weights, n=n_scenarios, seed=seed)
+                for h in RISK_HORIZONS:
+                    k = np.sqrt(h)
+                    results[("monte_carlo", h)] = ({c: (v * k, e * k, cv * k, ce * k) for c, (v, e, cv, ce) in one_day.items()}, n_scenarios)
+                stage.add(rows_read=n_scenarios)
+
+        if "historical" in methods:
+            with run.stage("historical") as stage:
+                window = px[ids].to_numpy()
+                for h in RISK_HORIZONS:
+                    results[("historical", h)] = (historical(window[-(RISK_LOOKBACK_DAYS + h):], weights, h), RISK_LOOKBACK_DAYS)
+                stage.add(rows_read=len(window))
+
+        with run.stage("write") as stage:
+            cur.execute("DELETE FROM feat.feat_portfolio_risk WHERE as_of_date = %s AND method = ANY(%s)", (latest, list(methods)))
+            cur.execute("DELETE FROM feat.feat_portfolio_risk_components WHERE as_of_date = %s AND method = ANY(%s)", (latest, list(methods)))
+            risk_rows, comp_rows = [], []
+            for (method, h), (by_conf, n) in results.items():
+                for c, (var, es, comp_var, comp_es) in by_conf.items():
+                    risk_rows.append((latest, method, h, c, _decimal(var), _decimal(es), n, len(ids)))
+                    comp_rows += [(int(sid), latest, method, h, c, _decimal(w), _decimal(cv), _decimal(ce))
+                                  for sid, w, cv, ce in zip(ids, weights, comp_var, comp_es)]
+            execute_values(cur, "INSERT INTO feat.feat_portfolio_risk (as_of_date, method, horizon_days, confidence, var, es, n_scenarios, n_positions) VALUES %s", risk_rows)
+            execute_values(cur, """INSERT INTO feat.feat_portfolio_risk_components (security_id, as_of_date, method, horizon_days, confidence,
+                weight, component_var, component_es) VALUES %s""", comp_rows, page_size=5000)
+            conn.commit()
+            stage.add(rows_inserted=len(risk_rows) + len(comp_rows))
+
+        if publish:
+            with run.stage("publish"):
+                publish_dashboard(conn, latest, FEAT_TABLES)
+    conn.close()
+    for (method, h), (by_conf, _) in results.items():
+        print(f"feat_portfolio_risk {method} {h}d: " + ", ".join(f"VaR{c:.0%} {v:.2%} ES {e:.2%}" for c, (v, e, _, _) in by_conf.items()))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portfolio VaR / expected shortfall into feat.feat_portfolio_risk")
+    parser.add_argument("--method", choices=METHODS + ["all"], default="all")
+    parser.add_argument("--scenarios", type=int, default=RISK_SCENARIOS, help="Monte Carlo scenario count")
+    parser.add_argument("--seed", type=int, default=RISK_SEED)
+    args = parser.parse_args()
+    job_feat_portfolio_risk(methods=METHODS if args.method == "all" else [args.method], n_scenarios=args.scenarios, seed=args.seed)
+    emit_profile_report("feat_portfolio_risk")
@@ -1,18 +1,30 @@
 """
 Feature job: compute 24h/7d/MTD/QTD/YTD returns per security and for benchmarks,
-then portfolio roll-up and alpha vs S&P 500, Nasdaq, 3M T-bill.
+then portfolio roll-up and alpha vs S&P 500, Nasdaq, 3M T-bill. Security prices are split / dividend
+adjusted (adj_close, see models/adjustments.py); rows quarantined by jobs/dq_scan.py are left out.
+Window features come from the DuckDB mirror when enabled, else from the memory-mapped price cube
+(models/price_cube.py) when it is current, else from one core_prices_daily query per security.
 """
 import os
 import sys
 from datetime import date, timedelta
 from decimal import Decimal
 
+import numpy as np
 import pandas as pd
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-from models.db import get_connection
+from models import analytics, price_cube
+from models.db import get_connection, emit_profile_report, database_identity
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run, xact_counts
+from models.partitions import ensure_partitions
+from models.quality import price_ok
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_returns", "feat.feat_benchmark_returns", "feat.feat_portfolio")
 
 def _decimal(n):
     if n is None or (isinstance(n, float) and pd.isna(n)):
@@ -21,9 +33,9 @@ def _decimal(n):
 
 def _price_series(cur, security_id: int, end_date: date, lookback_days: int) -> pd.Series:
     cur.execute(
-        """
-        SELECT trade_date, close FROM core.core_prices_daily
-        WHERE security_id = %s AND trade_date <= %s
+        f"""
+        SELECT trade_date, COALESCE(adj_close, close) FROM core.core_prices_daily
+        WHERE security_id = %s AND trade_date <= %s AND {price_ok()}
         ORDER BY trade_date DESC
         LIMIT %s
         """,
@@ -36,6 +48,19 @@ def _price_series(cur, security_id: int, end_date: date, lookback_days: int) ->
     df = df.set_index("trade_date").sort_index()
     return df["close"].astype(float)
 
+def _cube_series(cube, security_id: int, end_date: date, lookback_days: int):
+    """
+    _price_series from the mapped cube: the same rows (it holds the adjusted, unquarantined closes).
+    None when the security is not in the cube (e.g. loaded since it was built): read it from SQL.
+    """
+    row = cube.rows([security_id])[0]
+    if row < 0:
+        return None
+    hi = int(np.searchsorted(cube.dates, np.datetime64(end_date, "D"), side="right"))
+    closes = cube.close[row, :hi]
+    idx = np.flatnonzero(~np.isnan(closes))[-(lookback_days + 1):]
+    return pd.Series(closes[idx], index=pd.Index(cube.dates[idx].astype(object), name="trade_date"), name="close")
+
 def _benchmark_series(cur, benchmark_id: int, end_date: date, lookback_days: int) -> pd.Series:
     cur.execute(
         """
@@ -85,6 +110,7 @@ def returns_for_series(series: pd.Series, as_of: date) -> dict:
     if p0 == 0:
         return {"return_24h": None, "return_7d": None, "return_mtd": None, "return_qtd": None, "return_ytd": None}
     out = {}
+    # Newest first, so px.iloc[0] below is the last close on or before each period boundary
     # 24h: previous close
     if len(series) >= 2:
         out["return_24h"] = (p0 / float(series.iloc[1]) - 1) if series.iloc[1] else None
@@ -94,14 +120,14 @@ def returns_for_series(series: pd.Series, as_of: date) -> dict:
     week_ago = as_of - timedelta(days=7)
     px = series[series.index <= week_ago]
     if not px.empty:
-        out["return_7d"] = (p0 / float(px.iloc[-1]) - 1) if px.iloc[-1] else None
+        out["return_7d"] = (p0 / float(px.iloc[0]) - 1) if px.iloc[0] else None
     else:
         out["return_7d"] = None
     # MTD
     month_start = date(as_of.year, as_of.month, 1)
     px = series[series.index < month_start]
     if not px.empty:
-        out["return_mtd"] = (p0 / float(px.iloc[-1]) - 1) if px.iloc[-1] else None
+        out["return_mtd"] = (p0 / float(px.iloc[0]) - 1) if px.iloc[0] else None
     else:
         out["return_mtd"] = None
     # QTD
@@ -109,86 +135,38 @@ def returns_for_series(series: pd.Series, as_of: date) -> dict:
     quarter_start = date(as_of.year, (q - 1) * 3 + 1, 1)
     px = series[series.index < quarter_start]
     if not px.empty:
-        out["return_qtd"] = (p0 / float(px.iloc[-1]) - 1) if px.iloc[-1] else None
+        out["return_qtd"] = (p0 / float(px.iloc[0]) - 1) if px.iloc[0] else None
     else:
         out["return_qtd"] = None
     # YTD
     year_start = date(as_of.year, 1, 1)
     px = series[series.index < year_start]
     if not px.empty:
-        out["return_ytd"] = (p0 / float(px.iloc[-1]) - 1) if px.iloc[-1] else None
+        out["return_ytd"] = (p0 / float(px.iloc[0]) - 1) if px.iloc[0] else None
     else:
         out["return_ytd"] = None
     return out
 
-def job_feat_returns(as_of_date: date = None):
-    if as_of_date is None:
-        as_of_date = date.today()
-    conn = get_connection()
-    cur = conn.cursor()
-    # Latest trade date we have
-    cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily WHERE trade_date <= %s", (as_of_date,))
-    row = cur.fetchone()
-    latest = row[0] if row and row[0] else as_of_date
-    lookback = 400
-
-    # Security returns -> feat_returns (with vol spike, drawdown_52w, what_changed_score)
-    cur.execute("SELECT id FROM core.core_security_master")
-    for (security_id,) in cur.fetchall():
-        series = _price_series(cur, security_id, latest, lookback)
-        ret = returns_for_series(series, latest)
-        vd = vol_and_drawdown(series)
-        # What-changed score: |return_7d|*10 + vol_spike_ratio + |drawdown_52w|*10 (higher = more change)
-        score = None
-        if ret.get("return_7d") is not None or vd.get("vol_spike_ratio") is not None or vd.get("drawdown_52w") is not None:
-            score = 0.0
-            if ret.get("return_7d") is not None:
-                score += abs(float(ret["return_7d"])) * 10
-            if vd.get("vol_spike_ratio") is not None:
-                score += float(vd["vol_spike_ratio"])
-            if vd.get("drawdown_52w") is not None:
-                score += abs(float(vd["drawdown_52w"])) * 10
-        cur.execute(
-            """
-            INSERT INTO feat.feat_returns (security_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
-                vol_7d, vol_60d, vol_spike_ratio, drawdown_52w, what_changed_score)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (security_id, as_of_date) DO UPDATE SET
-                return_24h = EXCLUDED.return_24h, return_7d = EXCLUDED.return_7d,
-                return_mtd = EXCLUDED.return_mtd, return_qtd = EXCLUDED.return_qtd, return_ytd = EXCLUDED.return_ytd,
-                vol_7d = EXCLUDED.vol_7d, vol_60d = EXCLUDED.vol_60d, vol_spike_ratio = EXCLUDED.vol_spike_ratio,
-                drawdown_52w = EXCLUDED.drawdown_52w, what_changed_score = EXCLUDED.what_changed_score
-            """,
-            (
-                security_id, latest,
-                _decimal(ret["return_24h"]), _decimal(ret["return_7d"]), _decimal(ret["return_mtd"]), _decimal(ret["return_qtd"]), _decimal(ret["return_ytd"]),
-                _decimal(vd.get("vol_7d")), _decimal(vd.get("vol_60d")), _decimal(vd.get("vol_spike_ratio")), _decimal(vd.get("drawdown_52w")), _decimal(score),
-            ),
-        )
-    conn.commit()
-
-    # Benchmark returns -> feat_benchmark_returns
-    cur.execute("SELECT id, ticker FROM core.core_benchmarks")
-    benchmarks = cur.fetchall()
-    for benchmark_id, ticker in benchmarks:
-        series = _benchmark_series(cur, benchmark_id, latest, lookback)
-        if series.empty and ticker == "TB3M":
-            # Placeholder: no series for T-bills; use null or tiny constant
-            ret = {"return_24h": None, "return_7d": None, "return_mtd": None, "return_qtd": None, "return_ytd": None}
-        else:
-            ret = returns_for_series(series, latest)
-        cur.execute(
-            """
-            INSERT INTO feat.feat_benchmark_returns (benchmark_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (benchmark_id, as_of_date) DO UPDATE SET
-                return_24h = EXCLUDED.return_24h, return_7d = EXCLUDED.return_7d,
-                return_mtd = EXCLUDED.return_mtd, return_qtd = EXCLUDED.return_qtd, return_ytd = EXCLUDED.return_ytd
-            """,
-            (benchmark_id, latest, _decimal(ret["return_24h"]), _decimal(ret["return_7d"]), _decimal(ret["return_mtd"]), _decimal(ret["return_qtd"]), _decimal(ret["return_ytd"])),
-        )
-    conn.commit()
+def _analytics_features(conn, latest, lookback, stage):
+    """Sync the DuckDB mirror and compute window features there. None (compute from Postgres) if unavailable."""
+    if not analytics.enabled():
+        return None
+    try:
+        db = analytics.connect()
+        try:
+            stage.add(rows_read=sum(analytics.sync(conn, db).values()))
+            return analytics.security_features(db, latest, lookback), analytics.benchmark_returns(db, latest, lookback)
+        finally:
+            db.close()
+    except Exception as e:
+        # e.g. the mirror file is locked by another job: fall back to Postgres
+        conn.rollback()
+        stage.error(e)
+        print(f"Analytics mirror unavailable, computing from Postgres: {e}")
+        return None
 
+def _portfolio(cur, latest, stage) -> bool:
+    """Roll security returns up to feat_portfolio (weights from the latest positions) with alpha vs benchmarks. False if no positions."""
     # Portfolio: weighted sum of security returns; alpha = portfolio - benchmark
     cur.execute("""
         SELECT p.security_id, p.weight, r.return_24h, r.return_7d, r.return_mtd, r.return_qtd, r.return_ytd
@@ -197,14 +175,15 @@ def job_feat_returns(as_of_date: date = None):
         WHERE p.as_of_date = (SELECT MAX(as_of_date) FROM core.core_positions)
     """, (latest,))
     pos = cur.fetchall()
+    stage.add(rows_read=len(pos))
     if not pos:
-        conn.close()
-        return
-    portfolio_24h = sum(r[2] * float(r[1]) for r in pos if r[2] is not None)
-    portfolio_7d = sum(r[3] * float(r[1]) for r in pos if r[3] is not None)
-    portfolio_mtd = sum(r[4] * float(r[1]) for r in pos if r[4] is not None)
-    portfolio_qtd = sum(r[5] * float(r[1]) for r in pos if r[5] is not None)
-    portfolio_ytd = sum(r[6] * float(r[1]) for r in pos if r[6] is not None)
+        return False
+    counts0 = xact_counts(cur, "feat.feat_portfolio")
+    portfolio_24h = sum(float(r[2]) * float(r[1]) for r in pos if r[2] is not None)
+    portfolio_7d = sum(float(r[3]) * float(r[1]) for r in pos if r[3] is not None)
+    portfolio_mtd = sum(float(r[4]) * float(r[1]) for r in pos if r[4] is not None)
+    portfolio_qtd = sum(float(r[5]) * float(r[1]) for r in pos if r[5] is not None)
+    portfolio_ytd = sum(float(r[6]) * float(r[1]) for r in pos if r[6] is not None)
 
     # Resolve benchmark IDs by name (SPY = S&P 500, QQQ = Nasdaq, TB3M = T-bill)
     cur.execute("SELECT id, ticker FROM core.core_benchmarks")
@@ -249,8 +228,111 @@ def job_feat_returns(as_of_date: date = None):
             _decimal(alpha(tbill_id, 1) if tbill_id else None), _decimal(alpha(tbill_id, 2) if tbill_id else None), _decimal(alpha(tbill_id, 3) if tbill_id else None), _decimal(alpha(tbill_id, 4) if tbill_id else None), _decimal(alpha(tbill_id, 5) if tbill_id else None),
         ),
     )
-    conn.commit()
+    ins, upd = xact_counts(cur, "feat.feat_portfolio")
+    stage.add(rows_inserted=ins - counts0[0], rows_updated=upd - counts0[1])
+    return True
+
+def job_feat_returns(as_of_date: date = None, publish: bool = True):
+    if as_of_date is None:
+        as_of_date = date.today()
+    conn = get_connection()
+    ensure_partitions(conn, through_year=as_of_date.year + 1)
+    cur = conn.cursor()
+    # Latest trade date we have
+    cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily WHERE trade_date <= %s", (as_of_date,))
+    row = cur.fetchone()
+    latest = row[0] if row and row[0] else as_of_date
+    lookback = 400
+
+    with job_run("feat_returns") as run:
+        with run.stage("analytics_sync") as stage:
+            # Window scans on the columnar mirror when available; only the feat rows come back to Postgres
+            mirrored = _analytics_features(conn, latest, lookback, stage)
+        sec_features, bench_features = mirrored or (None, None)
+
+        with run.stage("security_returns") as stage:
+            # Security returns -> feat_returns (with vol spike, drawdown_52w); scored by jobs/feat_scores.py
+            n_series = 0
+            counts0 = xact_counts(cur, "feat.feat_returns")
+            cur.execute("SELECT id FROM core.core_security_master")
+            security_ids = cur.fetchall()
+            cube = price_cube.open_cube(database_identity(conn)) if sec_features is None else None
+            if cube is not None and (cube.last_date is None or cube.last_date < latest):
+                cube = None
+            for (security_id,) in security_ids:
+                if sec_features is not None:
+                    f = sec_features.get(security_id, {})
+                    ret = {k: f.get(k) for k in analytics.RETURN_COLUMNS}
+                    vd = {k: f.get(k) for k in analytics.VOL_COLUMNS}
+                else:
+                    series = _cube_series(cube, security_id, latest, lookback) if cube is not None else None
+                    if series is None:
+                        series = _price_series(cur, security_id, latest, lookback)
+                    ret = returns_for_series(series, latest)
+                    vd = vol_and_drawdown(series)
+                    n_series += len(series)
+                cur.execute(
+                    """
+                    INSERT INTO feat.feat_returns (security_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
+                        vol_7d, vol_60d, vol_spike_ratio, drawdown_52w)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (security_id, as_of_date) DO UPDATE SET
+                        return_24h = EXCLUDED.return_24h, return_7d = EXCLUDED.return_7d,
+                        return_mtd = EXCLUDED.return_mtd, return_qtd = EXCLUDED.return_qtd, return_ytd = EXCLUDED.return_ytd,
+                        vol_7d = EXCLUDED.vol_7d, vol_60d = EXCLUDED.vol_60d, vol_spike_ratio = EXCLUDED.vol_spike_ratio,
+                        drawdown_52w = EXCLUDED.drawdown_52w
+                    """,
+                    (
+                        security_id, latest,
+                        _decimal(ret["return_24h"]), _decimal(ret["return_7d"]), _decimal(ret["return_mtd"]), _decimal(ret["return_qtd"]), _decimal(ret["return_ytd"]),
+                        _decimal(vd.get("vol_7d")), _decimal(vd.get("vol_60d")), _decimal(vd.get("vol_spike_ratio")), _decimal(vd.get("drawdown_52w")),
+                    ),
+                )
+            ins, upd = xact_counts(cur, "feat.feat_returns")
+            stage.add(rows_read=n_series, rows_inserted=ins - counts0[0], rows_updated=upd - counts0[1])
+            conn.commit()
+            stage.watermark("core.core_prices_daily", latest)
+
+        with run.stage("benchmark_returns") as stage:
+            # Benchmark returns -> feat_benchmark_returns
+            cur.execute("SELECT id, ticker FROM core.core_benchmarks")
+            benchmarks = cur.fetchall()
+            counts0 = xact_counts(cur, "feat.feat_benchmark_returns")
+            for benchmark_id, ticker in benchmarks:
+                if bench_features is not None:
+                    # No series (e.g. TB3M placeholder) comes back as all-null returns
+                    f = bench_features.get(benchmark_id, {})
+                    ret = {k: f.get(k) for k in analytics.RETURN_COLUMNS}
+                else:
+                    series = _benchmark_series(cur, benchmark_id, latest, lookback)
+                    if series.empty and ticker == "TB3M":
+                        # Placeholder: no series for T-bills; use null or tiny constant
+                        ret = {"return_24h": None, "return_7d": None, "return_mtd": None, "return_qtd": None, "return_ytd": None}
+                    else:
+                        ret = returns_for_series(series, latest)
+                cur.execute(
+                    """
+                    INSERT INTO feat.feat_benchmark_returns (benchmark_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                    ON CONFLICT (benchmark_id, as_of_date) DO UPDATE SET
+                        return_24h = EXCLUDED.return_24h, return_7d = EXCLUDED.return_7d,
+                        return_mtd = EXCLUDED.return_mtd, return_qtd = EXCLUDED.return_qtd, return_ytd = EXCLUDED.return_ytd
+                    """,
+                    (benchmark_id, latest, _decimal(ret["return_24h"]), _decimal(ret["return_7d"]), _decimal(ret["return_mtd"]), _decimal(ret["return_qtd"]), _decimal(ret["return_ytd"])),
+                )
+            ins, upd = xact_counts(cur, "feat.feat_benchmark_returns")
+            stage.add(rows_inserted=ins - counts0[0], rows_updated=upd - counts0[1])
+            conn.commit()
+
+        with run.stage("portfolio") as stage:
+            has_portfolio = _portfolio(cur, latest, stage)
+            conn.commit()
+
+        if publish:
+            with run.stage("publish"):
+                publish_dashboard(conn, latest, FEAT_TABLES if has_portfolio else FEAT_TABLES[:2])
     conn.close()
 
 if __name__ == "__main__":
     job_feat_returns()
+    emit_profile_report("feat_returns")
@@ -0,0 +1,110 @@
+"""
+Feature job: estimate revisions -> feat.feat_revisions, one set-based statement for every security,
+estimate period and metric. Per estimate snapshot and window (config/revisions.py):
+    estimate_change    consensus change over the window, relative to the estimate at the window start
+    revision_velocity  net revisions (up minus down) per 30 days over the window
+Incremental by default: only series with snapshots written (inserted or updated) since the last run's
+watermark, less REVISION_WATERMARK_OVERLAP, are recomputed, from the earliest such snapshot date onwards.
+The overlap catches rows committed late by transactions that started before the last run; re-reading them
+is idempotent (the upsert leaves unchanged rows alone). --full recomputes everything.
+"""
+import argparse
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.revisions import REVISION_WINDOWS, REVISION_METRICS, REVISION_WATERMARK_OVERLAP
+from models.db import get_connection, emit_profile_report
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run, get_watermark, upsert_counts
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_revisions",)
+
+WATERMARK_SOURCE = "core.core_estimates.updated_at"
+
+def revisions_sql(windows: list = REVISION_WINDOWS, metrics: dict = REVISION_METRICS) -> str:
+    """
+    INSERT ... SELECT over core.core_estimates. Params: %(since_updated)s, %(until_updated)s, %(overlap)s.
+    Each snapshot's delta vs the previous one (LAG) is summed / counted over a RANGE frame of the
+    last window_days, so the estimate at the window start is estimate minus the summed deltas.
+    """
+    snaps = " UNION ALL ".join(
+        f"SELECT e.security_id, t.period_label, e.as_of_date, '{metric}' AS metric, e.{col}::NUMERIC AS value, t.since "
+        f"FROM core.core_estimates e JOIN touched t ON t.security_id = e.security_id AND t.period_label = COALESCE(e.period_label, '') "
+        f"WHERE e.{col} IS NOT NULL"
+        for metric, col in metrics.items()
+    )
+    frames = " UNION ALL ".join(
+        f"""
+        SELECT security_id, period_label, metric, as_of_date, since, {int(n)} AS window_days, value,
+               SUM(delta) OVER w AS change,
+               COUNT(*) FILTER (WHERE delta > 0) OVER w AS up,
+               COUNT(*) FILTER (WHERE delta < 0) OVER w AS down
+        FROM chg
+        WINDOW w AS (PARTITION BY security_id, period_label, metric ORDER BY as_of_date
+                     RANGE BETWEEN INTERVAL '{int(n) - 1} days' PRECEDING AND CURRENT ROW)"""
+        for n in windows
+    )
+    return f"""
+        WITH touched AS (
+            SELECT security_id, COALESCE(period_label, '') AS period_label, MIN(as_of_date) AS since
+            FROM core.core_estimates
+            WHERE updated_at > %(since_updated)s::timestamptz - %(overlap)s AND updated_at <= %(until_updated)s
+            GROUP BY 1, 2
+        ),
+        snaps AS ({snaps}),
+        chg AS (
+            SELECT s.*, s.value - LAG(s.value) OVER (PARTITION BY security_id, period_label, metric ORDER BY as_of_date) AS delta
+            FROM snaps s
+        ),
+        framed AS ({frames})
+        INSERT INTO feat.feat_revisions (security_id, as_of_date, period_label, metric, window_days, estimate,
+            estimate_change, revision_velocity, revisions_up, revisions_down)
+        SELECT security_id, as_of_date, period_label, metric, window_days, value,
+               CASE WHEN value - change <> 0 THEN ROUND(change / ABS(value - change), 6) END,
+               ROUND((up - down) * 30.0 / window_days, 6),
+               up, down
+        FROM framed
+        WHERE as_of_date >= since
+        ON CONFLICT (security_id, period_label, metric, window_days, as_of_date) DO UPDATE SET
+            estimate = EXCLUDED.estimate, estimate_change = EXCLUDED.estimate_change,
+            revision_velocity = EXCLUDED.revision_velocity,
+            revisions_up = EXCLUDED.revisions_up, revisions_down = EXCLUDED.revisions_down
+        WHERE (feat_revisions.estimate, feat_revisions.estimate_change, feat_revisions.revision_velocity,
+               feat_revisions.revisions_up, feat_revisions.revisions_down)
+              IS DISTINCT FROM (EXCLUDED.estimate, EXCLUDED.estimate_change, EXCLUDED.revision_velocity,
+               EXCLUDED.revisions_up, EXCLUDED.revisions_down)
+    """
+
+def job_feat_revisions(full: bool = False, publish: bool = True):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_revisions") as run:
+        with run.stage("revisions") as stage:
+            since = None if full else get_watermark("feat_revisions", WATERMARK_SOURCE, conn)
+            cur.execute("SELECT MAX(updated_at) FROM core.core_estimates")
+            until = cur.fetchone()[0]
+            if until is None:
+                print("No estimates yet.")
+                conn.close()
+                return
+            ins, upd = upsert_counts(cur, revisions_sql(), {"since_updated": since or "-infinity", "until_updated": until,
+                                                          "overlap": REVISION_WATERMARK_OVERLAP})
+            conn.commit()
+            stage.add(rows_inserted=ins, rows_updated=upd)
+            stage.watermark(WATERMARK_SOURCE, until)
+        if publish and (ins or upd):
+            with run.stage("publish"):
+                publish_dashboard(conn, None, FEAT_TABLES)
+    conn.close()
+    print(f"feat_revisions: {ins} inserted, {upd} updated")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute feat.feat_revisions")
+    parser.add_argument("--full", action="store_true", help="recompute every series, ignoring the watermark")
+    args = parser.parse_args()
+    job_feat_revisions(full=args.full)
+    emit_profile_report("feat_revisions")
@@ -0,0 +1,106 @@
+"""
+Feature job: remaining performance obligations -> feat.feat_rpo, extracted inside Postgres from
+raw.raw_sec_companyfacts with JSONB path queries (payloads never leave the database).
+Total RPO is us-gaap RevenueRemainingPerformanceObligation; current RPO comes from any of
+CRPO_CONCEPTS (any taxonomy) when the company reports one. One statement covers every CIK.
+Incremental: only companyfacts rows loaded (asof_loaded_at) since the last run's watermark, less
+WATERMARK_OVERLAP, are read, the newest such version per CIK. The watermark is not the raw id: a SERIAL
+id is drawn at insert, so an ingest_sec run committing while this job runs can leave a row below a
+higher id that was already read. The overlap re-reads such late commits; that is idempotent, since the
+upsert leaves unchanged rows alone. --full rereads the newest version of every CIK.
+"""
+import argparse
+import os
+import sys
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection, emit_profile_report
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run, get_watermark, upsert_counts
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_rpo",)
+
+RPO_CONCEPTS = ("RevenueRemainingPerformanceObligation",)
+# Not in us-gaap: companies that break out the current portion use their own element names
+CRPO_CONCEPTS = ("RevenueRemainingPerformanceObligationCurrent", "RemainingPerformanceObligationCurrent", "CurrentRemainingPerformanceObligation")
+# Same predicate as the partial index in sql/13_rpo.sql
+RPO_FILTER = "payload @? '$.facts.*.RevenueRemainingPerformanceObligation'"
+WATERMARK_SOURCE = "raw.raw_sec_companyfacts.asof_loaded_at"
+# Incremental runs re-read companyfacts loaded this long before the last watermark (longer than an
+# ingest_sec run, whose rows all carry its start time)
+WATERMARK_OVERLAP = timedelta(hours=6)
+
+def _concepts_values() -> str:
+    rows = [("rpo", c) for c in RPO_CONCEPTS] + [("crpo", c) for c in CRPO_CONCEPTS]
+    return ", ".join(f"('{kind}', '$.facts.*.{concept}.units.USD[*]')" for kind, concept in rows)
+
+RPO_SQL = f"""
+    WITH latest AS (
+        SELECT DISTINCT ON (cik) id, cik, payload
+        FROM raw.raw_sec_companyfacts
+        WHERE asof_loaded_at > %(since_loaded)s::timestamptz - %(overlap)s AND asof_loaded_at <= %(until_loaded)s
+          AND {RPO_FILTER}
+        ORDER BY cik, asof_loaded_at DESC, id DESC
+    ),
+    facts AS (
+        -- Newest filing wins when a period is reported again (10-K after 10-Q, amendments)
+        SELECT DISTINCT ON (l.cik, c.kind, f->>'end')
+               l.id, l.cik, c.kind, (f->>'end')::DATE AS period_end, (f->>'val')::NUMERIC AS val, (f->>'filed')::DATE AS filed
+        FROM latest l
+        CROSS JOIN (VALUES {_concepts_values()}) AS c(kind, path)
+        CROSS JOIN LATERAL jsonb_path_query(l.payload, c.path::jsonpath) AS f
+        WHERE f ? 'end' AND f ? 'val'
+        ORDER BY l.cik, c.kind, f->>'end', f->>'filed' DESC
+    ),
+    per_period AS (
+        SELECT cik, period_end, MAX(id) AS source_id, MAX(filed) AS filed,
+               MAX(val) FILTER (WHERE kind = 'rpo') AS rpo,
+               MAX(val) FILTER (WHERE kind = 'crpo') AS crpo
+        FROM facts GROUP BY cik, period_end
+    )
+    INSERT INTO feat.feat_rpo (security_id, period_end, rpo, crpo, coverage_flag, filed, source_id)
+    SELECT m.id, p.period_end, p.rpo::BIGINT, p.crpo::BIGINT, (p.rpo IS NOT NULL AND p.crpo IS NOT NULL), p.filed, p.source_id
+    FROM per_period p
+    JOIN core.core_security_master m ON LPAD(m.cik, 10, '0') = p.cik
+    WHERE p.rpo IS NOT NULL
+    ON CONFLICT (security_id, period_end) DO UPDATE SET
+        rpo = EXCLUDED.rpo, crpo = EXCLUDED.crpo, coverage_flag = EXCLUDED.coverage_flag,
+        filed = EXCLUDED.filed, source_id = EXCLUDED.source_id
+    WHERE (feat_rpo.rpo, feat_rpo.crpo, feat_rpo.coverage_flag, feat_rpo.filed, feat_rpo.source_id)
+          IS DISTINCT FROM (EXCLUDED.rpo, EXCLUDED.crpo, EXCLUDED.coverage_flag, EXCLUDED.filed, EXCLUDED.source_id)
+"""
+
+def job_feat_rpo(full: bool = False, publish: bool = True):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_rpo") as run:
+        with run.stage("extract") as stage:
+            since = None if full else get_watermark("feat_rpo", WATERMARK_SOURCE, conn)
+            # No early exit on an unchanged MAX: a late commit below it is what the overlap is for
+            cur.execute("SELECT MAX(asof_loaded_at) FROM raw.raw_sec_companyfacts")
+            until = cur.fetchone()[0]
+            if until is None:
+                print("feat_rpo: no companyfacts")
+                conn.close()
+                return
+            ins, upd = upsert_counts(cur, RPO_SQL, {"since_loaded": since or "-infinity", "until_loaded": until,
+                                                    "overlap": WATERMARK_OVERLAP})
+            conn.commit()
+            stage.add(rows_inserted=ins, rows_updated=upd)
+            stage.watermark(WATERMARK_SOURCE, until)
+        if publish and (ins or upd):
+            with run.stage("publish"):
+                publish_dashboard(conn, None, FEAT_TABLES)
+    conn.close()
+    print(f"feat_rpo: {ins} inserted, {upd} updated")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract RPO from SEC companyfacts into feat.feat_rpo")
+    parser.add_argument("--full", action="store_true", help="reread every CIK, ignoring the watermark")
+    args = parser.parse_args()
+    job_feat_rpo(full=args.full)
+    emit_profile_report("feat_rpo")
@@ -0,0 +1,130 @@
+"""
+Feature job: cross-sectional "what changed" score. Gathers the configured factor inputs for every
+security (returns, vol spike, drawdown, peer-relative move, estimate revisions, days to earnings), and in
+one vectorized pass winsorizes and z-scores each factor across the universe, applies the weights from
+config/scoring.py and ranks. Writes feat.feat_scores, each factor's contribution to
+feat.feat_score_contributions and the top K to feat.feat_top_movers.
+"""
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.scoring import SCORING_FACTORS, WINSOR_LIMITS, EARNINGS_HORIZON_DAYS, TOP_K
+from models.db import get_connection, emit_profile_report
+from jobs.feat_returns import _decimal
+from jobs.publish_dashboard import publish_dashboard
+from models.ledger import job_run
+
+# Tables this job writes (announced with the published data version)
+FEAT_TABLES = ("feat.feat_scores", "feat.feat_top_movers")
+
+INPUTS_SQL = """
+    WITH latest AS (
+        SELECT (SELECT MAX(as_of_date) FROM feat.feat_returns WHERE as_of_date <= %(as_of)s) AS ret_date,
+               (SELECT MAX(as_of_date) FROM feat.feat_peer_relative WHERE as_of_date <= %(as_of)s) AS peer_date
+    )
+    SELECT m.id AS security_id, m.ticker,
+           r.return_24h, r.return_7d, r.vol_spike_ratio, r.drawdown_52w,
+           pr.peer_z_7d, rv.revision_30d, e.next_earnings_date - %(as_of)s AS days_to_earnings
+    FROM core.core_security_master m
+    CROSS JOIN latest l
+    LEFT JOIN feat.feat_returns r ON r.security_id = m.id AND r.as_of_date = l.ret_date
+    LEFT JOIN (
+        SELECT security_id, AVG(zscore_7d) AS peer_z_7d FROM feat.feat_peer_relative
+        WHERE as_of_date = (SELECT peer_date FROM latest) GROUP BY security_id
+    ) pr ON pr.security_id = m.id
+    LEFT JOIN (
+        -- Latest 30-day revenue revision per estimate period, averaged over periods
+        SELECT security_id, AVG(estimate_change) AS revision_30d FROM (
+            SELECT DISTINCT ON (security_id, period_label) security_id, estimate_change
+            FROM feat.feat_revisions
+            WHERE metric = 'revenue' AND window_days = 30 AND as_of_date <= %(as_of)s
+            ORDER BY security_id, period_label, as_of_date DESC
+        ) x GROUP BY security_id
+    ) rv ON rv.security_id = m.id
+    LEFT JOIN (
+        SELECT security_id, MIN(event_date) AS next_earnings_date FROM core.core_events_earnings
+        WHERE event_date >= %(as_of)s GROUP BY security_id
+    ) e ON e.security_id = m.id
+"""
+
+def score_frame(inputs: pd.DataFrame, factors: dict = SCORING_FACTORS, limits: tuple = WINSOR_LIMITS) -> tuple:
+    """
+    inputs: security_id + each factor's input column. Returns (values, zscores, contributions), each a
+    security_id-indexed frame with one column per factor. Missing inputs score 0 (the universe mean), except
+    proximity factors: no event is a real 0 input, the lowest, so an upcoming event never lowers a score.
+    """
+    df = inputs.set_index("security_id")
+    values = pd.DataFrame(index=df.index)
+    for name, (col, transform, _) in factors.items():
+        x = pd.to_numeric(df[col], errors="coerce").astype("float64")
+        if transform == "proximity":
+            values[name] = (EARNINGS_HORIZON_DAYS - x).clip(lower=0).fillna(0.0)
+        else:
+            values[name] = x.abs() if transform == "abs" else x
+    lo, hi = values.quantile(limits[0]), values.quantile(limits[1])
+    clipped = values.clip(lo, hi, axis=1)
+    std = clipped.std(ddof=0).replace(0, np.nan)
+    z = ((clipped - clipped.mean()) / std).fillna(0.0)
+    weights = pd.Series({name: w for name, (_, _, w) in factors.items()})
+    return values, z, z * weights
+
+def job_feat_scores(as_of_date: date = None, publish: bool = True):
+    conn = get_connection()
+    cur = conn.cursor()
+    with job_run("feat_scores") as run:
+        with run.stage("score") as stage:
+            cur.execute("SELECT MAX(as_of_date) FROM feat.feat_returns WHERE as_of_date <= %s", (as_of_date or date.today(),))
+            latest = cur.fetchone()[0]
+            if latest is None:
+                print("No feat_returns yet; run feat_returns first.")
+                conn.close()
+                return
+            cur.execute(INPUTS_SQL, {"as_of": latest})
+            inputs = pd.DataFrame(cur.fetchall(), columns=[d[0] for d in cur.description])
+            stage.add(rows_read=len(inputs))
+            values, z, contrib = score_frame(inputs)
+            score = contrib.sum(axis=1)
+            rank = score.rank(ascending=False, method="first").astype(int)
+            top_factor = contrib.idxmax(axis=1).where(contrib.max(axis=1) > 0)
+            tickers = inputs.set_index("security_id")["ticker"]
+
+        with run.stage("write") as stage:
+            # Replace the date's rows: the factor set can change between runs
+            for table in ("feat.feat_scores", "feat.feat_score_contributions", "feat.feat_top_movers"):
+                cur.execute(f"DELETE FROM {table} WHERE as_of_date = %s", (latest,))
+            score_rows = [(int(sid), latest, _decimal(score[sid]), int(rank[sid]), top_factor[sid] if pd.notna(top_factor[sid]) else None)
+                          for sid in score.index]
+            execute_values(cur, "INSERT INTO feat.feat_scores (security_id, as_of_date, score, rank, top_factor) VALUES %s", score_rows, page_size=5000)
+            # future_stack keeps missing values (stored as NULL); zscores and contributions have none
+            long = pd.concat({"value": values.stack(future_stack=True), "zscore": z.stack(future_stack=True),
+                              "contribution": contrib.stack(future_stack=True)}, axis=1)
+            contrib_rows = [(int(sid), latest, factor, _decimal(None if pd.isna(r.value) else r.value), _decimal(r.zscore), _decimal(r.contribution))
+                            for (sid, factor), r in zip(long.index, long.itertuples(index=False))]
+            execute_values(cur, "INSERT INTO feat.feat_score_contributions (security_id, as_of_date, factor, value, zscore, contribution) VALUES %s",
+                           contrib_rows, page_size=5000)
+            top = rank[rank <= TOP_K].sort_values()
+            top_rows = [(latest, int(rank[sid]), int(sid), tickers[sid], _decimal(score[sid]),
+                         top_factor[sid] if pd.notna(top_factor[sid]) else None,
+                         _decimal(contrib.loc[sid].max()) if pd.notna(top_factor[sid]) else None)
+                        for sid in top.index]
+            if top_rows:
+                execute_values(cur, "INSERT INTO feat.feat_top_movers (as_of_date, rank, security_id, ticker, score, top_factor, top_contribution) VALUES %s", top_rows)
+            conn.commit()
+            stage.add(rows_inserted=len(score_rows) + len(contrib_rows) + len(top_rows))
+
+        if publish:
+            with run.stage("publish"):
+                publish_dashboard(conn, latest, FEAT_TABLES)
+    conn.close()
+
+if __name__ == "__main__":
+    job_feat_scores()
+    emit_profile_report("feat_scores")
@@ -10,7 +10,9 @@ import pandas as pd
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-from models.db import get_connection
+from models.db import get_connection, emit_profile_report, publish_data_version
+from models.ledger import job_run
+from jobs.ingest_simfin import load_shareprices
 
 def _load_prices_simfin(tickers: list) -> list:
     try:
@@ -19,10 +21,7 @@ def _load_prices_simfin(tickers: list) -> list:
         if api_key:
             simfin.set_api_key(api_key)
         simfin.set_data_dir(os.path.join(ROOT, "data", "simfin"))
-        loader = getattr(simfin, "load_shareprices", None) or getattr(simfin.load, "load_shareprices", None)
-        if loader is None:
-            return []
-        df = loader()
+        df = load_shareprices()
         if df is None or df.empty:
             return []
         tc = "Ticker" if "Ticker" in df.columns else "ticker"
@@ -32,37 +31,47 @@ def _load_prices_simfin(tickers: list) -> list:
         return []
 
 def job_ingest_benchmark_prices():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT id, ticker FROM core.core_benchmarks WHERE ticker IN ('SPY', 'QQQ')")
-    benchmarks = cur.fetchall()
-    tickers = [t for _, t in benchmarks]
-    rows = _load_prices_simfin(tickers)
-    if not rows:
+    with job_run("ingest_benchmarks") as run:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT id, ticker FROM core.core_benchmarks WHERE ticker IN ('SPY', 'QQQ')")
+        benchmarks = cur.fetchall()
+        tickers = [t for _, t in benchmarks]
+        with run.stage("load_simfin") as stage:
+            rows = _load_prices_simfin(tickers)
+            stage.add(rows_read=len(rows))
+        if not rows:
+            conn.close()
+            return
+        with run.stage("upsert_prices") as stage:
+            latest = None
+            for r in rows:
+                ticker = str(r.get("Ticker", r.get("ticker", ""))).strip()
+                dt = r.get("Date", r.get("date"))
+                close = r.get("Close", r.get("close"))
+                bid = next((b[0] for b in benchmarks if b[1] == ticker), None)
+                if not dt or close is None or not bid:
+                    stage.add(rows_skipped=1)
+                    continue
+                d = pd.to_datetime(dt).date() if hasattr(dt, "date") else dt
+                cur.execute(
+                    """
+                    INSERT INTO core.core_benchmark_prices_daily (benchmark_id, trade_date, close)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (benchmark_id, trade_date) DO UPDATE SET close = EXCLUDED.close
+                    RETURNING (xmax = 0)
+                    """,
+                    (bid, d, close),
+                )
+                inserted = cur.fetchone()[0]
+                stage.add(rows_inserted=int(inserted), rows_updated=int(not inserted))
+                latest = d if latest is None or d > latest else latest
+            conn.commit()
+            if latest:
+                stage.watermark("simfin.benchmark_prices", latest)
+        publish_data_version(conn, "core", tables=["core.core_benchmark_prices_daily"])
         conn.close()
-        return
-    for r in rows:
-        ticker = str(r.get("Ticker", r.get("ticker", ""))).strip()
-        dt = r.get("Date", r.get("date"))
-        if not dt:
-            continue
-        d = pd.to_datetime(dt).date() if hasattr(dt, "date") else dt
-        close = r.get("Close", r.get("close"))
-        if close is None:
-            continue
-        bid = next((b[0] for b in benchmarks if b[1] == ticker), None)
-        if not bid:
-            continue
-        cur.execute(
-            """
-            INSERT INTO core.core_benchmark_prices_daily (benchmark_id, trade_date, close)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (benchmark_id, trade_date) DO UPDATE SET close = EXCLUDED.close
-            """,
-            (bid, d, close),
-        )
-    conn.commit()
-    conn.close()
 
 if __name__ == "__main__":
     job_ingest_benchmark_prices()
+    emit_profile_report("ingest_benchmarks")
@@ -0,0 +1,122 @@
+"""
+Ingest corporate actions (splits, cash dividends): raw.raw_corporate_actions -> core.core_corporate_actions,
+then rebuild the adjustment factors and cached adj_close of the securities whose actions changed, and
+only those (models/adjustments.py).
+Source: SimFin's bulk share prices, which carry the dividend on its ex-date and an adjusted close.
+Splits are inferred where the close / adjusted close ratio steps by more than that day's dividend explains.
+"""
+import hashlib
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection, emit_profile_report, publish_data_version
+from models.adjustments import refresh_adjustments
+from models import price_cube
+from models.ledger import job_run
+from jobs.ingest_simfin import load_simfin_prices
+
+# A step in the adjustment ratio this far from 1 (after taking out the dividend) is a split
+SPLIT_MIN_STEP = 0.2
+
+ACTION_COLUMNS = ["ticker", "ex_date", "action_type", "split_ratio", "cash_amount"]
+
+def simfin_actions(prices: pd.DataFrame) -> pd.DataFrame:
+    """SimFin share prices (Ticker, Date, Close, Adj. Close, Dividend; any case) -> ACTION_COLUMNS rows."""
+    if prices.empty:
+        return pd.DataFrame(columns=ACTION_COLUMNS)
+    df = prices.rename(columns={c: c.lower() for c in prices.columns})
+    if "date" not in df.columns or "close" not in df.columns:
+        return pd.DataFrame(columns=ACTION_COLUMNS)
+    df = df.assign(date=pd.to_datetime(df["date"]).dt.date).sort_values(["ticker", "date"])
+    close = pd.to_numeric(df["close"], errors="coerce")
+    div = pd.to_numeric(df["dividend"], errors="coerce") if "dividend" in df.columns else pd.Series(np.nan, index=df.index)
+    out = [pd.DataFrame({"ticker": df["ticker"], "ex_date": df["date"], "action_type": "dividend",
+                         "split_ratio": None, "cash_amount": div})[div > 0]]
+    if "adj. close" in df.columns:
+        ratio = pd.to_numeric(df["adj. close"], errors="coerce") / close
+        g = df["ticker"]
+        # Factor carried by the closes before each date, net of that date's dividend
+        step = ratio.groupby(g).shift(1) / ratio
+        prev_close = close.groupby(g).shift(1)
+        step = step / (1 - div.fillna(0) / prev_close)
+        split = 1 / step
+        is_split = (split - 1).abs() > SPLIT_MIN_STEP
+        out.append(pd.DataFrame({"ticker": df["ticker"], "ex_date": df["date"], "action_type": "split",
+                                 "split_ratio": split.round(4), "cash_amount": None})[is_split & np.isfinite(split)])
+    return pd.concat(out, ignore_index=True)[ACTION_COLUMNS]
+
+def job_ingest_corporate_actions(tickers: list = None, actions: pd.DataFrame = None):
+    """actions: ACTION_COLUMNS rows to load instead of reading SimFin."""
+    if tickers is None:
+        from config.tickers import DEFAULT_TICKERS
+        tickers = DEFAULT_TICKERS
+    conn = get_connection()
+    asof = datetime.now(timezone.utc)
+    provider = "simfin"
+    with job_run("ingest_corporate_actions") as run:
+        with run.stage("actions_raw") as stage:
+            if actions is None:
+                actions = simfin_actions(load_simfin_prices(tickers))
+            stage.add(rows_read=len(actions))
+            rows = []
+            for r in actions.itertuples(index=False):
+                split = None if pd.isna(r.split_ratio) else float(r.split_ratio)
+                cash = None if pd.isna(r.cash_amount) else float(r.cash_amount)
+                source_hash = hashlib.sha256(f"{r.ticker}|{r.ex_date}|{r.action_type}|{split}|{cash}".encode()).hexdigest()[:32]
+                rows.append((provider, asof, source_hash, r.ticker, r.ex_date, r.action_type, split, cash))
+            with conn.cursor() as cur:
+                # cur.rowcount only covers the last page; count the RETURNING rows of every page instead
+                inserted = len(execute_values(cur, """
+                    INSERT INTO raw.raw_corporate_actions (provider, asof_loaded_at, source_hash, ticker, ex_date, action_type, split_ratio, cash_amount)
+                    VALUES %s ON CONFLICT (ticker, ex_date, action_type, source_hash) DO NOTHING
+                    RETURNING 1
+                """, rows, page_size=5000, fetch=True))
+                stage.add(rows_inserted=inserted, rows_skipped=len(rows) - inserted)
+            conn.commit()
+
+        with run.stage("actions_core") as stage:
+            # Latest raw row per action over every load, not just this run's: a run that died after the raw
+            # commit left rows a rerun won't insert again. IS DISTINCT FROM keeps affected to real changes.
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO core.core_corporate_actions (security_id, ex_date, action_type, split_ratio, cash_amount)
+                    SELECT DISTINCT ON (m.id, r.ex_date, r.action_type) m.id, r.ex_date, r.action_type, r.split_ratio, r.cash_amount
+                    FROM raw.raw_corporate_actions r
+                    JOIN core.core_security_master m ON m.ticker = r.ticker
+                    WHERE r.provider = %s
+                    ORDER BY m.id, r.ex_date, r.action_type, r.id DESC
+                    ON CONFLICT (security_id, ex_date, action_type) DO UPDATE SET
+                        split_ratio = EXCLUDED.split_ratio, cash_amount = EXCLUDED.cash_amount, updated_at = NOW()
+                    WHERE (core_corporate_actions.split_ratio, core_corporate_actions.cash_amount)
+                          IS DISTINCT FROM (EXCLUDED.split_ratio, EXCLUDED.cash_amount)
+                    RETURNING security_id
+                """, (provider,))
+                affected = sorted({r[0] for r in cur.fetchall()})
+                stage.add(rows_updated=len(affected))
+            conn.commit()
+
+        with run.stage("adjust_prices") as stage:
+            with conn.cursor() as cur:
+                stage.add(rows_updated=refresh_adjustments(cur, affected))
+            conn.commit()
+        if affected:
+            with run.stage("price_cube") as stage:
+                version = price_cube.append(conn, reload_ids=affected)
+                if version:
+                    stage.watermark("price_cube", version)
+            publish_data_version(conn, "core", tables=["core.core_corporate_actions", "core.core_adjustment_factors", "core.core_prices_daily"])
+    conn.close()
+    print(f"ingest_corporate_actions: {len(affected)} securities re-adjusted")
+    return affected
+
+if __name__ == "__main__":
+    job_ingest_corporate_actions()
+    emit_profile_report("ingest_corporate_actions")
@@ -14,7 +14,8 @@ import requests
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-from models.db import get_connection
+from models.db import get_connection, emit_profile_report, publish_data_version
+from models.ledger import job_run
 
 SEC_USER_AGENT = "EquityInfraMVP contact@example.com"
 SEC_BASE = "https://data.sec.gov"
@@ -22,29 +23,29 @@ SEC_BASE = "https://data.sec.gov"
 def _source_hash(data: dict) -> str:
     return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()[:32]
 
-def fetch_companyfacts(cik: str) -> dict | None:
-    """Fetch companyfacts JSON for a CIK (10-digit padded)."""
+def _get_json(url: str) -> tuple:
+    """GET a data.sec.gov JSON document. Returns (data, bytes); data is None for 404 (no filings). Other errors raise."""
+    r = requests.get(url, headers={"User-Agent": SEC_USER_AGENT}, timeout=30)
+    if r.status_code == 404:
+        return None, len(r.content)
+    r.raise_for_status()
+    return r.json(), len(r.content)
+
+def fetch_companyfacts(cik: str) -> tuple:
+    """Fetch companyfacts JSON for a CIK (10-digit padded). Returns (data, bytes)."""
     cik_pad = cik.zfill(10)
-    url = f"{SEC_BASE}/api/xbrl/companyfacts/CIK{cik_pad}.json"
-    try:
-        r = requests.get(url, headers={"User-Agent": SEC_USER_AGENT}, timeout=30)
-        r.raise_for_status()
-        return r.json()
-    except Exception:
-        return None
+    return _get_json(f"{SEC_BASE}/api/xbrl/companyfacts/CIK{cik_pad}.json")
 
-def fetch_submissions(cik: str) -> dict | None:
-    """Fetch submissions (filing history) JSON for a CIK."""
+def fetch_submissions(cik: str) -> tuple:
+    """Fetch submissions (filing history) JSON for a CIK. Returns (data, bytes)."""
     cik_pad = cik.zfill(10)
-    url = f"{SEC_BASE}/api/submissions/CIK{cik_pad}.json"
-    try:
-        r = requests.get(url, headers={"User-Agent": SEC_USER_AGENT}, timeout=30)
-        r.raise_for_status()
-        return r.json()
-    except Exception:
-        return None
+    return _get_json(f"{SEC_BASE}/api/submissions/CIK{cik_pad}.json")
 
 def job_ingest_sec_companyfacts(tickers: list = None):
+    """
+    Load companyfacts + submissions for each mapped ticker. Fetch failures are counted in the job ledger
+    and the remaining tickers still load; the job raises at the end if any fetch failed.
+    """
     if tickers is None:
         from config.tickers import DEFAULT_TICKERS
         tickers = DEFAULT_TICKERS
@@ -53,47 +54,69 @@ def job_ingest_sec_companyfacts(tickers: list = None):
     conn = get_connection()
     asof = datetime.utcnow()
     provider = "sec"
+    ciks = [(t, TICKER_TO_CIK[t]) for t in tickers if TICKER_TO_CIK.get(t)]
 
-    for ticker in tickers:
-        cik = TICKER_TO_CIK.get(ticker)
-        if not cik:
-            continue
+    with job_run("ingest_sec") as run:
         # Company facts
-        data = fetch_companyfacts(cik)
-        if data:
-            cik_pad = cik.zfill(10)
-            payload = json.dumps(data) if isinstance(data, dict) else data
-            entity_name = (data.get("entityName") or data.get("entity", {}).get("name") or ticker) if isinstance(data, dict) else ticker
-            sh = _source_hash(data) if isinstance(data, dict) else hashlib.sha256(str(data).encode()).hexdigest()[:32]
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO raw.raw_sec_companyfacts (provider, asof_loaded_at, source_hash, payload, cik, entity_name)
-                    VALUES (%s, %s, %s, %s::jsonb, %s, %s)
-                    ON CONFLICT (cik, source_hash) DO NOTHING
-                    """,
-                    (provider, asof, sh, json.dumps(data) if isinstance(data, dict) else payload, cik_pad, entity_name),
-                )
-            conn.commit()
-        time.sleep(0.2)
+        with run.stage("companyfacts") as stage:
+            for ticker, cik in ciks:
+                try:
+                    data, nbytes = fetch_companyfacts(cik)
+                except (requests.RequestException, ValueError) as e:
+                    stage.error(f"{ticker}: {e}")
+                    time.sleep(0.2)
+                    continue
+                stage.add(bytes_fetched=nbytes)
+                if data:
+                    stage.add(rows_read=1)
+                    cik_pad = cik.zfill(10)
+                    entity_name = data.get("entityName") or data.get("entity", {}).get("name") or ticker
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            INSERT INTO raw.raw_sec_companyfacts (provider, asof_loaded_at, source_hash, payload, cik, entity_name)
+                            VALUES (%s, %s, %s, %s::jsonb, %s, %s)
+                            ON CONFLICT (cik, source_hash) DO NOTHING
+                            """,
+                            (provider, asof, _source_hash(data), json.dumps(data), cik_pad, entity_name),
+                        )
+                        stage.add(rows_inserted=cur.rowcount, rows_skipped=1 - cur.rowcount)
+                    conn.commit()
+                time.sleep(0.2)
+            stage.watermark("sec.companyfacts", asof)
+
         # Submissions (filing history)
-        sub = fetch_submissions(cik)
-        if sub:
-            sh = _source_hash(sub) if isinstance(sub, dict) else hashlib.sha256(str(sub).encode()).hexdigest()[:32]
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO raw.raw_sec_submissions (provider, asof_loaded_at, source_hash, payload, cik)
-                    VALUES (%s, %s, %s, %s::jsonb, %s)
-                    ON CONFLICT (cik, source_hash) DO NOTHING
-                    """,
-                    (provider, asof, sh, json.dumps(sub), cik.zfill(10)),
-                )
-            conn.commit()
-        time.sleep(0.2)
+        with run.stage("submissions") as stage:
+            for ticker, cik in ciks:
+                try:
+                    sub, nbytes = fetch_submissions(cik)
+                except (requests.RequestException, ValueError) as e:
+                    stage.error(f"{ticker}: {e}")
+                    time.sleep(0.2)
+                    continue
+                stage.add(bytes_fetched=nbytes)
+                if sub:
+                    stage.add(rows_read=1)
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            INSERT INTO raw.raw_sec_submissions (provider, asof_loaded_at, source_hash, payload, cik)
+                            VALUES (%s, %s, %s, %s::jsonb, %s)
+                            ON CONFLICT (cik, source_hash) DO NOTHING
+                            """,
+                            (provider, asof, _source_hash(sub), json.dumps(sub), cik.zfill(10)),
+                        )
+                        stage.add(rows_inserted=cur.rowcount, rows_skipped=1 - cur.rowcount)
+                    conn.commit()
+                time.sleep(0.2)
+            stage.watermark("sec.submissions", asof)
 
-    conn.close()
+        publish_data_version(conn, "raw", tables=["raw.raw_sec_companyfacts", "raw.raw_sec_submissions"])
+        conn.close()
+        if run.errors:
+            raise RuntimeError(f"{run.errors} SEC fetch(es) failed; see ops.job_stage for run {run.id}")
     return True
 
 if __name__ == "__main__":
     job_ingest_sec_companyfacts()
+    emit_profile_report("ingest_sec")
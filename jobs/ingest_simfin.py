@@ -6,6 +6,7 @@ import os
 import sys
 import hashlib
 import json
+import threading
 from datetime import datetime
 
 import pandas as pd
@@ -13,7 +14,11 @@ import pandas as pd
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-from models.db import get_connection
+from models.db import get_connection, emit_profile_report, publish_data_version
+from models.adjustments import FACTOR_JOIN, ADJ_CLOSE
+from models import price_cube
+from models.ledger import job_run, upsert_counts
+from models.partitions import ensure_partitions
 
 def _source_hash(rows: list, keys: list) -> str:
     raw = json.dumps(rows, sort_keys=True, default=str)
@@ -30,6 +35,19 @@ def _ensure_simfin_config():
     except Exception:
         pass
 
+# simfin.load_shareprices() downloads one bulk zip into data/simfin and extracts it there; stages the
+# pipeline runs in parallel (ingest_simfin, ingest_benchmarks, ingest_corporate_actions) take turns
+_SHAREPRICES_LOCK = threading.Lock()
+
+def load_shareprices():
+    """The bulk SimFin share prices frame (None without a loader), one download at a time per process."""
+    import simfin
+    loader = getattr(simfin, "load_shareprices", None) or getattr(simfin.load, "load_shareprices", None)
+    if loader is None:
+        return None
+    with _SHAREPRICES_LOCK:
+        return loader()
+
 def load_simfin_fundamentals(tickers: list) -> tuple:
     """Load income, balance, cashflow, shares from SimFin. Returns (income_df, balance_df, cashflow_df, shares_df) or None for missing."""
     _ensure_simfin_config()
@@ -42,7 +60,7 @@ def load_simfin_fundamentals(tickers: list) -> tuple:
             ("income", getattr(simfin, "load_income", None) or getattr(simfin.load, "load_income", None)),
             ("balance", getattr(simfin, "load_balance", None) or getattr(simfin.load, "load_balance", None)),
             ("cashflow", getattr(simfin, "load_cashflow", None) or getattr(simfin.load, "load_cashflow", None)),
-            ("shares", getattr(simfin, "load_shareprices", None) or getattr(simfin.load, "load_shareprices", None)),
+            ("shares", load_shareprices),
         ]:
             if loader is None:
                 continue
@@ -67,11 +85,7 @@ def load_simfin_fundamentals(tickers: list) -> tuple:
 def load_simfin_prices(tickers: list) -> pd.DataFrame:
     _ensure_simfin_config()
     try:
-        import simfin
-        loader = getattr(simfin, "load_shareprices", None) or getattr(simfin.load, "load_shareprices", None)
-        if loader is None:
-            return pd.DataFrame()
-        df = loader()
+        df = load_shareprices()
         if df is not None and not df.empty and "Ticker" in df.columns:
             return df[df["Ticker"].isin(tickers)].copy()
         if df is not None and not df.empty and "ticker" in df.columns:
@@ -86,202 +100,229 @@ def job_ingest_simfin(tickers: list = None):
         tickers = DEFAULT_TICKERS
 
     conn = get_connection()
+    ensure_partitions(conn)
     asof = datetime.utcnow()
     provider = "simfin"
 
-    # --- Prices (most important for MVP) ---
-    prices_df = load_simfin_prices(tickers)
-    if not prices_df.empty:
-        # Normalize column names (SimFin uses Title Case sometimes)
-        col_map = {c: c.lower() for c in prices_df.columns}
-        prices_df = prices_df.rename(columns=col_map)
-        date_col = "date" if "date" in prices_df.columns else "trade date"
-        ticker_col = "ticker" if "ticker" in prices_df.columns else "Ticker"
-        if date_col not in prices_df.columns and "trade date" in prices_df.columns:
-            date_col = "trade date"
-        if ticker_col not in prices_df.columns:
-            ticker_col = [c for c in prices_df.columns if "tick" in c.lower()][0] if any("tick" in c.lower() for c in prices_df.columns) else prices_df.columns[0]
-        for _, row in prices_df.iterrows():
-            ticker = str(row.get(ticker_col, "")).strip()
-            dt = row.get(date_col)
-            if pd.isna(dt):
-                continue
-            d = pd.to_datetime(dt).date() if hasattr(dt, "date") else dt
-            source_hash = hashlib.sha256(f"{ticker}|{d}|{row.get('close', row.get('Close', ''))}".encode()).hexdigest()[:32]
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO raw.raw_prices_daily (provider, asof_loaded_at, source_hash, ticker, trade_date, open, high, low, close, volume)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (ticker, trade_date, source_hash) DO NOTHING
-                    """,
-                    (
-                        provider,
-                        asof,
-                        source_hash,
-                        ticker,
-                        d,
-                        row.get("open", row.get("Open")),
-                        row.get("high", row.get("High")),
-                        row.get("low", row.get("Low")),
-                        row.get("close", row.get("Close")),
-                        row.get("volume", row.get("Volume")),
-                    ),
-                )
-        conn.commit()
+    with job_run("ingest_simfin") as run:
+        # --- Prices (most important for MVP) ---
+        with run.stage("prices_raw") as stage:
+            prices_df = load_simfin_prices(tickers)
+            stage.add(rows_read=len(prices_df))
+            if not prices_df.empty:
+                # Normalize column names (SimFin uses Title Case sometimes)
+                col_map = {c: c.lower() for c in prices_df.columns}
+                prices_df = prices_df.rename(columns=col_map)
+                date_col = "date" if "date" in prices_df.columns else "trade date"
+                ticker_col = "ticker" if "ticker" in prices_df.columns else "Ticker"
+                if date_col not in prices_df.columns and "trade date" in prices_df.columns:
+                    date_col = "trade date"
+                if ticker_col not in prices_df.columns:
+                    ticker_col = [c for c in prices_df.columns if "tick" in c.lower()][0] if any("tick" in c.lower() for c in prices_df.columns) else prices_df.columns[0]
+                for _, row in prices_df.iterrows():
+                    ticker = str(row.get(ticker_col, "")).strip()
+                    dt = row.get(date_col)
+                    if pd.isna(dt):
+                        continue
+                    d = pd.to_datetime(dt).date() if hasattr(dt, "date") else dt
+                    source_hash = hashlib.sha256(f"{ticker}|{d}|{row.get('close', row.get('Close', ''))}".encode()).hexdigest()[:32]
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            INSERT INTO raw.raw_prices_daily (provider, asof_loaded_at, source_hash, ticker, trade_date, open, high, low, close, volume)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            ON CONFLICT (ticker, trade_date, source_hash) DO NOTHING
+                            """,
+                            (
+                                provider,
+                                asof,
+                                source_hash,
+                                ticker,
+                                d,
+                                row.get("open", row.get("Open")),
+                                row.get("high", row.get("High")),
+                                row.get("low", row.get("Low")),
+                                row.get("close", row.get("Close")),
+                                row.get("volume", row.get("Volume")),
+                            ),
+                        )
+                        stage.add(rows_inserted=cur.rowcount, rows_skipped=1 - cur.rowcount)
+                conn.commit()
 
         # Core prices: upsert from raw by security_id
-        with conn.cursor() as cur:
-            cur.execute("""
-                INSERT INTO core.core_prices_daily (security_id, trade_date, open, high, low, close, volume)
-                SELECT m.id, r.trade_date, r.open, r.high, r.low, r.close, r.volume
-                FROM raw.raw_prices_daily r
-                JOIN core.core_security_master m ON m.ticker = r.ticker
-                WHERE r.provider = %s
-                ON CONFLICT (security_id, trade_date) DO UPDATE SET
-                    open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
-                    close = EXCLUDED.close, volume = EXCLUDED.volume
-            """, (provider,))
-        conn.commit()
+        if not prices_df.empty:
+            with run.stage("prices_core") as stage:
+                with conn.cursor() as cur:
+                    # adj_close from the security's current adjustment factors (jobs/ingest_corporate_actions.py)
+                    inserted, updated = upsert_counts(cur, f"""
+                        INSERT INTO core.core_prices_daily (security_id, trade_date, open, high, low, close, adj_close, volume)
+                        SELECT m.id, r.trade_date, r.open, r.high, r.low, r.close, {ADJ_CLOSE.format(close="r.close")}, r.volume
+                        FROM raw.raw_prices_daily r
+                        JOIN core.core_security_master m ON m.ticker = r.ticker
+                        {FACTOR_JOIN.format(security_id="m.id", trade_date="r.trade_date")}
+                        WHERE r.provider = %s
+                        ON CONFLICT (security_id, trade_date) DO UPDATE SET
+                            open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                            close = EXCLUDED.close, adj_close = EXCLUDED.adj_close, volume = EXCLUDED.volume
+                    """, (provider,))
+                    stage.add(rows_inserted=inserted, rows_updated=updated)
+                    cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily")
+                    latest = cur.fetchone()[0]
+                conn.commit()
+                if latest:
+                    stage.watermark("simfin.prices", latest)
+            with run.stage("price_cube") as stage:
+                version = price_cube.append(conn)
+                if version:
+                    stage.watermark("price_cube", version)
 
-    # --- Fundamentals (income, balance, cashflow, shares) ---
-    income_df, balance_df, cashflow_df, shares_df = load_simfin_fundamentals(tickers)
+        # --- Fundamentals (income, balance, cashflow, shares) ---
+        with run.stage("fundamentals_raw") as stage:
+            income_df, balance_df, cashflow_df, shares_df = load_simfin_fundamentals(tickers)
+            stage.add(rows_read=sum(len(df) for df in (income_df, balance_df, cashflow_df, shares_df) if df is not None))
 
-    def _quarterly_to_raw(df, table: str, row_to_vals):
-        if df is None or df.empty:
-            return
-        for _, row in df.iterrows():
-            vals = row_to_vals(row)
-            if vals is None:
-                continue
-            with conn.cursor() as cur:
-                cur.execute(
-                    f"""
-                    INSERT INTO raw.{table} (provider, asof_loaded_at, source_hash, payload, {", ".join(v[0] for v in vals)})
-                    VALUES (%s, %s, %s, %s, {", ".join("%s" for _ in vals)})
-                    ON CONFLICT DO NOTHING
-                    """,
-                    (provider, asof, _source_hash([row.to_dict()], ["ticker", "period"]), json.dumps(row.to_dict(), default=str), *[v[1] for v in vals]),
-                )
-        conn.commit()
+            def _quarterly_to_raw(df, table: str, row_to_vals):
+                if df is None or df.empty:
+                    return
+                for _, row in df.iterrows():
+                    vals = row_to_vals(row)
+                    if vals is None:
+                        continue
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            f"""
+                            INSERT INTO raw.{table} (provider, asof_loaded_at, source_hash, payload, {", ".join(v[0] for v in vals)})
+                            VALUES (%s, %s, %s, %s, {", ".join("%s" for _ in vals)})
+                            ON CONFLICT DO NOTHING
+                            """,
+                            (provider, asof, _source_hash([row.to_dict()], ["ticker", "period"]), json.dumps(row.to_dict(), default=str), *[v[1] for v in vals]),
+                        )
+                conn.commit()
 
-    # Map SimFin column names (they use mixed case)
-    def _num(x):
-        if pd.isna(x):
-            return None
-        try:
-            return int(float(x))
-        except (ValueError, TypeError):
-            return None
+            # Map SimFin column names (they use mixed case)
+            def _num(x):
+                if pd.isna(x):
+                    return None
+                try:
+                    return int(float(x))
+                except (ValueError, TypeError):
+                    return None
 
-    if income_df is not None and not income_df.empty:
-        ticker_col = "Ticker" if "Ticker" in income_df.columns else "ticker"
-        period_col = "Report Date" if "Report Date" in income_df.columns else "Period End Date" if "Period End Date" in income_df.columns else "period"
-        for _, row in income_df.iterrows():
-            ticker = str(row.get(ticker_col, "")).strip()
-            period = row.get(period_col)
-            if pd.isna(period):
-                continue
-            period = pd.to_datetime(period).date() if hasattr(period, "date") else period
-            sh = _source_hash([{"t": ticker, "p": str(period)}], ["t", "p"])
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO raw.raw_simfin_income_q (provider, asof_loaded_at, source_hash, ticker, period, revenue, net_income)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (ticker, period, source_hash) DO NOTHING
-                    """,
-                    (provider, asof, sh, ticker, period, _num(row.get("Revenue", row.get("revenue"))), _num(row.get("Net Income", row.get("net_income")))),
-                )
-        conn.commit()
+            if income_df is not None and not income_df.empty:
+                ticker_col = "Ticker" if "Ticker" in income_df.columns else "ticker"
+                period_col = "Report Date" if "Report Date" in income_df.columns else "Period End Date" if "Period End Date" in income_df.columns else "period"
+                for _, row in income_df.iterrows():
+                    ticker = str(row.get(ticker_col, "")).strip()
+                    period = row.get(period_col)
+                    if pd.isna(period):
+                        continue
+                    period = pd.to_datetime(period).date() if hasattr(period, "date") else period
+                    sh = _source_hash([{"t": ticker, "p": str(period)}], ["t", "p"])
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            INSERT INTO raw.raw_simfin_income_q (provider, asof_loaded_at, source_hash, ticker, period, revenue, net_income)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s)
+                            ON CONFLICT (ticker, period, source_hash) DO NOTHING
+                            """,
+                            (provider, asof, sh, ticker, period, _num(row.get("Revenue", row.get("revenue"))), _num(row.get("Net Income", row.get("net_income")))),
+                        )
+                        stage.add(rows_inserted=cur.rowcount, rows_skipped=1 - cur.rowcount)
+                conn.commit()
 
-    if balance_df is not None and not balance_df.empty:
-        ticker_col = "Ticker" if "Ticker" in balance_df.columns else "ticker"
-        period_col = "Report Date" if "Report Date" in balance_df.columns else "Period End Date" if "Period End Date" in balance_df.columns else "period"
-        for _, row in balance_df.iterrows():
-            ticker = str(row.get(ticker_col, "")).strip()
-            period = row.get(period_col)
-            if pd.isna(period):
-                continue
-            period = pd.to_datetime(period).date() if hasattr(period, "date") else period
-            sh = _source_hash([{"t": ticker, "p": str(period)}], ["t", "p"])
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO raw.raw_simfin_balance_q (provider, asof_loaded_at, source_hash, ticker, period, total_assets, total_liabilities, total_equity, cash_and_equivalents, total_debt)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (ticker, period, source_hash) DO NOTHING
-                    """,
-                    (
-                        provider, asof, sh, ticker, period,
-                        _num(row.get("Total Assets", row.get("total_assets"))),
-                        _num(row.get("Total Liabilities", row.get("total_liabilities"))),
-                        _num(row.get("Total Equity", row.get("total_equity"))),
-                        _num(row.get("Cash and Equivalents", row.get("cash_and_equivalents"))),
-                        _num(row.get("Total Debt", row.get("total_debt"))),
-                    ),
-                )
-        conn.commit()
+            if balance_df is not None and not balance_df.empty:
+                ticker_col = "Ticker" if "Ticker" in balance_df.columns else "ticker"
+                period_col = "Report Date" if "Report Date" in balance_df.columns else "Period End Date" if "Period End Date" in balance_df.columns else "period"
+                for _, row in balance_df.iterrows():
+                    ticker = str(row.get(ticker_col, "")).strip()
+                    period = row.get(period_col)
+                    if pd.isna(period):
+                        continue
+                    period = pd.to_datetime(period).date() if hasattr(period, "date") else period
+                    sh = _source_hash([{"t": ticker, "p": str(period)}], ["t", "p"])
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            INSERT INTO raw.raw_simfin_balance_q (provider, asof_loaded_at, source_hash, ticker, period, total_assets, total_liabilities, total_equity, cash_and_equivalents, total_debt)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            ON CONFLICT (ticker, period, source_hash) DO NOTHING
+                            """,
+                            (
+                                provider, asof, sh, ticker, period,
+                                _num(row.get("Total Assets", row.get("total_assets"))),
+                                _num(row.get("Total Liabilities", row.get("total_liabilities"))),
+                                _num(row.get("Total Equity", row.get("total_equity"))),
+                                _num(row.get("Cash and Equivalents", row.get("cash_and_equivalents"))),
+                                _num(row.get("Total Debt", row.get("total_debt"))),
+                            ),
+                        )
+                        stage.add(rows_inserted=cur.rowcount, rows_skipped=1 - cur.rowcount)
+                conn.commit()
 
-    if cashflow_df is not None and not cashflow_df.empty:
-        ticker_col = "Ticker" if "Ticker" in cashflow_df.columns else "ticker"
-        period_col = "Report Date" if "Report Date" in cashflow_df.columns else "Period End Date" if "Period End Date" in cashflow_df.columns else "period"
-        for _, row in cashflow_df.iterrows():
-            ticker = str(row.get(ticker_col, "")).strip()
-            period = row.get(period_col)
-            if pd.isna(period):
-                continue
-            period = pd.to_datetime(period).date() if hasattr(period, "date") else period
-            sh = _source_hash([{"t": ticker, "p": str(period)}], ["t", "p"])
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO raw.raw_simfin_cashflow_q (provider, asof_loaded_at, source_hash, ticker, period, operating_cashflow, free_cashflow)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (ticker, period, source_hash) DO NOTHING
-                    """,
-                    (provider, asof, sh, ticker, period,
-                     _num(row.get("Operating Cash Flow", row.get("operating_cashflow"))),
-                     _num(row.get("Free Cash Flow", row.get("free_cashflow")))),
-                )
-        conn.commit()
+            if cashflow_df is not None and not cashflow_df.empty:
+                ticker_col = "Ticker" if "Ticker" in cashflow_df.columns else "ticker"
+                period_col = "Report Date" if "Report Date" in cashflow_df.columns else "Period End Date" if "Period End Date" in cashflow_df.columns else "period"
+                for _, row in cashflow_df.iterrows():
+                    ticker = str(row.get(ticker_col, "")).strip()
+                    period = row.get(period_col)
+                    if pd.isna(period):
+                        continue
+                    period = pd.to_datetime(period).date() if hasattr(period, "date") else period
+                    sh = _source_hash([{"t": ticker, "p": str(period)}], ["t", "p"])
+                    with conn.cursor() as cur:
+                        cur.execute(
+                            """
+                            INSERT INTO raw.raw_simfin_cashflow_q (provider, asof_loaded_at, source_hash, ticker, period, operating_cashflow, free_cashflow)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s)
+                            ON CONFLICT (ticker, period, source_hash) DO NOTHING
+                            """,
+                            (provider, asof, sh, ticker, period,
+                             _num(row.get("Operating Cash Flow", row.get("operating_cashflow"))),
+                             _num(row.get("Free Cash Flow", row.get("free_cashflow")))),
+                        )
+                        stage.add(rows_inserted=cur.rowcount, rows_skipped=1 - cur.rowcount)
+                conn.commit()
 
-    # Upsert core_fundamentals_quarterly from raw (income as driver; attach balance/cashflow/shares by ticker+period)
-    with conn.cursor() as cur:
-        cur.execute("""
-            WITH inc AS (
-                SELECT DISTINCT ON (ticker, period) ticker, period, report_date, revenue, net_income
-                FROM raw.raw_simfin_income_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
-            ),
-            bal AS (
-                SELECT DISTINCT ON (ticker, period) ticker, period, total_assets, total_liabilities, total_equity, cash_and_equivalents, total_debt
-                FROM raw.raw_simfin_balance_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
-            ),
-            cf AS (
-                SELECT DISTINCT ON (ticker, period) ticker, period, operating_cashflow, free_cashflow
-                FROM raw.raw_simfin_cashflow_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
-            ),
-            sh AS (
-                SELECT DISTINCT ON (ticker, period) ticker, period, shares_diluted
-                FROM raw.raw_simfin_shares_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
-            )
-            INSERT INTO core.core_fundamentals_quarterly (security_id, period_end, report_date, revenue, net_income, total_assets, total_liabilities, total_equity, cash_and_equivalents, total_debt, operating_cashflow, free_cashflow, shares_diluted)
-            SELECT m.id, i.period, i.report_date, i.revenue, i.net_income, b.total_assets, b.total_liabilities, b.total_equity, b.cash_and_equivalents, b.total_debt, c.operating_cashflow, c.free_cashflow, s.shares_diluted
-            FROM inc i
-            JOIN core.core_security_master m ON m.ticker = i.ticker
-            LEFT JOIN bal b ON b.ticker = i.ticker AND b.period = i.period
-            LEFT JOIN cf c ON c.ticker = i.ticker AND c.period = i.period
-            LEFT JOIN sh s ON s.ticker = i.ticker AND s.period = i.period
-            ON CONFLICT (security_id, period_end) DO UPDATE SET
-                revenue = EXCLUDED.revenue, net_income = EXCLUDED.net_income, total_assets = EXCLUDED.total_assets,
-                total_liabilities = EXCLUDED.total_liabilities, total_equity = EXCLUDED.total_equity,
-                cash_and_equivalents = EXCLUDED.cash_and_equivalents, total_debt = EXCLUDED.total_debt,
-                operating_cashflow = EXCLUDED.operating_cashflow, free_cashflow = EXCLUDED.free_cashflow,
-                shares_diluted = EXCLUDED.shares_diluted
-        """, (provider, provider, provider, provider))
-    conn.commit()
-    conn.close()
+        with run.stage("fundamentals_core") as stage:
+            # Upsert core_fundamentals_quarterly from raw (income as driver; attach balance/cashflow/shares by ticker+period)
+            with conn.cursor() as cur:
+                inserted, updated = upsert_counts(cur, """
+                    WITH inc AS (
+                        SELECT DISTINCT ON (ticker, period) ticker, period, report_date, revenue, net_income
+                        FROM raw.raw_simfin_income_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
+                    ),
+                    bal AS (
+                        SELECT DISTINCT ON (ticker, period) ticker, period, total_assets, total_liabilities, total_equity, cash_and_equivalents, total_debt
+                        FROM raw.raw_simfin_balance_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
+                    ),
+                    cf AS (
+                        SELECT DISTINCT ON (ticker, period) ticker, period, operating_cashflow, free_cashflow
+                        FROM raw.raw_simfin_cashflow_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
+                    ),
+                    sh AS (
+                        SELECT DISTINCT ON (ticker, period) ticker, period, shares_diluted
+                        FROM raw.raw_simfin_shares_q WHERE provider = %s ORDER BY ticker, period, asof_loaded_at DESC
+                    )
+                    INSERT INTO core.core_fundamentals_quarterly (security_id, period_end, report_date, revenue, net_income, total_assets, total_liabilities, total_equity, cash_and_equivalents, total_debt, operating_cashflow, free_cashflow, shares_diluted)
+                    SELECT m.id, i.period, i.report_date, i.revenue, i.net_income, b.total_assets, b.total_liabilities, b.total_equity, b.cash_and_equivalents, b.total_debt, c.operating_cashflow, c.free_cashflow, s.shares_diluted
+                    FROM inc i
+                    JOIN core.core_security_master m ON m.ticker = i.ticker
+                    LEFT JOIN bal b ON b.ticker = i.ticker AND b.period = i.period
+                    LEFT JOIN cf c ON c.ticker = i.ticker AND c.period = i.period
+                    LEFT JOIN sh s ON s.ticker = i.ticker AND s.period = i.period
+                    ON CONFLICT (security_id, period_end) DO UPDATE SET
+                        revenue = EXCLUDED.revenue, net_income = EXCLUDED.net_income, total_assets = EXCLUDED.total_assets,
+                        total_liabilities = EXCLUDED.total_liabilities, total_equity = EXCLUDED.total_equity,
+                        cash_and_equivalents = EXCLUDED.cash_and_equivalents, total_debt = EXCLUDED.total_debt,
+                        operating_cashflow = EXCLUDED.operating_cashflow, free_cashflow = EXCLUDED.free_cashflow,
+                        shares_diluted = EXCLUDED.shares_diluted
+                """, (provider, provider, provider, provider))
+                stage.add(rows_inserted=inserted, rows_updated=updated)
+            conn.commit()
+        publish_data_version(conn, "core", tables=["core.core_prices_daily", "core.core_fundamentals_quarterly"])
+        conn.close()
     return True
 
 if __name__ == "__main__":
     job_ingest_simfin()
+    emit_profile_report("ingest_simfin")
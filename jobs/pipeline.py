@@ -0,0 +1,361 @@
+"""
+Pipeline runner, as a DAG: bootstrap -> ingest (SimFin, SEC, benchmarks in parallel) -> corporate actions ->
+data-quality scan -> feature jobs (returns, peer-relative, revisions, RPO, portfolio risk, event study,
+attribution, scores) -> one publish of the dashboard read model; raw compaction runs alongside.
+The ingests overlap except for the bulk SimFin share-price download, which the SimFin, benchmark and
+corporate-action ingests share and take turns on (jobs/ingest_simfin.py load_shareprices).
+Feature jobs run with publish=False, so the app only ever sees the read model of a finished run.
+A stage runs once all its dependencies have finished. It is skipped when the fingerprint of its inputs
+(config, SQL files, source watermarks) matches its last successful run. State lives in ops.pipeline_stage_state.
+Usage: python jobs/pipeline.py [--from STAGE | --resume] [--only a,b] [--force] [--dry-run] [--workers N]
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date, datetime, timezone
+
+import psycopg2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection, emit_profile_report
+
+def _hash(*parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:32]
+
+def _sql_files() -> list:
+    sql_dir = os.path.join(ROOT, "sql")
+    out = []
+    for name in sorted(os.listdir(sql_dir)):
+        with open(os.path.join(sql_dir, name), "rb") as f:
+            out.append((name, hashlib.sha256(f.read()).hexdigest()))
+    return out
+
+# --- Input fingerprints (conn -> str). External sources refresh daily, so their watermark is the date. ---
+
+def _fp_bootstrap(conn) -> str:
+    from config.tickers import DEFAULT_TICKERS
+    from config.cik_map import TICKER_TO_CIK
+    from config.benchmarks import BENCHMARKS
+    return _hash(_sql_files(), DEFAULT_TICKERS, TICKER_TO_CIK, BENCHMARKS)
+
+def _fp_ingest_simfin(conn) -> str:
+    from config.tickers import DEFAULT_TICKERS
+    return _hash(DEFAULT_TICKERS, date.today())
+
+def _fp_ingest_sec(conn) -> str:
+    from config.tickers import DEFAULT_TICKERS
+    from config.cik_map import TICKER_TO_CIK
+    return _hash(DEFAULT_TICKERS, TICKER_TO_CIK, date.today())
+
+def _fp_ingest_benchmarks(conn) -> str:
+    from config.benchmarks import BENCHMARKS
+    return _hash(BENCHMARKS, date.today())
+
+def _fp_ingest_corporate_actions(conn) -> str:
+    from config.tickers import DEFAULT_TICKERS
+    return _hash(DEFAULT_TICKERS, date.today())
+
+def _fp_dq_scan(conn) -> str:
+    # Raw loads rather than the core data version, which the scan itself bumps when the quarantine changes
+    from config import quality
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT MAX(id) FROM raw.raw_prices_daily),
+                   (SELECT MAX(id) FROM raw.raw_simfin_balance_q),
+                   (SELECT MAX(updated_at) FROM core.core_corporate_actions),
+                   (SELECT MAX(trade_date) FROM core.core_prices_daily)
+        """)
+        return _hash(cur.fetchone(), {k: v for k, v in vars(quality).items() if k.startswith("DQ_")})
+
+def _fp_feat_returns(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT version FROM feat.feat_data_version WHERE scope = 'core'),
+                   (SELECT MAX(trade_date) FROM core.core_prices_daily),
+                   (SELECT MAX(trade_date) FROM core.core_benchmark_prices_daily),
+                   (SELECT MAX(as_of_date) FROM core.core_positions)
+        """)
+        return _hash(cur.fetchone())
+
+def _fp_feat_peer_relative(conn) -> str:
+    from config.peer_sets import PEER_SETS
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT as_of_date, COUNT(*), SUM(return_ytd) FROM feat.feat_returns
+            WHERE as_of_date = (SELECT MAX(as_of_date) FROM feat.feat_returns) GROUP BY as_of_date
+        """)
+        return _hash(cur.fetchone(), PEER_SETS)
+
+def _fp_feat_revisions(conn) -> str:
+    from config.revisions import REVISION_WINDOWS, REVISION_METRICS
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(updated_at), COUNT(*) FROM core.core_estimates")
+        return _hash(cur.fetchone(), REVISION_WINDOWS, REVISION_METRICS)
+
+def _fp_feat_rpo(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(id) FROM raw.raw_sec_companyfacts")
+        return _hash(cur.fetchone())
+
+def _fp_feat_scores(conn) -> str:
+    from config.scoring import SCORING_FACTORS, WINSOR_LIMITS, EARNINGS_HORIZON_DAYS, TOP_K
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT MAX(as_of_date) FROM feat.feat_returns),
+                   (SELECT MAX(as_of_date) FROM feat.feat_peer_relative),
+                   (SELECT MAX(as_of_date) FROM feat.feat_revisions),
+                   (SELECT MAX(id) FROM core.core_events_earnings),
+                   (SELECT version FROM feat.feat_data_version WHERE scope = 'core')
+        """)
+        return _hash(cur.fetchone(), SCORING_FACTORS, WINSOR_LIMITS, EARNINGS_HORIZON_DAYS, TOP_K, date.today())
+
+def _fp_feat_portfolio_risk(conn) -> str:
+    from config import risk
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT version FROM feat.feat_data_version WHERE scope = 'core'),
+                   (SELECT MAX(trade_date) FROM core.core_prices_daily),
+                   (SELECT MAX(as_of_date) FROM core.core_positions)
+        """)
+        return _hash(cur.fetchone(), {k: v for k, v in vars(risk).items() if k.startswith("RISK_")})
+
+def _fp_feat_event_study(conn) -> str:
+    from config import event_study
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT version FROM feat.feat_data_version WHERE scope = 'core'),
+                   (SELECT MAX(trade_date) FROM core.core_prices_daily),
+                   (SELECT MAX(trade_date) FROM core.core_benchmark_prices_daily),
+                   (SELECT COUNT(*) || ':' || COALESCE(MAX(id), 0) FROM core.core_events_earnings)
+        """)
+        return _hash(cur.fetchone(), {k: v for k, v in vars(event_study).items() if k.isupper()}, date.today())
+
+def _fp_feat_attribution(conn) -> str:
+    from config import attribution
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT MAX(as_of_date) FROM feat.feat_returns),
+                   (SELECT version FROM feat.feat_data_version WHERE scope = 'core'),
+                   (SELECT MAX(as_of_date) FROM core.core_positions),
+                   (SELECT COUNT(*) || ':' || COALESCE(SUM(CARDINALITY(security_ids)), 0) FROM core.core_peer_sets)
+        """)
+        return _hash(cur.fetchone(), {k: v for k, v in vars(attribution).items() if k.startswith("ATTRIBUTION_")})
+
+def _fp_publish_dashboard(conn) -> str:
+    # Republish only when a feature stage's inputs changed since the last publish
+    with conn.cursor() as cur:
+        cur.execute("SELECT stage, success_fingerprint FROM ops.pipeline_stage_state WHERE stage = ANY(%s) ORDER BY stage", (FEATURE_STAGES,))
+        return _hash(cur.fetchall())
+
+def _fp_compact_raw(conn) -> str:
+    from config import raw_archive
+    return _hash({k: v for k, v in vars(raw_archive).items() if k.startswith("RAW_")}, date.today())
+
+# name -> (callable "module:function", dependencies, input fingerprint)
+STAGES = {
+    "bootstrap_db": ("scripts.bootstrap_db:main", [], _fp_bootstrap),
+    "ingest_simfin": ("jobs.ingest_simfin:job_ingest_simfin", ["bootstrap_db"], _fp_ingest_simfin),
+    "ingest_sec": ("jobs.ingest_sec:job_ingest_sec_companyfacts", ["bootstrap_db"], _fp_ingest_sec),
+    "ingest_benchmarks": ("jobs.ingest_benchmarks:job_ingest_benchmark_prices", ["bootstrap_db"], _fp_ingest_benchmarks),
+    "ingest_corporate_actions": ("jobs.ingest_corporate_actions:job_ingest_corporate_actions", ["ingest_simfin"], _fp_ingest_corporate_actions),
+    "dq_scan": ("jobs.dq_scan:job_dq_scan", ["ingest_corporate_actions", "ingest_benchmarks"], _fp_dq_scan),
+    "feat_returns": ("jobs.feat_returns:job_feat_returns", ["dq_scan"], _fp_feat_returns),
+    "feat_peer_relative": ("jobs.feat_peer_relative:job_feat_peer_relative", ["feat_returns"], _fp_feat_peer_relative),
+    "feat_revisions": ("jobs.feat_revisions:job_feat_revisions", ["bootstrap_db"], _fp_feat_revisions),
+    "feat_rpo": ("jobs.feat_rpo:job_feat_rpo", ["ingest_sec"], _fp_feat_rpo),
+    "feat_portfolio_risk": ("jobs.feat_portfolio_risk:job_feat_portfolio_risk", ["dq_scan"], _fp_feat_portfolio_risk),
+    "feat_event_study": ("jobs.feat_event_study:job_feat_event_study", ["dq_scan"], _fp_feat_event_study),
+    "feat_attribution": ("jobs.feat_attribution:job_feat_attribution", ["feat_returns", "feat_peer_relative"], _fp_feat_attribution),
+    "compact_raw": ("jobs.compact_raw:job_compact_raw", ["ingest_corporate_actions", "ingest_sec", "feat_rpo"], _fp_compact_raw),
+    "feat_scores": ("jobs.feat_scores:job_feat_scores", ["feat_returns", "feat_peer_relative", "feat_revisions"], _fp_feat_scores),
+}
+# Stages that write the dashboard's inputs: they run with publish=False and one terminal stage publishes,
+# naming the tables (their module's FEAT_TABLES) of those that ran
+FEATURE_STAGES = ["feat_returns", "feat_peer_relative", "feat_revisions", "feat_rpo", "feat_portfolio_risk",
+                  "feat_event_study", "feat_attribution", "feat_scores"]
+STAGES["publish_dashboard"] = ("jobs.publish_dashboard:job_publish_dashboard", FEATURE_STAGES, _fp_publish_dashboard)
+
+def topo_order(stages: dict = STAGES) -> list:
+    order, seen = [], set()
+    def visit(name, path=()):
+        if name in path:
+            raise ValueError("Cycle in pipeline: " + " -> ".join(path + (name,)))
+        if name in seen:
+            return
+        for dep in stages[name][1]:
+            visit(dep, path + (name,))
+        seen.add(name)
+        order.append(name)
+    for name in stages:
+        visit(name)
+    return order
+
+def descendants(name: str, stages: dict = STAGES) -> set:
+    out, frontier = set(), [name]
+    while frontier:
+        cur = frontier.pop()
+        for child, (_, deps, _) in stages.items():
+            if cur in deps and child not in out:
+                out.add(child)
+                frontier.append(child)
+    return out
+
+def _load_state(conn) -> dict:
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT stage, status, success_fingerprint FROM ops.pipeline_stage_state")
+            return {r[0]: {"status": r[1], "success_fingerprint": r[2]} for r in cur.fetchall()}
+    except psycopg2.errors.UndefinedTable:
+        # First run: bootstrap creates the table
+        conn.rollback()
+        return {}
+
+def _save_state(conn, stage: str, run_id: str, status: str, fp: str = None, error: str = None) -> None:
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO ops.pipeline_stage_state (stage, status, run_id, input_fingerprint, success_fingerprint, started_at, finished_at, error)
+                VALUES (%s, %s, %s, %s, CASE WHEN %s = 'success' THEN %s END, NOW(), CASE WHEN %s <> 'running' THEN NOW() END, %s)
+                ON CONFLICT (stage) DO UPDATE SET
+                    status = EXCLUDED.status, run_id = EXCLUDED.run_id,
+                    input_fingerprint = COALESCE(EXCLUDED.input_fingerprint, ops.pipeline_stage_state.input_fingerprint),
+                    success_fingerprint = COALESCE(EXCLUDED.success_fingerprint, ops.pipeline_stage_state.success_fingerprint),
+                    started_at = CASE WHEN EXCLUDED.status = 'running' THEN NOW() ELSE ops.pipeline_stage_state.started_at END,
+                    finished_at = EXCLUDED.finished_at, error = EXCLUDED.error
+                """,
+                (stage, status, run_id, fp, status, fp, status, error),
+            )
+        conn.commit()
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+
+def _resolve(target: str):
+    module, fn = target.split(":")
+    return getattr(importlib.import_module(module), fn)
+
+def _stage_tables(name: str) -> tuple:
+    return getattr(importlib.import_module(STAGES[name][0].split(":")[0]), "FEAT_TABLES", ())
+
+def _run_stage(name: str, **kwargs) -> float:
+    t0 = time.perf_counter()
+    _resolve(STAGES[name][0])(**kwargs)
+    return time.perf_counter() - t0
+
+def run_pipeline(only: list = None, from_stage: str = None, resume: bool = False, force: bool = False,
+                 dry_run: bool = False, workers: int = 4) -> dict:
+    """
+    Run the DAG. only restricts to the named stages; from_stage forces that stage and everything
+    downstream; resume reruns only stages that did not succeed last time (and their descendants).
+    Returns {stage: "success" | "skipped" | "failed" | "blocked" | "not selected"}.
+    """
+    order = topo_order()
+    conn = get_connection()
+    state = _load_state(conn)
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+    selected = set(only or order)
+    forced = set()
+    if from_stage:
+        forced = {from_stage} | descendants(from_stage)
+        selected &= forced
+    if resume:
+        pending = {s for s in order if state.get(s, {}).get("status") != "success"}
+        for s in list(pending):
+            pending |= descendants(s)
+        selected &= pending
+    if force:
+        forced |= selected
+
+    result = {s: "not selected" for s in order if s not in selected}
+    fingerprints = {}
+    running = {}
+    remaining = [s for s in order if s in selected]
+
+    def ready(name):
+        # Dependencies outside the selection count as satisfied
+        return all(result.get(d) in ("success", "skipped", "not selected") for d in STAGES[name][1])
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while remaining or running:
+            for name in list(remaining):
+                deps = STAGES[name][1]
+                if any(result.get(d) in ("failed", "blocked") for d in deps):
+                    result[name] = "blocked"
+                    remaining.remove(name)
+                    _save_state(conn, name, run_id, "blocked", error="upstream failed")
+                    print(f"[{name}] blocked (upstream failed)")
+                    continue
+                if not ready(name):
+                    continue
+                remaining.remove(name)
+                try:
+                    fp = STAGES[name][2](conn)
+                except psycopg2.Error:
+                    fp = None  # inputs not there yet (fresh database): run the stage
+                conn.rollback()
+                fingerprints[name] = fp
+                if fp is not None and name not in forced and state.get(name, {}).get("success_fingerprint") == fp:
+                    result[name] = "skipped"
+                    print(f"[{name}] skipped (inputs unchanged)")
+                    continue
+                if dry_run:
+                    result[name] = "success"
+                    print(f"[{name}] would run")
+                    continue
+                _save_state(conn, name, run_id, "running", fp)
+                print(f"[{name}] started")
+                if name in FEATURE_STAGES:
+                    kwargs = {"publish": False}
+                elif name == "publish_dashboard":
+                    kwargs = {"tables": sorted({t for s in FEATURE_STAGES if result.get(s) == "success" for t in _stage_tables(s)})}
+                else:
+                    kwargs = {}
+                running[pool.submit(_run_stage, name, **kwargs)] = name
+            if not running:
+                if remaining:
+                    raise RuntimeError("Pipeline stalled with stages left: " + ", ".join(remaining))
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = running.pop(fut)
+                try:
+                    elapsed = fut.result()
+                    result[name] = "success"
+                    _save_state(conn, name, run_id, "success", fingerprints[name])
+                    print(f"[{name}] done in {elapsed:.1f}s")
+                except Exception as e:
+                    result[name] = "failed"
+                    _save_state(conn, name, run_id, "failed", fingerprints[name], error=traceback.format_exc()[-4000:])
+                    print(f"[{name}] FAILED: {e}")
+    conn.close()
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", help="comma-separated stages to consider")
+    parser.add_argument("--from", dest="from_stage", choices=list(STAGES), help="rerun this stage and everything downstream")
+    parser.add_argument("--resume", action="store_true", help="rerun only stages that did not succeed last time, and their descendants")
+    parser.add_argument("--force", action="store_true", help="ignore skip-if-fresh")
+    parser.add_argument("--dry-run", action="store_true", help="print what would run")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+    unknown = set(only or []) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    result = run_pipeline(only, args.from_stage, args.resume, args.force, args.dry_run, args.workers)
+    emit_profile_report("pipeline")
+    if any(v in ("failed", "blocked") for v in result.values()):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Publish the dashboard read model once feature jobs have committed: refresh feat.feat_triage
+concurrently (readers keep seeing the previous rows until the swap), bump the "feat" data version
+so the app's caches turn over, and write the columnar snapshot for that version (models/snapshot.py).
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection, emit_profile_report, publish_data_version
+from models.snapshot import write_snapshot
+from models.ledger import job_run
+
+def refresh_triage(conn) -> None:
+    with conn.cursor() as cur:
+        cur.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY feat.feat_triage")
+    conn.commit()
+
+def publish_dashboard(conn, as_of_date=None, tables=()) -> int:
+    """
+    Refresh the triage view, publish a new "feat" data version and snapshot it. Returns the version.
+    tables names what the caller changed (for the NOTIFY payload); the triage view is always included.
+    """
+    refresh_triage(conn)
+    version = publish_data_version(conn, "feat", as_of_date, tables=[*tables, "feat.feat_triage"])
+    write_snapshot(conn, version)
+    return version
+
+def job_publish_dashboard(tables=()):
+    """Publish once for jobs run with publish=False (e.g. the pipeline's terminal stage); tables is what they wrote."""
+    with job_run("publish_dashboard") as run:
+        with run.stage("publish") as stage:
+            conn = get_connection()
+            with conn.cursor() as cur:
+                cur.execute("SELECT MAX(as_of_date) FROM feat.feat_returns")
+                as_of_date = cur.fetchone()[0]
+            version = publish_dashboard(conn, as_of_date, tables)
+            conn.close()
+            stage.watermark("feat.feat_data_version", version)
+
+if __name__ == "__main__":
+    job_publish_dashboard()
+    emit_profile_report("publish_dashboard")
@@ -0,0 +1,385 @@
+"""
+Streaming intraday mode for feat_returns: consume price updates from a pluggable async source (a replay
+file, an asyncio queue, or anything yielding (ticker, price, ts)), keep an in-memory last-price table
+and refresh feat.feat_returns, feat.feat_benchmark_returns and feat.feat_portfolio for the session date.
+
+Everything the features need from the closes before the session is precomputed once per session for
+the whole universe (previous close, period base closes, sums of the historical daily returns of the
+vol windows, the 52-week high), so a tick costs O(1): returns, vol_7d / vol_60d / spike ratio and
+drawdown_52w come out the same as jobs/feat_returns.py would compute with the tick as the latest
+close. Ticks are micro-batched: at each flush (STREAM_FLUSH_MS, or STREAM_MAX_BATCH securities) only
+the securities that ticked are recomputed and upserted, in one statement per table, on a worker
+thread while the event loop keeps consuming. History comes from the price cube (models/price_cube.py)
+when it is current (names it doesn't hold yet from Postgres), otherwise from Postgres. Settings in config/streaming.py.
+Usage: python jobs/stream_prices.py --replay FILE [--rate N] [--session DATE]
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config.streaming import STREAM_FLUSH_MS, STREAM_MAX_BATCH, STREAM_QUEUE, STREAM_PUBLISH_S, STREAM_LOOKBACK
+from models import price_cube
+from models.db import get_connection, emit_profile_report, database_identity
+from models.ledger import job_run
+from models.partitions import ensure_partitions
+from models.quality import price_ok
+from jobs.feat_returns import _decimal
+from jobs.publish_dashboard import publish_dashboard
+
+RETURN_COLUMNS = ["return_24h", "return_7d", "return_mtd", "return_qtd", "return_ytd"]
+VOL_COLUMNS = ["vol_7d", "vol_60d", "vol_spike_ratio", "drawdown_52w"]
+# Portfolio alpha columns: feat_portfolio prefix -> benchmark ticker
+ALPHA_BENCHMARKS = {"sp500": "SPY", "nasdaq": "QQQ", "tbill": "TB3M"}
+
+# --- Sources: async iterables of (ticker, price, ts); ts a datetime or None (= now) ---
+
+class ReplaySource:
+    """Ticks from a CSV (ticker,price[,ts] with a header) or JSON-lines file. rate: ticks per second, None = as fast as possible."""
+
+    def __init__(self, path: str, rate: float = None):
+        self.path = path
+        self.rate = rate
+
+    async def __aiter__(self):
+        t0 = time.perf_counter()
+        with open(self.path, newline="") as f:
+            rows = (json.loads(line) for line in f if line.strip()) if self.path.endswith((".jsonl", ".json")) else csv.DictReader(f)
+            for i, row in enumerate(rows):
+                ts = row.get("ts")
+                yield row["ticker"], float(row["price"]), datetime.fromisoformat(ts) if ts else None
+                if self.rate:
+                    wait = t0 + (i + 1) / self.rate - time.perf_counter()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                elif i % 1000 == 999:
+                    # Let the consumer run between chunks of a fast replay
+                    await asyncio.sleep(0)
+
+class QueueSource:
+    """Ticks put on an asyncio.Queue by another task; None ends the stream."""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def __aiter__(self):
+        while (tick := await self.queue.get()) is not None:
+            yield tick
+
+# --- In-memory state ---
+
+def _right_aligned(closes: np.ndarray, dates: np.ndarray, width: int) -> tuple:
+    """Per row, the newest `width` non-null closes of a (rows x dates) matrix, right-aligned (newest last), and their dates."""
+    if closes.shape[1] == 0:
+        return np.full((len(closes), width), np.nan), np.full((len(closes), width), np.datetime64("NaT"), dtype="datetime64[D]")
+    valid = ~np.isnan(closes)
+    count = valid.sum(axis=1)
+    order = np.argsort(~valid, axis=1, kind="stable")
+    idx = count[:, None] - width + np.arange(width)
+    ok = idx >= 0
+    take = np.take_along_axis(order, np.clip(idx, 0, None), axis=1)
+    hist = np.where(ok, np.take_along_axis(closes, take, axis=1), np.nan)
+    hist_dates = np.where(ok, dates[take], np.datetime64("NaT"))
+    return hist, hist_dates
+
+class SessionState:
+    """
+    Last-price table for one session date over a set of keys (security or benchmark ids). hist holds each
+    key's newest closes before the session, right-aligned; last the session's latest price (NaN = no tick).
+    """
+
+    def __init__(self, keys, hist: np.ndarray, hist_dates: np.ndarray, session: date):
+        self.keys = np.asarray(keys, dtype="int64")
+        self.row = {int(k): i for i, k in enumerate(self.keys)}
+        self.hist, self.hist_dates = hist, hist_dates
+        self.last = np.full(len(self.keys), np.nan)
+        self._derive(session)
+
+    def _base(self, cutoff: date, strict: bool) -> np.ndarray:
+        """Newest close dated on (before, if strict) or before cutoff, NaN if none."""
+        c = np.datetime64(cutoff, "D")
+        before = (self.hist_dates < c) if strict else (self.hist_dates <= c)
+        k = before.sum(axis=1)
+        first = self.hist.shape[1] - (~np.isnan(self.hist)).sum(axis=1)
+        pos = np.clip(first + k - 1, 0, None)
+        return np.where(k > 0, self.hist[np.arange(len(self.keys)), pos], np.nan)
+
+    def _derive(self, session: date) -> None:
+        self.session = session
+        h = self.hist
+        self.prev = h[:, -1]
+        q = (session.month - 1) // 3
+        self.bases = {
+            "return_7d": self._base(session - timedelta(days=7), strict=False),
+            "return_mtd": self._base(date(session.year, session.month, 1), strict=True),
+            "return_qtd": self._base(date(session.year, q * 3 + 1, 1), strict=True),
+            "return_ytd": self._base(date(session.year, 1, 1), strict=True),
+        }
+        # Daily returns newest first, each close against the next newer one (as pct_change over the
+        # newest-first series in feat_returns); the first one involves the tick, the rest are fixed
+        rets = h[:, -2::-1] / h[:, :0:-1] - 1.0
+        self.vol_sums = {}
+        for name, n in (("vol_7d", 7), ("vol_60d", 60)):
+            r = rets[:, :n - 1]
+            full = ~np.isnan(r).any(axis=1) if r.shape[1] == n - 1 else np.zeros(len(self.keys), dtype=bool)
+            self.vol_sums[name] = (n, np.where(full, np.nansum(r, axis=1), np.nan), np.where(full, np.nansum(r * r, axis=1), np.nan))
+        self.high = np.nanmax(np.where(np.isnan(h[:, -259:]), -np.inf, h[:, -259:]), axis=1)
+
+    def roll(self, session: date) -> None:
+        """Start a new session: the last price of every key that ticked becomes its newest close."""
+        ticked = ~np.isnan(self.last)
+        self.hist[ticked] = np.roll(self.hist[ticked], -1, axis=1)
+        self.hist_dates[ticked] = np.roll(self.hist_dates[ticked], -1, axis=1)
+        self.hist[ticked, -1] = self.last[ticked]
+        self.hist_dates[ticked, -1] = np.datetime64(self.session, "D")
+        self.last[:] = np.nan
+        self._derive(session)
+
+    def features(self, rows: np.ndarray, price: np.ndarray = None) -> dict:
+        """Feature arrays for rows at price (default: the last price, or the previous close where none)."""
+        prev = self.prev[rows]
+        p = np.where(np.isnan(self.last[rows]), prev, self.last[rows]) if price is None else price
+        usable = (p != 0) & ~np.isnan(p)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = {"return_24h": np.where(usable & (prev != 0), p / prev - 1.0, np.nan)}
+            for name, base in self.bases.items():
+                b = base[rows]
+                out[name] = np.where(usable & (b != 0), p / b - 1.0, np.nan)
+            r0 = prev / p - 1.0
+            for name, (n, s1, s2) in self.vol_sums.items():
+                mean = (s1[rows] + r0) / n
+                var = (s2[rows] + r0 * r0 - n * mean * mean) / (n - 1)
+                out[name] = np.sqrt(np.maximum(var, 0.0))
+            v60 = out["vol_60d"]
+            out["vol_spike_ratio"] = np.where(v60 > 0, out["vol_7d"] / v60, np.nan)
+            high = np.fmax(self.high[rows], p)
+            out["drawdown_52w"] = np.where((high > 0) & ~np.isnan(prev), (p - high) / high, np.nan)
+        for name in RETURN_COLUMNS:
+            out[name] = np.where(usable, out[name], np.nan)
+        return out
+
+def _sql_history(cur, session: date, lookback: int, security_ids: list = None) -> tuple:
+    """_history from core_prices_daily, for every security or only security_ids."""
+    only = "AND security_id = ANY(%(ids)s)" if security_ids is not None else ""
+    # Trading days -> calendar days, with room for holidays
+    cur.execute(f"""
+        SELECT security_id, trade_date, COALESCE(adj_close, close) FROM core.core_prices_daily
+        WHERE trade_date < %(session)s AND trade_date >= %(since)s AND {price_ok()} {only}
+    """, {"session": session, "since": session - timedelta(days=lookback * 3 // 2 + 30), "ids": list(security_ids or [])})
+    prices = pd.DataFrame(cur.fetchall(), columns=["security_id", "trade_date", "close"])
+    px = prices.pivot(index="security_id", columns="trade_date", values="close").sort_index(axis=1).astype("float64")
+    return px.index.to_numpy(dtype="int64"), px.to_numpy(), px.columns.to_numpy(dtype="datetime64[D]")
+
+def _merge_history(a: tuple, b: tuple) -> tuple:
+    """Two disjoint (ids, closes, dates) histories as one, ids sorted, on the union of their dates."""
+    (ia, ca, da), (ib, cb, db) = a, b
+    dates = np.union1d(da, db).astype("datetime64[D]")
+    closes = np.full((len(ia) + len(ib), len(dates)), np.nan)
+    closes[:len(ia), np.searchsorted(dates, da)] = ca
+    closes[len(ia):, np.searchsorted(dates, db)] = cb
+    ids = np.concatenate([ia, ib]).astype("int64")
+    order = np.argsort(ids)
+    return ids[order], closes[order], dates
+
+def _history(conn, session: date, lookback: int) -> tuple:
+    """Security ids, (securities x dates) adjusted closes before session, and the dates."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily WHERE trade_date < %s", (session,))
+        latest = cur.fetchone()[0]
+        cube = price_cube.open_cube(database_identity(conn))
+        if cube is None or latest is None or cube.last_date is None or cube.last_date < latest:
+            return _sql_history(cur, session, lookback)
+        hi = int(np.searchsorted(cube.dates, np.datetime64(session, "D")))
+        history = np.asarray(cube.ids), np.asarray(cube.close[:, :hi]), np.asarray(cube.dates[:hi])
+        # Names with prices the cube doesn't hold yet (loaded since it was built) come from SQL
+        cur.execute("""
+            SELECT m.id FROM core.core_security_master m
+            WHERE EXISTS (SELECT 1 FROM core.core_prices_daily p WHERE p.security_id = m.id AND p.trade_date < %s)
+        """, (session,))
+        priced = np.array([r[0] for r in cur.fetchall()], dtype="int64")
+        missing = priced[cube.rows(priced) < 0]
+        if len(missing):
+            history = _merge_history(history, _sql_history(cur, session, lookback, missing.tolist()))
+        return history
+
+class PriceStream:
+    """Securities, benchmarks and the book for one stream, and the micro-batch writer."""
+
+    def __init__(self, conn, session: date, lookback: int = STREAM_LOOKBACK):
+        self.conn = conn
+        cur = conn.cursor()
+        ids, closes, dates = _history(conn, session, lookback)
+        self.securities = SessionState(ids, *_right_aligned(closes, dates, lookback), session)
+        cur.execute("""
+            SELECT b.id, b.ticker, bp.trade_date, bp.close FROM core.core_benchmarks b
+            LEFT JOIN core.core_benchmark_prices_daily bp ON bp.benchmark_id = b.id AND bp.trade_date < %s AND bp.trade_date >= %s
+        """, (session, session - timedelta(days=lookback * 3 // 2 + 30)))
+        bench = pd.DataFrame(cur.fetchall(), columns=["benchmark_id", "ticker", "trade_date", "close"])
+        bpx = bench.dropna().pivot(index="benchmark_id", columns="trade_date", values="close").astype("float64")
+        bpx = bpx.reindex(sorted(bench["benchmark_id"].unique())).sort_index(axis=1)
+        self.benchmarks = SessionState(bpx.index, *_right_aligned(bpx.to_numpy(), bpx.columns.to_numpy(dtype="datetime64[D]"), lookback), session)
+        bench_ids = dict(zip(bench["ticker"], bench["benchmark_id"]))
+        self.alpha_rows = {k: self.benchmarks.row.get(int(bench_ids[t])) for k, t in ALPHA_BENCHMARKS.items() if t in bench_ids}
+        cur.execute("SELECT id, ticker FROM core.core_security_master")
+        self.lookup = {t: (self.securities, self.securities.row[i]) for i, t in cur.fetchall() if i in self.securities.row}
+        self.lookup.update({t: (self.benchmarks, self.benchmarks.row[int(i)]) for t, i in bench_ids.items()})
+        cur.execute("""
+            SELECT security_id, weight FROM core.core_positions
+            WHERE as_of_date = (SELECT MAX(as_of_date) FROM core.core_positions) AND weight <> 0
+        """)
+        book = [(self.securities.row[s], float(w)) for s, w in cur.fetchall() if s in self.securities.row]
+        self.book_rows = np.array([r for r, _ in book], dtype="int64")
+        self.book_weights = np.array([w for _, w in book])
+        conn.commit()
+        ensure_partitions(conn, through_year=session.year + 1)
+        self.last_publish = time.monotonic()
+        self.dirty = set()
+
+    @property
+    def session(self) -> date:
+        return self.securities.session
+
+    def roll(self, session: date) -> None:
+        ensure_partitions(self.conn, through_year=session.year + 1)
+        self.securities.roll(session)
+        self.benchmarks.roll(session)
+
+    def flush(self, rows: dict) -> int:
+        """Write the features of the keys that ticked ({(state, row): price}, already in state.last). Returns rows upserted."""
+        cur = self.conn.cursor()
+        n = 0
+        for state, table, key in ((self.securities, "feat.feat_returns", "security_id"), (self.benchmarks, "feat.feat_benchmark_returns", "benchmark_id")):
+            ticked = np.array(sorted(r for s, r in rows if s is state), dtype="int64")
+            if not len(ticked):
+                continue
+            cols = RETURN_COLUMNS + (VOL_COLUMNS if state is self.securities else [])
+            f = state.features(ticked)
+            values = [
+                (int(k), self.session, *(_decimal(float(f[c][i])) if np.isfinite(f[c][i]) else None for c in cols))
+                for i, k in enumerate(state.keys[ticked])
+            ]
+            execute_values(cur, f"""
+                INSERT INTO {table} ({key}, as_of_date, {', '.join(cols)}) VALUES %s
+                ON CONFLICT ({key}, as_of_date) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in cols)}
+            """, values, page_size=5000)
+            n += len(values)
+            self.dirty.add(table)
+        if len(self.book_rows):
+            # The whole book at current prices (names that have not ticked are at their previous close): one dot product per period
+            f = self.securities.features(self.book_rows)
+            port = {c: float(np.nansum(self.book_weights * f[c])) for c in RETURN_COLUMNS}
+            bench = self.benchmarks.features(np.array([r for r in self.alpha_rows.values() if r is not None], dtype="int64"))
+            bench_at = {k: i for i, k in enumerate(r for r in self.alpha_rows.values() if r is not None)}
+            values = [self.session, *(_decimal(port[c]) for c in RETURN_COLUMNS)]
+            for name in ALPHA_BENCHMARKS:
+                i = bench_at.get(self.alpha_rows.get(name))
+                for c in RETURN_COLUMNS:
+                    b = bench[c][i] if i is not None else np.nan
+                    values.append(_decimal(port[c] - float(b)) if np.isfinite(b) else None)
+            alpha_cols = [f"alpha_vs_{name}_{c[len('return_'):]}" for name in ALPHA_BENCHMARKS for c in RETURN_COLUMNS]
+            cols = RETURN_COLUMNS + alpha_cols
+            cur.execute(f"""
+                INSERT INTO feat.feat_portfolio (as_of_date, {', '.join(cols)}) VALUES ({', '.join(['%s'] * (len(cols) + 1))})
+                ON CONFLICT (as_of_date) DO UPDATE SET {', '.join(f'{c} = EXCLUDED.{c}' for c in cols)}
+            """, values)
+            self.dirty.add("feat.feat_portfolio")
+        self.conn.commit()
+        if time.monotonic() - self.last_publish >= STREAM_PUBLISH_S:
+            self.publish()
+        return n
+
+    def publish(self) -> None:
+        if self.dirty:
+            publish_dashboard(self.conn, self.session, sorted(self.dirty))
+            self.dirty = set()
+        self.last_publish = time.monotonic()
+
+async def run_stream(source, session: date = None, flush_ms: int = STREAM_FLUSH_MS, max_batch: int = STREAM_MAX_BATCH) -> dict:
+    """Consume source until it ends. Returns counts: ticks, unknown (ticker not found), late (before the session), flushes, rows."""
+    conn = get_connection()
+    stats = dict.fromkeys(["ticks", "unknown", "late", "flushes", "rows"], 0)
+    with job_run("stream_prices") as run:
+        with run.stage("load_state") as stage:
+            stream = PriceStream(conn, session or date.today())
+            stage.add(rows_read=len(stream.securities.keys) + len(stream.benchmarks.keys))
+        with run.stage("stream") as stage:
+            loop = asyncio.get_running_loop()
+            queue = asyncio.Queue(maxsize=STREAM_QUEUE)
+
+            async def pump():
+                try:
+                    async for tick in source:
+                        await queue.put(tick)
+                finally:
+                    await queue.put(None)
+
+            producer = asyncio.create_task(pump())
+            pending = {}
+            deadline = loop.time() + flush_ms / 1000.0
+            done = False
+
+            async def flush():
+                nonlocal pending
+                if pending:
+                    batch, pending = pending, {}
+                    stats["rows"] += await asyncio.to_thread(stream.flush, batch)
+                    stats["flushes"] += 1
+
+            while not done:
+                try:
+                    tick = await asyncio.wait_for(queue.get(), timeout=max(deadline - loop.time(), 0.001))
+                except asyncio.TimeoutError:
+                    tick = False
+                # Drain what is already buffered without yielding to the loop per tick
+                while tick is not False:
+                    if tick is None:
+                        done = True
+                        break
+                    ticker, price, ts = tick
+                    stats["ticks"] += 1
+                    day = ts.date() if ts else stream.session
+                    if day > stream.session:
+                        await flush()
+                        stream.roll(day)
+                    hit = stream.lookup.get(ticker)
+                    if day < stream.session or hit is None:
+                        stats["late" if hit else "unknown"] += 1
+                    else:
+                        state, row = hit
+                        state.last[row] = price
+                        pending[(state, row)] = price
+                    if len(pending) >= max_batch:
+                        break
+                    tick = queue.get_nowait() if not queue.empty() else False
+                if done or len(pending) >= max_batch or loop.time() >= deadline:
+                    await flush()
+                    deadline = loop.time() + flush_ms / 1000.0
+            await producer
+            stream.publish()
+            stage.add(rows_read=stats["ticks"], rows_updated=stats["rows"], rows_skipped=stats["unknown"] + stats["late"])
+    conn.close()
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream intraday prices into feat_returns / feat_portfolio")
+    parser.add_argument("--replay", required=True, help="CSV (ticker,price[,ts]) or JSON-lines file of ticks")
+    parser.add_argument("--rate", type=float, help="replay speed in ticks per second (default: as fast as possible)")
+    parser.add_argument("--session", type=date.fromisoformat, help="session date (default: today)")
+    args = parser.parse_args()
+    t0 = time.perf_counter()
+    stats = asyncio.run(run_stream(ReplaySource(args.replay, args.rate), args.session))
+    elapsed = time.perf_counter() - t0
+    print(f"stream_prices: {stats['ticks']} ticks in {elapsed:.1f}s ({stats['ticks'] / max(elapsed, 1e-9):,.0f}/s), "
+          f"{stats['flushes']} flushes, {stats['rows']} rows, {stats['unknown']} unknown, {stats['late']} late")
+    emit_profile_report("stream_prices")
@@ -0,0 +1,62 @@
+"""
+Split / dividend adjustment of core.core_prices_daily (see sql/17_corporate_actions.sql).
+Per ex-date, the action factor applies to every close before it: 1 / split_ratio for a split,
+1 - dividend / previous close for a cash dividend. core.core_adjustment_factors stores their running
+product per span between ex-dates, and core_prices_daily.adj_close caches close * factor.
+refresh_adjustments() rebuilds both for the given securities only; ingest sets adj_close on new rows.
+"""
+
+# LEFT JOIN of a price row (security id / trade date expressions) to its adjustment span
+FACTOR_JOIN = """
+    LEFT JOIN core.core_adjustment_factors f ON f.security_id = {security_id}
+        AND {trade_date} < f.valid_to AND (f.valid_from IS NULL OR {trade_date} >= f.valid_from)
+"""
+ADJ_CLOSE = "ROUND({close} * COALESCE(f.factor, 1), 6)"
+
+_FACTORS_SQL = """
+    WITH acts AS (
+        SELECT a.security_id, a.ex_date,
+               CASE WHEN a.action_type = 'split' THEN 1 / NULLIF(a.split_ratio, 0)
+                    ELSE 1 - a.cash_amount / NULLIF(prev.close, 0) END AS f
+        FROM core.core_corporate_actions a
+        LEFT JOIN LATERAL (
+            SELECT close FROM core.core_prices_daily p
+            WHERE p.security_id = a.security_id AND p.trade_date < a.ex_date
+            ORDER BY p.trade_date DESC LIMIT 1
+        ) prev ON a.action_type = 'dividend'
+        WHERE a.security_id = ANY(%(ids)s)
+    ),
+    per_date AS (
+        -- Split and dividend on the same day multiply
+        SELECT security_id, ex_date, EXP(SUM(LN(f))) AS f FROM acts WHERE f > 0 GROUP BY security_id, ex_date
+    )
+    INSERT INTO core.core_adjustment_factors (security_id, valid_from, valid_to, factor)
+    SELECT security_id,
+           LAG(ex_date) OVER (PARTITION BY security_id ORDER BY ex_date),
+           ex_date,
+           -- A close before this ex-date carries this and every later action
+           EXP(SUM(LN(f)) OVER (PARTITION BY security_id ORDER BY ex_date DESC))
+    FROM per_date
+"""
+
+_ADJ_CLOSE_SQL = f"""
+    WITH v AS (
+        SELECT p.security_id, p.trade_date, {ADJ_CLOSE.format(close="p.close")} AS adj_close
+        FROM core.core_prices_daily p
+        {FACTOR_JOIN.format(security_id="p.security_id", trade_date="p.trade_date")}
+        WHERE p.security_id = ANY(%(ids)s)
+    )
+    UPDATE core.core_prices_daily p SET adj_close = v.adj_close
+    FROM v
+    WHERE p.security_id = v.security_id AND p.trade_date = v.trade_date AND p.adj_close IS DISTINCT FROM v.adj_close
+"""
+
+def refresh_adjustments(cur, security_ids: list) -> int:
+    """Rebuild the factor spans and adj_close of security_ids (their rows only). Returns price rows changed."""
+    ids = sorted({int(i) for i in security_ids})
+    if not ids:
+        return 0
+    cur.execute("DELETE FROM core.core_adjustment_factors WHERE security_id = ANY(%s)", (ids,))
+    cur.execute(_FACTORS_SQL, {"ids": ids})
+    cur.execute(_ADJ_CLOSE_SQL, {"ids": ids})
+    return cur.rowcount
@@ -0,0 +1,199 @@
+"""
+Embedded columnar mirror of the core price / fundamentals / benchmark tables (a local DuckDB file).
+Feature jobs run their window and as-of scans here instead of on the Postgres that serves the app,
+and write only the resulting feat rows back. duckdb is optional: without it (or with
+ANALYTICS_BACKEND=postgres) jobs compute from Postgres as before.
+
+Sync is incremental per dated table: the last RESYNC_DAYS of dates (ON CONFLICT updates keep their id),
+plus rows older than that with an id above the mirrored high-water mark (backfills), as two queries
+that each prune core_prices_daily's partitions by date. If row counts over the resync window still
+disagree afterwards (rows deleted upstream) the table is reloaded in full; deletes older than the window
+alone (not done by any job) need a rebuilt mirror. Undated tables are small and replaced on every sync.
+"""
+import os
+from datetime import date, timedelta
+
+import pandas as pd
+
+from models.quality import price_ok
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ANALYTICS_PATH = os.getenv("ANALYTICS_PATH", os.path.join(ROOT, "data", "analytics", "core.duckdb"))
+# "duckdb" (default when installed) or "postgres"
+ANALYTICS_BACKEND = os.getenv("ANALYTICS_BACKEND", "duckdb")
+# Dates re-pulled on every sync to pick up restated rows
+RESYNC_DAYS = 10
+
+# Mirrored table -> (columns, DuckDB types, key, date column for the resync window)
+MIRROR = {
+    "core.core_security_master": (
+        ["id", "ticker", "sector", "industry"],
+        ["INTEGER", "VARCHAR", "VARCHAR", "VARCHAR"], ["id"], None),
+    "core.core_prices_daily": (
+        ["id", "security_id", "trade_date", "open", "high", "low", "close", "volume"],
+        ["BIGINT", "INTEGER", "DATE", "DOUBLE", "DOUBLE", "DOUBLE", "DOUBLE", "BIGINT"], ["security_id", "trade_date"], "trade_date"),
+    "core.core_fundamentals_quarterly": (
+        ["id", "security_id", "period_end", "report_date", "revenue", "gross_profit", "operating_income", "net_income",
+         "total_assets", "total_liabilities", "total_equity", "cash_and_equivalents", "total_debt",
+         "operating_cashflow", "free_cashflow", "shares_diluted"],
+        ["BIGINT", "INTEGER", "DATE", "DATE"] + ["BIGINT"] * 12, ["security_id", "period_end"], "period_end"),
+    # Small: reloaded on every sync. Prices are adjusted on read (_ADJUSTED_PRICES)
+    "core.core_adjustment_factors": (
+        ["id", "security_id", "valid_from", "valid_to", "factor"],
+        ["BIGINT", "INTEGER", "DATE", "DATE", "DOUBLE"], ["security_id", "valid_to"], None),
+    # Rows jobs/dq_scan.py quarantined: left out of the price scans, like models.quality.price_ok()
+    "ops.dq_quarantine": (
+        ["id", "table_name", "security_id", "ref_date"],
+        ["BIGINT", "VARCHAR", "INTEGER", "DATE"], ["table_name", "security_id", "ref_date"], None),
+    "core.core_benchmark_prices_daily": (
+        ["id", "benchmark_id", "trade_date", "close", "total_return_index"],
+        ["BIGINT", "INTEGER", "DATE", "DOUBLE", "DOUBLE"], ["benchmark_id", "trade_date"], "trade_date"),
+}
+
+def enabled() -> bool:
+    return duckdb is not None and ANALYTICS_BACKEND == "duckdb"
+
+def _local(table: str) -> str:
+    return table.replace(".", "_")
+
+def connect(read_only: bool = False):
+    os.makedirs(os.path.dirname(ANALYTICS_PATH), exist_ok=True)
+    db = duckdb.connect(ANALYTICS_PATH, read_only=read_only)
+    if not read_only:
+        for table, (cols, types, key, _) in MIRROR.items():
+            defs = ", ".join(f"{c} {t}" for c, t in zip(cols, types))
+            db.execute(f"CREATE TABLE IF NOT EXISTS {_local(table)} ({defs}, PRIMARY KEY ({', '.join(key)}))")
+    return db
+
+def _pull(pg, table: str, where: str = "", params: tuple = ()) -> pd.DataFrame:
+    cols = MIRROR[table][0]
+    with pg.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(cols)} FROM {table} {where}", params)
+        df = pd.DataFrame(cur.fetchall(), columns=cols)
+    for c, t in zip(cols, MIRROR[table][1]):
+        if t == "DOUBLE":
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+        elif t == "DATE":
+            df[c] = pd.to_datetime(df[c])
+        elif t in ("BIGINT", "INTEGER"):
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
+    return df
+
+def _load(db, table: str, df: pd.DataFrame) -> int:
+    if df.empty:
+        return 0
+    db.register("_incoming", df)
+    try:
+        db.execute(f"INSERT OR REPLACE INTO {_local(table)} SELECT {', '.join(MIRROR[table][0])} FROM _incoming")
+    finally:
+        db.unregister("_incoming")
+    return len(df)
+
+def sync(pg, db=None) -> dict:
+    """Bring the mirror up to date with Postgres. Returns {table: rows copied}."""
+    own = db is None
+    db = db or connect()
+    copied = {}
+    try:
+        for table, (cols, _, key, date_col) in MIRROR.items():
+            local = _local(table)
+            max_id, max_date = db.execute(
+                f"SELECT MAX(id), {f'MAX({date_col})' if date_col else 'NULL'} FROM {local}").fetchone()
+            if max_id is None or date_col is None or max_date is None:
+                db.execute(f"DELETE FROM {local}")
+                copied[table] = _load(db, table, _pull(pg, table))
+                continue
+            since = max_date - timedelta(days=RESYNC_DAYS)
+            n = _load(db, table, _pull(pg, table, f"WHERE {date_col} >= %s", (since,)))
+            n += _load(db, table, _pull(pg, table, f"WHERE id > %s AND {date_col} < %s", (int(max_id), since)))
+            with pg.cursor() as cur:
+                cur.execute(f"SELECT COUNT(*) FROM {table} WHERE {date_col} >= %s", (since,))
+                upstream = cur.fetchone()[0]
+            if db.execute(f"SELECT COUNT(*) FROM {local} WHERE {date_col} >= ?", [since]).fetchone()[0] != upstream:
+                # Rows were deleted upstream (or keys rewritten): start this table over
+                db.execute(f"DELETE FROM {local}")
+                n = _load(db, table, _pull(pg, table))
+            copied[table] = n
+        pg.rollback()
+    finally:
+        if own:
+            db.close()
+    return copied
+
+# --- Feature computations. Same semantics as jobs.feat_returns.returns_for_series / vol_and_drawdown,
+# over the newest lookback + 1 closes on or before latest. ---
+
+_FEATURES_SQL = """
+WITH s AS (
+    SELECT {key} AS key, trade_date, close,
+           ROW_NUMBER() OVER w AS rn,
+           -- pct_change over the newest-first series: each close against the next newer one
+           close / LAG(close) OVER w - 1 AS ret
+    FROM {table}
+    WHERE trade_date <= $latest
+    WINDOW w AS (PARTITION BY {key} ORDER BY trade_date DESC)
+    QUALIFY rn <= $rows
+),
+agg AS (
+    SELECT key,
+           COUNT(*) AS n,
+           MAX(close) FILTER (WHERE rn = 1) AS p0,
+           MAX(close) FILTER (WHERE rn = 2) AS p1,
+           ARG_MAX(close, trade_date) FILTER (WHERE trade_date <= $week_ago) AS p_7d,
+           ARG_MAX(close, trade_date) FILTER (WHERE trade_date < $month_start) AS p_mtd,
+           ARG_MAX(close, trade_date) FILTER (WHERE trade_date < $quarter_start) AS p_qtd,
+           ARG_MAX(close, trade_date) FILTER (WHERE trade_date < $year_start) AS p_ytd,
+           STDDEV_SAMP(ret) FILTER (WHERE rn BETWEEN 2 AND 8) AS vol_7d,
+           STDDEV_SAMP(ret) FILTER (WHERE rn BETWEEN 2 AND 61) AS vol_60d,
+           MAX(close) FILTER (WHERE rn <= 260) AS high_52w
+    FROM s
+    GROUP BY key
+)
+SELECT key,
+       CASE WHEN p0 <> 0 AND p1 <> 0 THEN p0 / p1 - 1 END AS return_24h,
+       CASE WHEN p0 <> 0 AND p_7d <> 0 THEN p0 / p_7d - 1 END AS return_7d,
+       CASE WHEN p0 <> 0 AND p_mtd <> 0 THEN p0 / p_mtd - 1 END AS return_mtd,
+       CASE WHEN p0 <> 0 AND p_qtd <> 0 THEN p0 / p_qtd - 1 END AS return_qtd,
+       CASE WHEN p0 <> 0 AND p_ytd <> 0 THEN p0 / p_ytd - 1 END AS return_ytd,
+       CASE WHEN n >= 8 THEN vol_7d END AS vol_7d,
+       CASE WHEN n >= 61 THEN vol_60d END AS vol_60d,
+       CASE WHEN n >= 61 AND vol_60d <> 0 THEN vol_7d / vol_60d END AS vol_spike_ratio,
+       CASE WHEN n >= 2 AND high_52w > 0 THEN (p0 - high_52w) / high_52w END AS drawdown_52w
+FROM agg
+"""
+
+# Split / dividend adjusted closes, as core_prices_daily.adj_close in Postgres, quarantined rows left out
+_ADJUSTED_PRICES = f"""(
+    SELECT p.security_id, p.trade_date, p.close * COALESCE(f.factor, 1) AS close
+    FROM core_core_prices_daily p
+    LEFT JOIN core_core_adjustment_factors f ON f.security_id = p.security_id
+        AND p.trade_date < f.valid_to AND (f.valid_from IS NULL OR p.trade_date >= f.valid_from)
+    WHERE {price_ok("p.security_id", "p.trade_date", quarantine="ops_dq_quarantine")}
+) adjusted"""
+
+RETURN_COLUMNS = ["return_24h", "return_7d", "return_mtd", "return_qtd", "return_ytd"]
+VOL_COLUMNS = ["vol_7d", "vol_60d", "vol_spike_ratio", "drawdown_52w"]
+
+def _features(db, table: str, key: str, latest: date, lookback: int) -> dict:
+    q = (latest.month - 1) // 3
+    params = {
+        "latest": latest, "rows": lookback + 1, "week_ago": latest - timedelta(days=7),
+        "month_start": date(latest.year, latest.month, 1), "quarter_start": date(latest.year, q * 3 + 1, 1),
+        "year_start": date(latest.year, 1, 1),
+    }
+    df = db.execute(_FEATURES_SQL.format(table=table, key=key), params).df()
+    df = df.astype(object).where(df.notna(), None)
+    return {int(r["key"]): r for r in df.to_dict("records")}
+
+def security_features(db, latest: date, lookback: int) -> dict:
+    """security_id -> {return_*, vol_7d, vol_60d, vol_spike_ratio, drawdown_52w}."""
+    return _features(db, _ADJUSTED_PRICES, "security_id", latest, lookback)
+
+def benchmark_returns(db, latest: date, lookback: int) -> dict:
+    """benchmark_id -> {return_*}."""
+    return _features(db, _local("core.core_benchmark_prices_daily"), "benchmark_id", latest, lookback)
@@ -1,13 +1,191 @@
-"""DB connection and run DDL helpers."""
+"""DB connection and run DDL helpers, plus per-statement query profiling."""
+import json
 import os
+import random
+import re
 import sys
+import threading
+import time
+from datetime import datetime, timezone
 
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
 from dotenv import load_dotenv
 
 load_dotenv()
 
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Profiling is on unless DB_PROFILE=0. Overhead is two perf_counter calls and a dict update per statement.
+PROFILE_ENABLED = os.getenv("DB_PROFILE", "1") != "0"
+# Capture EXPLAIN (ANALYZE, BUFFERS) once per read-only fingerprint slower than this (ms). 0 = off.
+PROFILE_EXPLAIN_MS = float(os.getenv("DB_PROFILE_EXPLAIN_MS", "0") or 0)
+# Where emit_profile_report() writes: "json", "table" or "json,table"
+PROFILE_SINK = os.getenv("DB_PROFILE_SINK", "json")
+PROFILE_DIR = os.getenv("DB_PROFILE_DIR", os.path.join(ROOT, "data", "profiles"))
+# publish_data_version() NOTIFYs this channel; payload is JSON {scope, version, as_of_date, tables}
+NOTIFY_CHANNEL = "data_version"
+
+_FP_PATTERNS = [
+    (re.compile(r"--[^\n]*"), ""),
+    (re.compile(r"/\*.*?\*/", re.S), ""),
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"%\(\w+\)s|%s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\s+"), " "),
+    (re.compile(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", re.I), "IN (?)"),
+    (re.compile(r"\bVALUES\s*\(.*?\)(?=\s*(?:ON CONFLICT|RETURNING|$))", re.I | re.S), "VALUES (...)"),
+]
+_FP_CACHE = {}
+_FP_CACHE_MAX = 2048
+
+def fingerprint(query) -> str:
+    """Normalize a statement so calls differing only in literals / parameters share one key."""
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)
+    fp = _FP_CACHE.get(query)
+    if fp is not None:
+        return fp
+    fp = query
+    for pattern, repl in _FP_PATTERNS:
+        fp = pattern.sub(repl, fp)
+    fp = fp.strip()
+    # execute_values() inlines literals, so only cache short parameterized statements
+    if len(query) < 4096:
+        if len(_FP_CACHE) >= _FP_CACHE_MAX:
+            _FP_CACHE.clear()
+        _FP_CACHE[query] = fp
+    return fp
+
+class QueryProfiler:
+    """Per-fingerprint call count, total / p95 / max latency and rows. Thread-safe, bounded memory."""
+
+    SAMPLE_SIZE = 512  # reservoir per fingerprint for the p95
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._plans = {}
+        self._last_emit = {}
+
+    def record(self, fp: str, elapsed_s: float, rows: int) -> None:
+        ms = elapsed_s * 1000.0
+        with self._lock:
+            s = self._stats.get(fp)
+            if s is None:
+                s = self._stats[fp] = {"calls": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0, "samples": []}
+            s["calls"] += 1
+            s["total_ms"] += ms
+            s["rows"] += max(rows, 0)
+            if ms > s["max_ms"]:
+                s["max_ms"] = ms
+            samples = s["samples"]
+            if len(samples) < self.SAMPLE_SIZE:
+                samples.append(ms)
+            else:
+                j = random.randrange(s["calls"])
+                if j < self.SAMPLE_SIZE:
+                    samples[j] = ms
+
+    def wants_plan(self, fp: str, elapsed_s: float) -> bool:
+        return PROFILE_EXPLAIN_MS > 0 and elapsed_s * 1000.0 >= PROFILE_EXPLAIN_MS and fp not in self._plans
+
+    def add_plan(self, fp: str, plan) -> None:
+        with self._lock:
+            self._plans[fp] = plan
+
+    def report(self) -> list:
+        """Rows sorted by total time: fingerprint, calls, total_ms, mean_ms, p95_ms, max_ms, rows, plan."""
+        with self._lock:
+            items = [(fp, dict(s, samples=sorted(s["samples"]))) for fp, s in self._stats.items()]
+            plans = dict(self._plans)
+        out = []
+        for fp, s in items:
+            samples = s["samples"]
+            p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))] if samples else 0.0
+            out.append({
+                "fingerprint": fp,
+                "calls": s["calls"],
+                "total_ms": round(s["total_ms"], 3),
+                "mean_ms": round(s["total_ms"] / s["calls"], 3),
+                "p95_ms": round(p95, 3),
+                "max_ms": round(s["max_ms"], 3),
+                "rows": s["rows"],
+                "plan": plans.get(fp),
+            })
+        return sorted(out, key=lambda r: r["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._plans.clear()
+
+PROFILER = QueryProfiler()
+
+# Statements EXPLAIN ANALYZE must not re-run: DML, row locks, SELECT INTO, and calls with side effects
+# (notifications, advisory locks, sequences, settings, and the project's own functions, e.g. partition DDL)
+_SIDE_EFFECTS = re.compile(
+    r"\b(?:INSERT|UPDATE|DELETE|MERGE|INTO)\b|\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b|\bFOR\s+KEY\s+SHARE\b"
+    r"|\b(?:pg_notify|pg_(?:try_)?advisory\w*|nextval|setval|set_config|pg_sleep\w*|lo_\w+|dblink\w*)\s*\("
+    r"|\b(?:raw|core|feat|ops)\.\w+\s*\(",
+    re.I,
+)
+
+def _is_read_only(fp: str) -> bool:
+    head = fp.lstrip("( ").split(" ", 1)[0].upper()
+    return head in ("SELECT", "WITH") and not _SIDE_EFFECTS.search(fp)
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor that records every execute into PROFILER (and optionally captures slow plans)."""
+
+    def execute(self, query, vars=None):
+        t0 = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - t0
+            fp = fingerprint(query)
+            PROFILER.record(fp, elapsed, self.rowcount)
+            if PROFILER.wants_plan(fp, elapsed) and _is_read_only(fp):
+                self._capture_plan(fp, query, vars)
+
+    def executemany(self, query, vars_list):
+        t0 = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            PROFILER.record(fingerprint(query), time.perf_counter() - t0, self.rowcount)
+
+    def copy_expert(self, sql, file, size=8192):
+        t0 = time.perf_counter()
+        try:
+            return super().copy_expert(sql, file, size)
+        finally:
+            PROFILER.record(fingerprint(sql), time.perf_counter() - t0, self.rowcount)
+
+    def _capture_plan(self, fp: str, query, vars) -> None:
+        """Re-run a slow read-only statement under EXPLAIN ANALYZE, inside a savepoint so failures are harmless."""
+        conn = self.connection
+        if conn.get_transaction_status() == psycopg2.extensions.TRANSACTION_STATUS_INERROR:
+            return
+        if isinstance(query, bytes):
+            query = query.decode("utf-8", "replace")
+        use_savepoint = not conn.autocommit
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+            try:
+                if use_savepoint:
+                    cur.execute("SAVEPOINT profile_explain")
+                cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + str(query), vars)
+                PROFILER.add_plan(fp, cur.fetchone()[0])
+                if use_savepoint:
+                    cur.execute("RELEASE SAVEPOINT profile_explain")
+            except psycopg2.Error:
+                if use_savepoint:
+                    cur.execute("ROLLBACK TO SAVEPOINT profile_explain")
+
 def get_connection():
     return psycopg2.connect(
         host=os.getenv("PGHOST", "localhost"),
@@ -15,8 +193,97 @@ def get_connection():
         dbname=os.getenv("PGDATABASE", "equity_mvp"),
         user=os.getenv("PGUSER", "postgres"),
         password=os.getenv("PGPASSWORD", ""),
+        cursor_factory=InstrumentedCursor if PROFILE_ENABLED else None,
     )
 
+def emit_profile_report(run_name: str, min_interval_s: float = 0, reset: bool = True):
+    """
+    Write the accumulated query profile for this process to PROFILE_DIR as JSON and/or to ops.query_profile.
+    min_interval_s throttles long-lived callers (the app); the profile keeps accumulating in between.
+    Returns the JSON path if one was written.
+    """
+    if not PROFILE_ENABLED:
+        return None
+    now = time.time()
+    if min_interval_s and now - PROFILER._last_emit.get(run_name, 0) < min_interval_s:
+        return None
+    PROFILER._last_emit[run_name] = now
+    rows = PROFILER.report()
+    if not rows:
+        return None
+    run_at = datetime.now(timezone.utc)
+    path = None
+    sinks = {s.strip() for s in PROFILE_SINK.split(",")}
+    if "json" in sinks:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{run_name}_{run_at:%Y%m%dT%H%M%S}.json")
+        with open(path, "w") as f:
+            json.dump({"run_name": run_name, "run_at": run_at.isoformat(), "statements": rows}, f, indent=2, default=str)
+    if "table" in sinks:
+        conn = get_connection()
+        with conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+            for r in rows:
+                cur.execute(
+                    """
+                    INSERT INTO ops.query_profile (run_name, run_at, fingerprint, calls, total_ms, mean_ms, p95_ms, max_ms, rows, plan)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)
+                    """,
+                    (run_name, run_at, r["fingerprint"], r["calls"], r["total_ms"], r["mean_ms"], r["p95_ms"], r["max_ms"], r["rows"],
+                     json.dumps(r["plan"]) if r["plan"] is not None else None),
+                )
+        conn.commit()
+        conn.close()
+    if reset:
+        PROFILER.reset()
+    return path
+
+def publish_data_version(conn, scope: str, as_of_date=None, tables=None) -> int:
+    """
+    Bump the data-version stamp for scope (e.g. "feat", "core") and those of the tables that changed
+    (feat.feat_table_version), and commit. Returns the new scope version.
+    Listeners on NOTIFY_CHANNEL are told the scope, version, as-of date and the tables that changed;
+    Postgres delivers the notification only when the commit succeeds.
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO feat.feat_data_version (scope, version, as_of_date, published_at)
+            VALUES (%s, 1, %s, NOW())
+            ON CONFLICT (scope) DO UPDATE SET
+                version = feat.feat_data_version.version + 1,
+                as_of_date = COALESCE(EXCLUDED.as_of_date, feat.feat_data_version.as_of_date),
+                published_at = NOW()
+            RETURNING version
+            """,
+            (scope, as_of_date),
+        )
+        version = cur.fetchone()[0]
+        tables = sorted(set(tables or []))
+        if tables:
+            cur.execute(
+                """
+                INSERT INTO feat.feat_table_version (table_name, version, scope, published_at)
+                SELECT t, 1, %s, NOW() FROM UNNEST(%s::text[]) t
+                ON CONFLICT (table_name) DO UPDATE SET
+                    version = feat.feat_table_version.version + 1, scope = EXCLUDED.scope, published_at = NOW()
+                """,
+                (scope, tables),
+            )
+        payload = {"scope": scope, "version": version, "as_of_date": as_of_date, "tables": tables}
+        cur.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, json.dumps(payload, default=str)))
+    conn.commit()
+    return version
+
+def database_identity(conn) -> str:
+    """
+    Short identity of this database (feat.feat_data_identity), for keying files cached outside it:
+    it changes when the database is reset or re-created, while data versions start over at 1.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT identity FROM feat.feat_data_identity")
+        row = cur.fetchone()
+    return row[0].replace("-", "")[:12]
+
 def run_sql_file(conn, path: str) -> None:
     with open(path, "r") as f:
         sql = f.read()
@@ -24,7 +291,9 @@ def run_sql_file(conn, path: str) -> None:
         if "DO $$" in sql:
             cur.execute(sql)
         else:
-            statements = [s.strip() for s in sql.split(";") if s.strip() and not s.strip().startswith("--")]
+            # Drop comment lines before splitting so a statement preceded by a comment still runs
+            lines = [ln for ln in sql.splitlines() if not ln.strip().startswith("--")]
+            statements = [s.strip() for s in "\n".join(lines).split(";") if s.strip()]
             for stmt in statements:
                 if stmt:
                     cur.execute(stmt)
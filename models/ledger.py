@@ -0,0 +1,189 @@
+"""
+Job-run ledger (ops.job_run, ops.job_stage, ops.job_watermark).
+
+    with job_run("ingest_sec") as run:
+        with run.stage("companyfacts") as stage:
+            stage.add(rows_read=1, rows_inserted=cur.rowcount, bytes_fetched=n)
+            stage.error(exc)                 # counted, the stage carries on
+            stage.watermark("sec", asof)     # saved to ops.job_watermark when the stage succeeds
+
+Ledger writes use their own autocommit connection, so they survive a job's rollback.
+An exception escaping a block marks it failed and propagates; recorded errors mark it partial.
+If the ops tables are missing (DB not bootstrapped yet) the ledger is a no-op.
+"""
+import json
+import os
+import re
+import socket
+import time
+import traceback
+
+import psycopg2
+
+from models.db import get_connection
+
+COUNTERS = ("rows_read", "rows_inserted", "rows_updated", "rows_skipped", "bytes_fetched", "errors")
+
+_INSERT_TARGET = re.compile(r"\bINSERT\s+INTO\s+([\w.\"]+)", re.I)
+
+def xact_counts(cur, table: str) -> tuple:
+    """
+    (inserted, updated) on table, partitions included, so far in the current transaction.
+    Diff two calls around a write. Works where RETURNING xmax does not (partitioned tables).
+    """
+    cur.execute(
+        """
+        SELECT COALESCE(SUM(n_tup_ins), 0), COALESCE(SUM(n_tup_upd), 0) FROM pg_stat_xact_user_tables
+        WHERE relid = %s::regclass OR relid IN (SELECT relid FROM pg_partition_tree(%s::regclass))
+        """,
+        (table, table),
+    )
+    ins, upd = cur.fetchone()
+    return int(ins), int(upd)
+
+def upsert_counts(cur, insert_sql: str, params=()) -> tuple:
+    """Run an INSERT ... ON CONFLICT DO UPDATE and return (inserted, updated)."""
+    table = _INSERT_TARGET.search(insert_sql).group(1)
+    ins0, upd0 = xact_counts(cur, table)
+    cur.execute(insert_sql, params)
+    ins1, upd1 = xact_counts(cur, table)
+    return ins1 - ins0, upd1 - upd0
+
+def get_watermark(job: str, source: str, conn=None):
+    """Last watermark recorded for (job, source), as text, or None."""
+    own = conn is None
+    conn = conn or get_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT watermark FROM ops.job_watermark WHERE job = %s AND source = %s", (job, source))
+            row = cur.fetchone()
+        return row[0] if row else None
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return None
+    finally:
+        if own:
+            conn.close()
+
+class Stage:
+    def __init__(self, run: "JobRun", name: str):
+        self.run = run
+        self.name = name
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.watermarks = {}
+        self.last_error = None
+        self._t0 = None
+        self._started_at = None
+
+    def add(self, **counts) -> None:
+        for k, v in counts.items():
+            if k not in self.counts:
+                raise KeyError(f"Unknown ledger counter: {k}")
+            self.counts[k] += int(v or 0)
+
+    def error(self, exc) -> None:
+        self.counts["errors"] += 1
+        self.last_error = str(exc)[:2000]
+
+    def watermark(self, source: str, value) -> None:
+        self.watermarks[source] = value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        self._started_at = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            status = "failed"
+            self.last_error = "".join(traceback.format_exception(exc_type, exc, tb))[-4000:]
+        else:
+            status = "partial" if self.counts["errors"] else "success"
+        self.run._record_stage(self, status, (time.perf_counter() - self._t0) * 1000.0)
+        return False
+
+class JobRun:
+    def __init__(self, job: str):
+        self.job = job
+        self.id = None
+        self.stages = []
+        self._conn = None
+        self._t0 = None
+
+    def stage(self, name: str) -> Stage:
+        return Stage(self, name)
+
+    @property
+    def errors(self) -> int:
+        return sum(s.counts["errors"] for s in self.stages)
+
+    def _execute(self, sql: str, params: tuple):
+        if self._conn is None:
+            return None
+        try:
+            with self._conn.cursor() as cur:
+                cur.execute(sql, params)
+                return cur.fetchone() if cur.description else None
+        except (psycopg2.errors.UndefinedTable, psycopg2.InterfaceError, psycopg2.OperationalError):
+            # Ledger unavailable: never fail the job over bookkeeping
+            conn, self._conn = self._conn, None
+            if not conn.closed:
+                conn.close()
+            return None
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        try:
+            self._conn = get_connection()
+            self._conn.autocommit = True
+        except psycopg2.Error:
+            self._conn = None
+        row = self._execute(
+            "INSERT INTO ops.job_run (job, host, pid) VALUES (%s, %s, %s) RETURNING id",
+            (self.job, socket.gethostname(), os.getpid()),
+        )
+        self.id = row[0] if row else None
+        return self
+
+    def _record_stage(self, stage: Stage, status: str, duration_ms: float) -> None:
+        self.stages.append(stage)
+        if self.id is None:
+            return
+        c = stage.counts
+        self._execute(
+            """
+            INSERT INTO ops.job_stage (run_id, stage, started_at, finished_at, duration_ms, status,
+                rows_read, rows_inserted, rows_updated, rows_skipped, bytes_fetched, errors, last_error, watermarks)
+            VALUES (%s, %s, to_timestamp(%s), NOW(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s::jsonb)
+            """,
+            (self.id, stage.name, stage._started_at, round(duration_ms, 3), status,
+             c["rows_read"], c["rows_inserted"], c["rows_updated"], c["rows_skipped"], c["bytes_fetched"], c["errors"],
+             stage.last_error, json.dumps(stage.watermarks) if stage.watermarks else None),
+        )
+        # A partial stage skipped some input: leave the watermark where it was so the next run retries it
+        if status == "success":
+            for source, value in stage.watermarks.items():
+                self._execute(
+                    """
+                    INSERT INTO ops.job_watermark (job, source, watermark, run_id, updated_at) VALUES (%s, %s, %s, %s, NOW())
+                    ON CONFLICT (job, source) DO UPDATE SET watermark = EXCLUDED.watermark, run_id = EXCLUDED.run_id, updated_at = NOW()
+                    """,
+                    (self.job, source, value, self.id),
+                )
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            status, error = "failed", "".join(traceback.format_exception(exc_type, exc, tb))[-4000:]
+        else:
+            status, error = ("partial" if self.errors else "success"), None
+        if self.id is not None:
+            self._execute(
+                "UPDATE ops.job_run SET finished_at = NOW(), duration_ms = %s, status = %s, error = %s WHERE id = %s",
+                (round((time.perf_counter() - self._t0) * 1000.0, 3), status, error, self.id),
+            )
+        if self._conn is not None:
+            self._conn.close()
+        return False
+
+def job_run(job: str) -> JobRun:
+    return JobRun(job)
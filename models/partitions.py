@@ -0,0 +1,75 @@
+"""Partition maintenance for the date-partitioned price and feature tables (see sql/05_storage_layout.sql)."""
+from datetime import date
+
+# Partitioned parent -> partition key column
+PARTITIONED_TABLES = {
+    "core.core_prices_daily": "trade_date",
+    "raw.raw_prices_daily": "trade_date",
+    "feat.feat_returns": "as_of_date",
+}
+
+def _partition_name(table: str, year: int) -> str:
+    return f"{table}_y{year}"
+
+def ensure_partitions(conn, through_year: int = None, from_year: int = 2000) -> int:
+    """Create any missing yearly partitions up to through_year (default: next year). Returns count created."""
+    if through_year is None:
+        through_year = date.today().year + 1
+    created = 0
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regproc('core.ensure_year_partitions')")
+        if cur.fetchone()[0] is None:
+            return 0
+        for table in PARTITIONED_TABLES:
+            cur.execute("SELECT core.ensure_year_partitions(%s::regclass, %s, %s)", (table, from_year, through_year))
+            created += cur.fetchone()[0]
+    conn.commit()
+    return created
+
+def detach_partition(conn, table: str, year: int) -> str:
+    """
+    Detach the partition for year; it remains as a standalone table (archive, dump or drop it).
+    Uses DETACH ... CONCURRENTLY on PG14+, which only takes SHARE UPDATE EXCLUSIVE on the parent.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} is not a partitioned table")
+    part = _partition_name(table, year)
+    concurrently = conn.server_version >= 140000
+    conn.commit()
+    old_autocommit = conn.autocommit
+    # CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET lock_timeout = '5s'")
+            try:
+                cur.execute(f"ALTER TABLE {table} DETACH PARTITION {part}{' CONCURRENTLY' if concurrently else ''}")
+            finally:
+                # Session-level in autocommit mode: reset even when the DETACH times out
+                cur.execute("RESET lock_timeout")
+    finally:
+        conn.autocommit = old_autocommit
+    return part
+
+def attach_partition(conn, table: str, year: int, source: str = None) -> str:
+    """
+    Attach a standalone table (default: the previously detached <table>_y<year>) as the partition for year.
+    A CHECK constraint matching the bounds is added first so ATTACH skips its validation scan of the
+    new partition and the parent is only held in SHARE UPDATE EXCLUSIVE mode.
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} is not a partitioned table")
+    col = PARTITIONED_TABLES[table]
+    source = source or _partition_name(table, year)
+    lo, hi = date(year, 1, 1), date(year + 1, 1, 1)
+    check_name = f"{source.split('.')[-1]}_bounds"
+    with conn.cursor() as cur:
+        cur.execute("SET LOCAL lock_timeout = '5s'")
+        cur.execute(
+            f"ALTER TABLE {source} ADD CONSTRAINT {check_name} CHECK ({col} IS NOT NULL AND {col} >= %s AND {col} < %s)",
+            (lo, hi),
+        )
+        cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {source} FOR VALUES FROM (%s) TO (%s)", (lo, hi))
+        cur.execute(f"ALTER TABLE {source} DROP CONSTRAINT {check_name}")
+    conn.commit()
+    return source
@@ -0,0 +1,185 @@
+"""
+Price cube: split / dividend adjusted closes (quarantined rows left out) as one float64 array of
+securities x trading days, memory-mapped from disk, with the security ids and dates alongside.
+Any process attaches read-only with open_cube(): zero copy, no database connection.
+
+Each version is an immutable directory (close.f64, security_ids.npy, dates.npy, meta.json). append()
+stages the next version next to the current one, renames it into place and then swaps the CURRENT
+pointer with os.replace, so a reader sees either the old cube or the new one, never a partial write.
+Writers serialize on a lock file. Ingest jobs call append() after loading core.core_prices_daily;
+it re-reads only the last RESYNC_DAYS (plus the full history of new or re-adjusted securities).
+meta.json records the database the cube was built from (models.db.database_identity): append() rebuilds
+from scratch, and open_cube(identity) attaches to nothing, when it belongs to another (e.g. reset) database.
+
+Readers: feat_returns (when the analytics mirror is off), feat_portfolio_risk and stream_prices, each
+falling back to SQL when the cube is missing or behind. The app reads no prices, only feat tables and
+the dashboard snapshot (models/snapshot.py).
+"""
+import fcntl
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from config.quality import DQ_LOOKBACK_DAYS
+from models.db import database_identity
+from models.quality import price_ok
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CUBE_DIR = os.getenv("PRICE_CUBE_DIR", os.path.join(ROOT, "data", "price_cube"))
+# Older versions kept on disk so a process still mapping one is not pulled from under it
+CUBE_KEEP = 3
+# Dates re-read on every append: restated rows and the data-quality rescan window
+RESYNC_DAYS = DQ_LOOKBACK_DAYS + 10
+# Rows copied from the previous version at a time
+COPY_ROWS = 1024
+
+class PriceCube:
+    """A mapped cube version. close[i, j] is security ids[i] on dates[j]; NaN = no (usable) price."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.version = self.meta["version"]
+        self.ids = np.load(os.path.join(path, "security_ids.npy"), mmap_mode="r")
+        self.dates = np.load(os.path.join(path, "dates.npy"), mmap_mode="r")
+        shape = (len(self.ids), len(self.dates))
+        self.close = np.memmap(os.path.join(path, "close.f64"), dtype="float64", mode="r", shape=shape) if all(shape) else np.empty(shape)
+
+    @property
+    def last_date(self):
+        return self.dates[-1].astype(object) if len(self.dates) else None
+
+    def rows(self, security_ids) -> np.ndarray:
+        """Row of each security id, -1 where it is not in the cube."""
+        ids = np.asarray(security_ids, dtype="int64")
+        if not len(self.ids):
+            return np.full(len(ids), -1)
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        return np.where(self.ids[pos] == ids, pos, -1)
+
+    def frame(self, security_ids, start: date = None, end: date = None) -> pd.DataFrame:
+        """Trading dates x security_id closes for start <= date <= end (a copy of just that block)."""
+        lo = 0 if start is None else np.searchsorted(self.dates, np.datetime64(start, "D"), side="left")
+        hi = len(self.dates) if end is None else np.searchsorted(self.dates, np.datetime64(end, "D"), side="right")
+        ids = np.asarray(security_ids, dtype="int64")
+        rows = self.rows(ids)
+        block = np.full((hi - lo, len(ids)), np.nan)
+        found = rows >= 0
+        block[:, found] = self.close[rows[found], lo:hi].T
+        return pd.DataFrame(block, index=pd.Index(self.dates[lo:hi].astype(object), name="trade_date"),
+                            columns=pd.Index(ids, name="security_id"))
+
+def _version_path(version: int) -> str:
+    return os.path.join(CUBE_DIR, f"v{int(version):08d}")
+
+def open_cube(identity: str = None):
+    """
+    Attach to the current cube version read-only, or None if none has been built (or, given a
+    database identity, if the cube was built from another database).
+    """
+    try:
+        with open(os.path.join(CUBE_DIR, "CURRENT")) as f:
+            name = f.read().strip()
+        cube = PriceCube(os.path.join(CUBE_DIR, name))
+    except (OSError, ValueError):
+        return None
+    return cube if identity is None or cube.meta.get("database") == identity else None
+
+def _load(conn, since, security_ids: list) -> pd.DataFrame:
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT security_id, trade_date, COALESCE(adj_close, close) FROM core.core_prices_daily
+            WHERE (trade_date >= %s OR security_id = ANY(%s)) AND {price_ok()}
+        """, (since or date.min, list(security_ids)))
+        return pd.DataFrame(cur.fetchall(), columns=["security_id", "trade_date", "close"])
+
+def append(conn, reload_ids: list = None):
+    """
+    Bring the cube up to date with core.core_prices_daily and publish it as the next version.
+    reload_ids: securities whose whole history changed (e.g. re-adjusted). Returns the current version
+    (unchanged when nothing differs), or None when there are no prices.
+    """
+    os.makedirs(CUBE_DIR, exist_ok=True)
+    with open(os.path.join(CUBE_DIR, ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        identity = database_identity(conn)
+        current = open_cube()
+        # A cube from another database (reset, or re-created) is rebuilt rather than appended to
+        old = current if current and current.meta.get("database") == identity else None
+        with conn.cursor() as cur:
+            cur.execute("SELECT id FROM core.core_security_master")
+            master = {r[0] for r in cur.fetchall()}
+        # Securities no longer in the master drop out of the next version
+        kept = np.flatnonzero(np.isin(old.ids, list(master))) if old else np.array([], dtype="int64")
+        old_ids = set(old.ids[kept].tolist()) if old else set()
+        since = old.last_date - timedelta(days=RESYNC_DAYS) if old and old.last_date else None
+        full = (master - old_ids) | {int(i) for i in reload_ids or []}
+        prices = _load(conn, since, sorted(full))
+        conn.rollback()
+        if prices.empty and not old:
+            return None
+
+        ids = np.array(sorted(old_ids | set(prices["security_id"].astype(int))), dtype="int64")
+        dates = np.union1d(old.dates if old else np.array([], dtype="datetime64[D]"),
+                           prices["trade_date"].to_numpy(dtype="datetime64[D]")).astype("datetime64[D]")
+        version = (current.version if current else 0) + 1
+        staging = tempfile.mkdtemp(prefix=".staging_", dir=CUBE_DIR)
+        try:
+            close = np.memmap(os.path.join(staging, "close.f64"), dtype="float64", mode="w+", shape=(len(ids), len(dates)))
+            close[:] = np.nan
+            if old and old.close.size:
+                # Previous version's rows into their new positions, a block of rows at a time
+                cols = np.searchsorted(dates, old.dates)
+                contiguous = cols[-1] - cols[0] == len(cols) - 1
+                for i in range(0, len(kept), COPY_ROWS):
+                    src = kept[i:i + COPY_ROWS]
+                    r, block = np.searchsorted(ids, old.ids[src]), old.close[src]
+                    if contiguous:
+                        close[r, cols[0]:cols[-1] + 1] = block
+                    else:
+                        close[np.ix_(r, cols)] = block
+            # Re-read span: cleared first so rows deleted or quarantined upstream drop out
+            if since is not None:
+                close[:, np.searchsorted(dates, np.datetime64(since, "D")):] = np.nan
+            for sid in full:
+                if sid in old_ids:
+                    close[np.searchsorted(ids, sid), :] = np.nan
+            if not prices.empty:
+                close[np.searchsorted(ids, prices["security_id"].to_numpy(dtype="int64")),
+                      np.searchsorted(dates, prices["trade_date"].to_numpy(dtype="datetime64[D]"))] = \
+                    pd.to_numeric(prices["close"], errors="coerce").to_numpy(dtype="float64")
+            close.flush()
+            if old and len(kept) == len(old.ids) and np.array_equal(ids, old.ids) and np.array_equal(dates, old.dates) \
+                    and np.array_equal(close, old.close, equal_nan=True):
+                del close
+                shutil.rmtree(staging, ignore_errors=True)
+                return old.version
+            del close
+            np.save(os.path.join(staging, "security_ids.npy"), ids)
+            np.save(os.path.join(staging, "dates.npy"), dates)
+            with open(os.path.join(staging, "meta.json"), "w") as f:
+                json.dump({"version": version, "database": identity, "shape": [len(ids), len(dates)],
+                           "built_at": datetime.now(timezone.utc).isoformat()}, f)
+            os.rename(staging, _version_path(version))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        pointer = os.path.join(CUBE_DIR, ".CURRENT.tmp")
+        with open(pointer, "w") as f:
+            f.write(os.path.basename(_version_path(version)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, os.path.join(CUBE_DIR, "CURRENT"))
+        _prune()
+        return version
+
+def _prune() -> None:
+    versions = sorted(d for d in os.listdir(CUBE_DIR) if d.startswith("v"))
+    for d in versions[:-CUBE_KEEP]:
+        shutil.rmtree(os.path.join(CUBE_DIR, d), ignore_errors=True)
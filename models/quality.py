@@ -0,0 +1,11 @@
+"""
+Quarantined rows (ops.dq_quarantine, written by jobs/dq_scan.py). Readers of core prices add
+price_ok() to their WHERE clause so flagged rows never reach feature computation.
+"""
+
+PRICES_TABLE = "core.core_prices_daily"
+
+def price_ok(security_id: str = "security_id", trade_date: str = "trade_date", quarantine: str = "ops.dq_quarantine") -> str:
+    """SQL predicate: the price row (column expressions) is not quarantined."""
+    return (f"NOT EXISTS (SELECT 1 FROM {quarantine} q WHERE q.table_name = '{PRICES_TABLE}'"
+            f" AND q.security_id = {security_id} AND q.ref_date = {trade_date})")
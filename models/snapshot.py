@@ -0,0 +1,149 @@
+"""
+Columnar dashboard snapshot: the read model the app renders (portfolio KPIs, triage rows,
+upcoming earnings, top movers) written as uncompressed Arrow IPC files, one immutable directory per
+"feat" data version of a database (models.db.database_identity). The app memory-maps the snapshot matching the published version and shares
+it across sessions, so read-only rendering needs no database round trip.
+pyarrow is optional: without it publish skips the snapshot and the app reads from SQL.
+"""
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+import pandas as pd
+
+from models.db import database_identity
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:
+    pa = ipc = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOT_DIR = os.getenv("DASHBOARD_SNAPSHOT_DIR", os.path.join(ROOT, "data", "snapshots"))
+# Older versions kept on disk so an app process still mapping one is not pulled from under it
+SNAPSHOT_KEEP = 3
+# Calendar rows kept in the snapshot (days ahead of the publish date)
+CALENDAR_HORIZON_DAYS = 120
+
+TABLES = ("kpis", "triage", "calendar", "top_movers")
+
+KPI_COLUMNS = [
+    "as_of_date", "return_24h", "return_7d", "return_mtd", "return_qtd", "return_ytd",
+    "alpha_vs_sp500_24h", "alpha_vs_sp500_7d", "alpha_vs_sp500_mtd", "alpha_vs_sp500_qtd", "alpha_vs_sp500_ytd",
+    "alpha_vs_nasdaq_24h", "alpha_vs_nasdaq_7d", "alpha_vs_nasdaq_mtd", "alpha_vs_nasdaq_qtd", "alpha_vs_nasdaq_ytd",
+    "alpha_vs_tbill_24h", "alpha_vs_tbill_7d", "alpha_vs_tbill_mtd", "alpha_vs_tbill_qtd", "alpha_vs_tbill_ytd",
+]
+TOP_MOVER_COLUMNS = ["rank", "ticker", "score", "top_factor", "top_contribution"]
+CALENDAR_COLUMNS = [
+    "ticker", "event_date", "event_time", "fiscal_period", "expected_move", "notes",
+    "reported_rev", "guide_rev", "post_notes", "thesis_impact",
+]
+
+def available() -> bool:
+    return pa is not None
+
+def snapshot_path(version: int, identity: str) -> str:
+    return os.path.join(SNAPSHOT_DIR, f"v{int(version):08d}_{identity}")
+
+def _frame(cur, sql: str, params: tuple = ()) -> pd.DataFrame:
+    cur.execute(sql, params)
+    cols = [d[0] for d in cur.description]
+    df = pd.DataFrame(cur.fetchall(), columns=cols)
+    # NUMERIC arrives as Decimal; store float64 so readers get plain numeric columns
+    for c in df.columns:
+        values = df[c].dropna()
+        if len(values) and isinstance(values.iloc[0], Decimal):
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+    return df
+
+def _read_model(conn) -> dict:
+    with conn.cursor() as cur:
+        kpis = _frame(cur, f"SELECT {', '.join(KPI_COLUMNS)} FROM feat.feat_portfolio ORDER BY as_of_date DESC LIMIT 1")
+        triage = _frame(cur, "SELECT * FROM feat.feat_triage")
+        calendar = _frame(cur, """
+            SELECT m.ticker, e.event_date, e.event_time, e.fiscal_period, e.expected_move, e.notes,
+                   e.reported_rev, e.guide_rev, e.post_notes, e.thesis_impact
+            FROM core.core_events_earnings e
+            JOIN core.core_security_master m ON m.id = e.security_id
+            WHERE e.event_date >= CURRENT_DATE AND e.event_date <= CURRENT_DATE + %s
+            ORDER BY e.event_date, m.ticker
+        """, (CALENDAR_HORIZON_DAYS,))
+        top_movers = _frame(cur, f"""
+            SELECT {', '.join(TOP_MOVER_COLUMNS)} FROM feat.feat_top_movers
+            WHERE as_of_date = (SELECT MAX(as_of_date) FROM feat.feat_top_movers) ORDER BY rank
+        """)
+    for c in ("has_rpo", "has_estimates"):
+        if c in triage.columns:
+            triage[c] = triage[c].fillna(False).astype(bool)
+    return {"kpis": kpis, "triage": triage, "calendar": calendar, "top_movers": top_movers}
+
+def _field_types() -> dict:
+    """Columns whose Arrow type can't be inferred from every frame, e.g. all-NULL when no event is upcoming."""
+    return {"triage": {"earnings_dates": pa.list_(pa.date32())}}
+
+def _to_arrow(name: str, df: pd.DataFrame):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for col, typ in _field_types().get(name, {}).items():
+        i = table.schema.get_field_index(col)
+        if i >= 0 and table.schema.field(i).type != typ:
+            table = table.set_column(i, pa.field(col, typ), table.column(i).cast(typ))
+    return table
+
+def write_snapshot(conn, version: int):
+    """
+    Write the snapshot for a published "feat" version. Returns the path, or None
+    when pyarrow is not installed.
+    """
+    if not available():
+        return None
+    identity = database_identity(conn)
+    if os.path.isdir(snapshot_path(version, identity)):
+        return snapshot_path(version, identity)
+    return write_frames(_read_model(conn), version, identity)
+
+def write_frames(frames: dict, version: int, identity: str) -> str:
+    """
+    Write {name: DataFrame} as the snapshot for version of database identity. Files are staged in a
+    temp directory and renamed into place, so readers only ever see complete snapshots.
+    """
+    final = snapshot_path(version, identity)
+    if os.path.isdir(final):
+        return final
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging_", dir=SNAPSHOT_DIR)
+    try:
+        for name, df in frames.items():
+            table = _to_arrow(name, df)
+            # Uncompressed so the reader can memory-map the buffers without copying
+            with pa.OSFile(os.path.join(staging, f"{name}.arrow"), "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        os.rename(staging, final)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+        if not os.path.isdir(final):
+            raise
+    _prune()
+    return final
+
+def _prune() -> None:
+    # Oldest written first: version numbers from different databases don't compare
+    versions = sorted((d for d in os.listdir(SNAPSHOT_DIR) if d.startswith("v")),
+                      key=lambda d: os.path.getmtime(os.path.join(SNAPSHOT_DIR, d)))
+    for d in versions[:-SNAPSHOT_KEEP]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, d), ignore_errors=True)
+
+def open_snapshot(version: int, identity: str):
+    """Memory-map the snapshot for version of database identity: {name: pyarrow.Table}, or None if it is not on disk."""
+    if not available():
+        return None
+    path = snapshot_path(version, identity)
+    if not all(os.path.exists(os.path.join(path, f"{t}.arrow")) for t in TABLES):
+        return None
+    tables = {}
+    for t in TABLES:
+        with pa.memory_map(os.path.join(path, f"{t}.arrow"), "r") as source:
+            tables[t] = ipc.open_file(source).read_all()
+    return tables
@@ -0,0 +1,219 @@
+"""
+Benchmark harness: load the synthetic universe at several scales into a local Postgres and time the
+ingest jobs, the feature and portfolio risk jobs and the app's dashboard reads. Prints scaling curves
+(time per scale and the log-log slope between scales), writes results to data/benchmarks/, and compares against a stored baseline.
+Usage: python scripts/benchmark.py [--scales 100,1000,10000] [--days 750] [--update-baseline]
+Exit code 1 if any target is slower than the baseline by more than --tolerance.
+Do not point this at a database with real data you care about: it rewrites the SYN* universe.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection
+from scripts.synthetic_data import populate, simfin_frames, clear
+
+BASELINE_PATH = os.path.join(ROOT, "scripts", "benchmark_baseline.json")
+RESULTS_DIR = os.path.join(ROOT, "data", "benchmarks")
+# Differences below this are noise, whatever the ratio (seconds)
+NOISE_FLOOR_S = 0.05
+
+def _timed(fn, repeat: int) -> float:
+    """Median wall time of fn() over repeat runs (seconds)."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times)
+
+def _ingest_targets(n_securities: int, ingest_days: int, seed: int) -> dict:
+    """Ingest jobs fed the SimFin-shaped synthetic frames in place of the SimFin download."""
+    from jobs import ingest_simfin, ingest_benchmarks
+    frames = simfin_frames(n_securities, ingest_days, seed=seed)
+    tickers = sorted(frames["prices"]["Ticker"].unique())
+
+    def run_simfin():
+        with mock.patch.object(ingest_simfin, "load_simfin_prices", lambda t: frames["prices"].copy()), \
+             mock.patch.object(ingest_simfin, "load_simfin_fundamentals",
+                               lambda t: (frames["income"].copy(), frames["balance"].copy(), frames["cashflow"].copy(), None)):
+            ingest_simfin.job_ingest_simfin(tickers=tickers)
+
+    bench = frames["prices"][frames["prices"]["Ticker"] == tickers[0]].copy()
+    def run_benchmarks():
+        rows = [dict(r, Ticker=t) for t in ("SPY", "QQQ") for r in bench.to_dict("records")]
+        with mock.patch.object(ingest_benchmarks, "_load_prices_simfin", lambda t: rows):
+            ingest_benchmarks.job_ingest_benchmark_prices()
+
+    return {"ingest_simfin": run_simfin, "ingest_benchmarks": run_benchmarks}
+
+def _app_targets() -> dict:
+    """The app's loaders, cache cleared before each call so every call reaches storage."""
+    from app import data
+    version = data.data_version()
+    sid = next(iter(data.load_security_ids(version).values()), None)
+
+    def call(fn, *args):
+        def run():
+            fn.clear()
+            fn(version, *args)
+        return run
+
+    targets = {
+        "app.load_kpis": call(data.load_kpis),
+        "app.load_calendar": call(data.load_calendar),
+        "app.load_security_ids": call(data.load_security_ids),
+    }
+    for sort in data.TRIAGE_SORTS:
+        targets[f"app.triage[{sort}]"] = call(data.load_triage_page, sort, False, False, 50, None)
+    targets["app.triage[earnings_14d]"] = call(data.load_triage_page, "what_changed", True, False, 50, None)
+    if sid is not None:
+        targets["app.load_recent_events"] = call(data.load_recent_events, sid)
+    return targets
+
+def run_scale(n_securities: int, days: int, ingest_days: int, repeat: int, seed: int) -> dict:
+    from jobs.feat_returns import job_feat_returns
+    from jobs.feat_portfolio_risk import job_feat_portfolio_risk
+    conn = get_connection()
+    t0 = time.perf_counter()
+    populate(conn, n_securities, days, seed=seed)
+    load_s = time.perf_counter() - t0
+    conn.close()
+    print(f"  loaded {n_securities} x {days} in {load_s:.1f}s")
+
+    results = {}
+    # Jobs write, so they run once per scale; reads repeat
+    for name, fn in _ingest_targets(n_securities, ingest_days, seed).items():
+        results[name] = _timed(fn, 1)
+        print(f"  {name}: {results[name]:.3f}s")
+    results["feat_returns"] = _timed(job_feat_returns, 1)
+    print(f"  feat_returns: {results['feat_returns']:.3f}s")
+    results["feat_portfolio_risk"] = _timed(job_feat_portfolio_risk, 1)
+    print(f"  feat_portfolio_risk: {results['feat_portfolio_risk']:.3f}s")
+    for name, fn in _app_targets().items():
+        results[name] = _timed(fn, repeat)
+        print(f"  {name}: {results[name] * 1000:.1f}ms")
+    return results
+
+def scaling_table(results: dict) -> list:
+    """Rows of (target, {scale: seconds}, [log-log slopes between consecutive scales])."""
+    scales = sorted(results, key=int)
+    targets = sorted({t for r in results.values() for t in r})
+    rows = []
+    for t in targets:
+        times = {s: results[s].get(t) for s in scales}
+        slopes = []
+        for a, b in zip(scales, scales[1:]):
+            ta, tb = times[a], times[b]
+            slopes.append(math.log(tb / ta) / math.log(int(b) / int(a)) if ta and tb and ta > 0 and tb > 0 else None)
+        rows.append((t, times, slopes))
+    return rows
+
+def print_scaling(results: dict) -> None:
+    scales = sorted(results, key=int)
+    header = f"{'target':32}" + "".join(f"{s + ' names':>14}" for s in scales) + "   slope (1 = linear)"
+    print("\n" + header + "\n" + "-" * len(header))
+    for t, times, slopes in scaling_table(results):
+        cells = "".join(f"{times[s]:>13.3f}s" if times[s] is not None else f"{'—':>14}" for s in scales)
+        print(f"{t:32}{cells}   " + " ".join(f"{x:.2f}" if x is not None else "—" for x in slopes))
+
+def write_curves(results: dict, stamp: str) -> str:
+    """CSV of the curves (and a log-log PNG when matplotlib is installed). Returns the CSV path."""
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"scaling_{stamp}.csv")
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["target", "securities", "seconds"])
+        for scale, r in sorted(results.items(), key=lambda kv: int(kv[0])):
+            for t, secs in sorted(r.items()):
+                w.writerow([t, scale, f"{secs:.6f}"])
+    try:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return path
+    fig, ax = plt.subplots(figsize=(9, 6))
+    for t, times, _ in scaling_table(results):
+        pts = [(int(s), v) for s, v in times.items() if v]
+        ax.plot([p[0] for p in pts], [p[1] for p in pts], marker="o", label=t)
+    ax.set_xscale("log")
+    ax.set_yscale("log")
+    ax.set_xlabel("securities")
+    ax.set_ylabel("seconds")
+    ax.legend(fontsize=7)
+    fig.savefig(path.replace(".csv", ".png"), dpi=120, bbox_inches="tight")
+    return path
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions: targets slower than baseline * (1 + tolerance) by more than the noise floor."""
+    problems = []
+    for scale, targets in results.items():
+        for t, secs in targets.items():
+            base = baseline.get(scale, {}).get(t)
+            if base is None:
+                continue
+            if secs > base * (1 + tolerance) and secs - base > NOISE_FLOOR_S:
+                problems.append(f"{t} @ {scale}: {secs:.3f}s vs baseline {base:.3f}s (+{(secs / base - 1) * 100:.0f}%)")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", default="100,1000,10000", help="comma-separated security counts")
+    parser.add_argument("--days", type=int, default=750, help="trading days loaded per security")
+    parser.add_argument("--ingest-days", type=int, default=20, help="trading days fed through the ingest jobs")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per read target (median reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="store these results as the new baseline")
+    parser.add_argument("--keep", action="store_true", help="leave the synthetic universe in place afterwards")
+    args = parser.parse_args()
+
+    results = {}
+    for n in [int(x) for x in args.scales.split(",")]:
+        print(f"Scale {n} securities x {args.days} days")
+        results[str(n)] = run_scale(n, args.days, args.ingest_days, args.repeat, args.seed)
+    if not args.keep:
+        conn = get_connection()
+        clear(conn)
+        conn.close()
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+    print_scaling(results)
+    csv_path = write_curves(results, stamp)
+    with open(os.path.join(RESULTS_DIR, f"benchmark_{stamp}.json"), "w") as f:
+        json.dump({"run_at": stamp, "days": args.days, "ingest_days": args.ingest_days, "results": results}, f, indent=2)
+    print(f"\nCurves: {csv_path}")
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"days": args.days, "ingest_days": args.ingest_days, "results": results}, f, indent=2, sort_keys=True)
+        print(f"Baseline updated: {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --update-baseline to store one.")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if (baseline.get("days"), baseline.get("ingest_days")) != (args.days, args.ingest_days):
+        print(f"Baseline was taken with --days {baseline.get('days')} --ingest-days {baseline.get('ingest_days')}; not comparable.")
+        sys.exit(1)
+    problems = compare(results, baseline["results"], args.tolerance)
+    if problems:
+        print("\nREGRESSIONS:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("\nOK: no regressions against baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -9,16 +9,20 @@ import sys
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, ROOT)
 
-from models.db import get_connection, run_sql_file
+from models.db import get_connection, run_sql_file, publish_data_version
+from models.partitions import ensure_partitions
 
 def main():
     conn = get_connection()
     sql_dir = os.path.join(ROOT, "sql")
-    for name in ["00_schemas.sql", "01_raw_tables.sql", "02_core_tables.sql", "03_feat_tables.sql", "04_phase2.sql"]:
+    for name in ["00_schemas.sql", "01_raw_tables.sql", "02_core_tables.sql", "03_feat_tables.sql", "04_phase2.sql", "05_storage_layout.sql", "06_query_profile.sql", "07_data_version.sql", "09_pipeline_state.sql", "10_job_ledger.sql", "11_peer_relative.sql", "12_revisions.sql", "13_rpo.sql", "14_scoring.sql", "15_portfolio_risk.sql", "16_event_study.sql", "17_corporate_actions.sql", "18_data_quality.sql", "19_raw_archive.sql", "20_attribution.sql", "21_triage_view.sql", "22_synthetic_data.sql"]:
         path = os.path.join(sql_dir, name)
         if os.path.isfile(path):
             run_sql_file(conn, path)
             print(f"Ran {name}")
+    created = ensure_partitions(conn)
+    if created:
+        print(f"Created {created} partitions")
 
     from config.tickers import DEFAULT_TICKERS
     from config.cik_map import TICKER_TO_CIK
@@ -58,6 +62,7 @@ def main():
                     (sid, w),
                 )
     conn.commit()
+    publish_data_version(conn, "core", tables=["core.core_security_master", "core.core_benchmarks", "core.core_positions"])
     conn.close()
     print("Bootstrap done: security_master, benchmarks, default positions.")
 
@@ -0,0 +1,302 @@
+"""
+Synthetic dataset for local verification and benchmarks: N securities x D trading days of prices,
+plus quarterly fundamentals, benchmark prices, positions, earnings events and feat_returns rows.
+simfin_frames() builds the same universe in SimFin's DataFrame shape for timing the ingest jobs.
+Synthetic names use the SYN ticker prefix and filled-in benchmark closes are recorded, so clear() removes
+exactly what populate() added and the rows derived from it.
+Usage: python scripts/synthetic_data.py --securities 1000 --days 750 [--clear]
+"""
+import argparse
+import io
+import os
+import sys
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection
+from models.partitions import ensure_partitions
+from jobs.publish_dashboard import publish_dashboard
+
+SYN_PREFIX = "SYN"
+
+def trading_days(n_days: int, end: date = None) -> list:
+    """Last n_days business days ending on or before end (default today)."""
+    end = end or date.today()
+    return [d.date() for d in pd.bdate_range(end=end, periods=n_days)]
+
+def _copy(cur, table: str, columns: list, df: pd.DataFrame) -> None:
+    buf = io.StringIO()
+    df.to_csv(buf, index=False, header=False, na_rep="")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+def _random_walk(rng, n_securities: int, n_days: int) -> np.ndarray:
+    """Closes as a (days x securities) geometric random walk with per-name vol."""
+    vol = rng.uniform(0.01, 0.04, size=n_securities)
+    rets = rng.standard_normal((n_days, n_securities)) * vol + 0.0003
+    start = rng.uniform(10, 500, size=n_securities)
+    return np.round(start * np.exp(np.cumsum(rets, axis=0)), 4)
+
+# Rows keyed on a security
+SECURITY_TABLES = [
+    "core.core_prices_daily", "core.core_positions", "core.core_events_earnings", "core.core_fundamentals_quarterly",
+    "core.core_corporate_actions", "core.core_adjustment_factors", "feat.feat_returns", "feat.feat_valuation", "feat.feat_revisions",
+    "feat.feat_rpo", "feat.feat_risk", "feat.feat_peer_relative", "feat.feat_scores", "feat.feat_score_contributions",
+    "feat.feat_top_movers", "feat.feat_event_returns", "feat.feat_event_moves", "feat.feat_attribution_positions",
+    "feat.feat_portfolio_risk_components", "ops.dq_findings", "ops.dq_quarantine",
+]
+# Cross-sectional rows: every name's score / rank on a date the SYN names were scored with it
+SCORED_TABLES = ["feat.feat_scores", "feat.feat_score_contributions", "feat.feat_top_movers"]
+# Rolled up from the latest book: dates on or after the first SYN book, when a SYN book is the latest one
+BOOK_TABLES = [
+    "feat.feat_portfolio", "feat.feat_portfolio_risk", "feat.feat_portfolio_risk_components",
+    "feat.feat_attribution_groups", "feat.feat_attribution_positions",
+]
+
+# Benchmark returns read closes this far back (jobs/feat_returns.py: 400 trading days)
+BENCHMARK_WINDOW_DAYS = 600
+
+def clear(conn, publish: bool = True) -> None:
+    """
+    Remove every SYN* security and everything keyed on or rolled up from it: its own rows, the scores,
+    portfolio roll-ups, risk and attribution computed while the synthetic book was the latest one, and the
+    benchmark closes populate() inserted (ops.synthetic_benchmark_prices) with the returns computed from them.
+    The feature jobs rebuild the real rows on their next run. When anything was removed the dashboard is
+    republished, so the triage view and snapshot drop the SYN rows.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT id FROM core.core_security_master WHERE ticker LIKE %s", (SYN_PREFIX + "%",))
+        ids = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT benchmark_id, MIN(trade_date), MAX(trade_date) FROM ops.synthetic_benchmark_prices GROUP BY benchmark_id")
+        bench_windows = cur.fetchall()
+        if ids:
+            cur.execute("""
+                SELECT MIN(as_of_date) FILTER (WHERE security_id = ANY(%s)),
+                       MAX(as_of_date) FILTER (WHERE security_id = ANY(%s)) = MAX(as_of_date)
+                FROM core.core_positions
+            """, (ids, ids))
+            book_since, book_is_latest = cur.fetchone()
+            cur.execute("SELECT DISTINCT as_of_date FROM feat.feat_scores WHERE security_id = ANY(%s)", (ids,))
+            scored = [r[0] for r in cur.fetchall()]
+            for table in SCORED_TABLES:
+                cur.execute(f"DELETE FROM {table} WHERE as_of_date = ANY(%s)", (scored,))
+            if book_is_latest:
+                for table in BOOK_TABLES:
+                    cur.execute(f"DELETE FROM {table} WHERE as_of_date >= %s", (book_since,))
+            for table in SECURITY_TABLES:
+                cur.execute(f"DELETE FROM {table} WHERE security_id = ANY(%s)", (ids,))
+            cur.execute("DELETE FROM core.core_security_master WHERE id = ANY(%s)", (ids,))
+        for bid, since, until in bench_windows:
+            cur.execute("DELETE FROM feat.feat_benchmark_returns WHERE benchmark_id = %s AND as_of_date BETWEEN %s AND %s",
+                        (bid, since, until + timedelta(days=BENCHMARK_WINDOW_DAYS)))
+        cur.execute("""
+            DELETE FROM core.core_benchmark_prices_daily p USING ops.synthetic_benchmark_prices s
+            WHERE p.benchmark_id = s.benchmark_id AND p.trade_date = s.trade_date
+        """)
+        cur.execute("DELETE FROM ops.synthetic_benchmark_prices")
+        for table in ["raw.raw_prices_daily", "raw.raw_simfin_income_q", "raw.raw_simfin_balance_q", "raw.raw_simfin_cashflow_q", "raw.raw_corporate_actions"]:
+            cur.execute(f"DELETE FROM {table} WHERE ticker LIKE %s", (SYN_PREFIX + "%",))
+    conn.commit()
+    if publish and (ids or bench_windows):
+        publish_dashboard(conn, tables=["core.core_security_master", "core.core_benchmark_prices_daily", *BOOK_TABLES, *SCORED_TABLES])
+
+def _quarter_ends(days: list) -> list:
+    return [d.date() for d in pd.date_range(days[0], days[-1], freq="QE")]
+
+def _fundamentals(rng, n_securities: int, periods: list) -> dict:
+    """(periods x securities) arrays of quarterly revenue, net income and balance / cash-flow lines."""
+    shape = (len(periods), n_securities)
+    base = rng.uniform(5e7, 5e9, size=n_securities)
+    growth = np.cumprod(1 + rng.normal(0.02, 0.05, size=shape), axis=0)
+    revenue = (base * growth).round()
+    margin = rng.normal(0.12, 0.08, size=shape)
+    assets = (revenue * rng.uniform(2, 4, size=n_securities)).round()
+    liabilities = (assets * rng.uniform(0.3, 0.7, size=n_securities)).round()
+    return {
+        "revenue": revenue,
+        "net_income": (revenue * margin).round(),
+        "total_assets": assets,
+        "total_liabilities": liabilities,
+        "total_equity": assets - liabilities,
+        "cash_and_equivalents": (assets * 0.1).round(),
+        "total_debt": (liabilities * 0.5).round(),
+        "operating_cashflow": (revenue * (margin + 0.05)).round(),
+        "free_cashflow": (revenue * margin).round(),
+        "shares_diluted": np.broadcast_to(rng.integers(5e7, 2e9, size=n_securities), shape),
+    }
+
+def simfin_frames(n_securities: int, n_days: int, seed: int = 7) -> dict:
+    """
+    The synthetic universe in the shape the SimFin loaders return: {"prices", "income", "balance", "cashflow"}
+    DataFrames with SimFin's Title Case columns. Same seed -> same closes as populate().
+    """
+    rng = np.random.default_rng(seed)
+    days = trading_days(n_days)
+    tickers = [f"{SYN_PREFIX}{i:05d}" for i in range(n_securities)]
+    closes = _random_walk(rng, n_securities, n_days)
+    n = n_days * n_securities
+    close = closes.reshape(n)
+    prices = pd.DataFrame({
+        "Ticker": np.tile(tickers, n_days),
+        "Date": pd.to_datetime(np.repeat(days, n_securities)),
+        "Open": close,
+        "High": np.round(close * 1.01, 4),
+        "Low": np.round(close * 0.99, 4),
+        "Close": close,
+        "Volume": rng.integers(1e5, 1e7, size=n),
+    })
+    periods = _quarter_ends(days)
+    f = _fundamentals(rng, n_securities, periods)
+    keys = {"Ticker": np.tile(tickers, len(periods)), "Report Date": pd.to_datetime(np.repeat(periods, n_securities))}
+    flat = {k: v.reshape(-1) for k, v in f.items()}
+    return {
+        "prices": prices,
+        "income": pd.DataFrame({**keys, "Revenue": flat["revenue"], "Net Income": flat["net_income"]}),
+        "balance": pd.DataFrame({**keys, "Total Assets": flat["total_assets"], "Total Liabilities": flat["total_liabilities"],
+                                 "Total Equity": flat["total_equity"], "Cash and Equivalents": flat["cash_and_equivalents"],
+                                 "Total Debt": flat["total_debt"]}),
+        "cashflow": pd.DataFrame({**keys, "Operating Cash Flow": flat["operating_cashflow"], "Free Cash Flow": flat["free_cashflow"]}),
+    }
+
+def populate(conn, n_securities: int, n_days: int, seed: int = 7, raw: bool = False, end: date = None) -> dict:
+    """Replace the synthetic universe with n_securities x n_days of data ending on end (default today). Returns row counts."""
+    rng = np.random.default_rng(seed)
+    days = trading_days(n_days, end)
+    clear(conn, publish=False)
+    ensure_partitions(conn)
+    tickers = [f"{SYN_PREFIX}{i:05d}" for i in range(n_securities)]
+    closes = _random_walk(rng, n_securities, n_days)
+    counts = {}
+    with conn.cursor() as cur:
+        execute_values(
+            cur,
+            "INSERT INTO core.core_security_master (ticker, name, currency) VALUES %s",
+            [(t, f"Synthetic {t}", "USD") for t in tickers],
+            page_size=1000,
+        )
+        cur.execute("SELECT id FROM core.core_security_master WHERE ticker LIKE %s ORDER BY ticker", (SYN_PREFIX + "%",))
+        ids = np.array([r[0] for r in cur.fetchall()])
+
+        # Prices: one row per (security, day), loaded with COPY in date order
+        n = n_days * n_securities
+        prices = pd.DataFrame({
+            "security_id": np.tile(ids, n_days),
+            "trade_date": np.repeat(days, n_securities),
+            "close": closes.reshape(n),
+        })
+        prices["open"] = prices["close"]
+        prices["high"] = np.round(prices["close"] * 1.01, 4)
+        prices["low"] = np.round(prices["close"] * 0.99, 4)
+        prices["volume"] = rng.integers(1e5, 1e7, size=n)
+        cols = ["security_id", "trade_date", "open", "high", "low", "close", "volume"]
+        _copy(cur, "core.core_prices_daily", cols, prices[cols])
+        counts["core_prices_daily"] = n
+        if raw:
+            raw_df = prices.assign(
+                ticker=np.tile(tickers, n_days),
+                provider="synthetic",
+                source_hash=[f"syn{i}" for i in range(n)],
+            )
+            cols = ["provider", "source_hash", "ticker", "trade_date", "open", "high", "low", "close", "volume"]
+            _copy(cur, "raw.raw_prices_daily", cols, raw_df[cols])
+            counts["raw_prices_daily"] = n
+
+        # Fundamentals: one row per (security, quarter end) in the window
+        periods = _quarter_ends(days)
+        if periods:
+            f = _fundamentals(rng, n_securities, periods)
+            fund = pd.DataFrame({"security_id": np.tile(ids, len(periods)), "period_end": np.repeat(periods, n_securities)})
+            for col, values in f.items():
+                fund[col] = values.reshape(-1).astype("int64")
+            _copy(cur, "core.core_fundamentals_quarterly", list(fund.columns), fund)
+            counts["core_fundamentals_quarterly"] = len(fund)
+
+        # Benchmarks: keep any real series, fill the synthetic window where missing and record what was filled
+        cur.execute("SELECT id FROM core.core_benchmarks WHERE ticker IN ('SPY', 'QQQ')")
+        bench_rows = []
+        for (bid,) in cur.fetchall():
+            series = _random_walk(rng, 1, n_days)[:, 0]
+            bench_rows.extend((bid, d, float(c)) for d, c in zip(days, series))
+        inserted = execute_values(
+            cur,
+            """WITH ins AS (
+                   INSERT INTO core.core_benchmark_prices_daily (benchmark_id, trade_date, close) VALUES %s
+                   ON CONFLICT (benchmark_id, trade_date) DO NOTHING RETURNING benchmark_id, trade_date)
+               INSERT INTO ops.synthetic_benchmark_prices SELECT benchmark_id, trade_date FROM ins RETURNING 1""",
+            bench_rows,
+            page_size=5000,
+            fetch=True,
+        )
+        counts["core_benchmark_prices_daily"] = len(inserted)
+
+        # Positions: random long-only weights on the latest day
+        w = rng.dirichlet(np.ones(n_securities))
+        execute_values(
+            cur,
+            "INSERT INTO core.core_positions (security_id, weight, as_of_date) VALUES %s ON CONFLICT (security_id, as_of_date) DO UPDATE SET weight = EXCLUDED.weight",
+            [(int(s), float(x), days[-1]) for s, x in zip(ids, w)],
+            page_size=5000,
+        )
+        counts["core_positions"] = n_securities
+
+        # Earnings: quarterly events spread over the window plus one upcoming per name
+        offsets = rng.integers(0, 63, size=n_securities)
+        events = []
+        for sid, off in zip(ids, offsets):
+            d = days[0] + timedelta(days=int(off))
+            while d <= days[-1] + timedelta(days=90):
+                events.append((int(sid), d, f"Q{(d.month - 1) // 3 + 1} FY{d.year % 100}"))
+                d += timedelta(days=91)
+        execute_values(cur, "INSERT INTO core.core_events_earnings (security_id, event_date, fiscal_period) VALUES %s", events, page_size=5000)
+        counts["core_events_earnings"] = len(events)
+
+        # feat_returns for the last 5 as-of dates so the triage/KPI paths have data
+        feat = []
+        for d in days[-5:]:
+            r = rng.standard_normal((n_securities, 5)) * 0.03
+            spike = rng.uniform(0.3, 3.0, size=n_securities)
+            dd = -rng.uniform(0, 0.6, size=n_securities)
+            for i, sid in enumerate(ids):
+                feat.append((int(sid), d, *map(float, r[i]), float(spike[i]), float(dd[i])))
+        execute_values(
+            cur,
+            """INSERT INTO feat.feat_returns (security_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
+                   vol_spike_ratio, drawdown_52w) VALUES %s
+               ON CONFLICT (security_id, as_of_date) DO NOTHING""",
+            feat,
+            page_size=5000,
+        )
+        counts["feat_returns"] = len(feat)
+    conn.commit()
+    with conn.cursor() as cur:
+        for table in ["core.core_prices_daily", "raw.raw_prices_daily", "core.core_positions", "core.core_events_earnings", "core.core_fundamentals_quarterly", "feat.feat_returns"]:
+            cur.execute(f"ANALYZE {table}")
+    conn.commit()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--securities", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--raw", action="store_true", help="also load raw.raw_prices_daily")
+    parser.add_argument("--clear", action="store_true", help="only remove synthetic data")
+    args = parser.parse_args()
+    conn = get_connection()
+    if args.clear:
+        clear(conn)
+        print("Synthetic data cleared.")
+    else:
+        counts = populate(conn, args.securities, args.days, seed=args.seed, raw=args.raw)
+        for table, n in counts.items():
+            print(f"{table}: {n} rows")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
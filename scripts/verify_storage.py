@@ -0,0 +1,98 @@
+"""
+Verify the partitioned storage layout against a local Postgres: optionally load the synthetic
+dataset, then EXPLAIN the hot access paths and check for partition pruning and index use.
+Usage: python scripts/verify_storage.py [--populate --securities 1000 --days 750]
+Exit code 1 if any access path falls back to a sequential scan of a large table.
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from models.db import get_connection
+
+# Relations that must never be sequentially scanned on the hot paths (partitions match by prefix)
+LARGE_TABLES = ("core_prices_daily", "feat_returns", "raw_prices_daily")
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+def explain(cur, sql: str, params: tuple) -> dict:
+    cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+    return cur.fetchone()[0][0]
+
+def check_plan(name: str, plan: dict) -> list:
+    """Return a list of problems: seq scans over the large tables."""
+    problems = []
+    for node in _walk(plan["Plan"]):
+        rel = node.get("Relation Name") or ""
+        if node["Node Type"] == "Seq Scan" and rel.startswith(LARGE_TABLES):
+            problems.append(f"{name}: Seq Scan on {rel}")
+    return problems
+
+def summarize(name: str, plan: dict) -> str:
+    nodes = list(_walk(plan["Plan"]))
+    scans = sorted({f"{n['Node Type']} {n.get('Index Name') or n.get('Relation Name') or ''}".strip()
+                    for n in nodes if "Scan" in n["Node Type"]})
+    parts = {n["Relation Name"] for n in nodes if n.get("Relation Name", "").startswith(LARGE_TABLES)}
+    return f"{name}: {plan['Execution Time']:.2f} ms, {len(parts)} partition(s) touched\n    " + "\n    ".join(scans)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--populate", action="store_true", help="load the synthetic dataset first")
+    parser.add_argument("--securities", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=750)
+    parser.add_argument("--json", action="store_true", help="print the raw plans as JSON")
+    args = parser.parse_args()
+
+    conn = get_connection()
+    if args.populate:
+        from scripts.synthetic_data import populate
+        populate(conn, args.securities, args.days)
+    cur = conn.cursor()
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = 'core.core_prices_daily'::regclass")
+    if cur.fetchone()[0] != "p":
+        print("core.core_prices_daily is not partitioned; run scripts/bootstrap_db.py first.")
+        sys.exit(1)
+    cur.execute("SELECT security_id FROM core.core_prices_daily WHERE trade_date = (SELECT MAX(trade_date) FROM core.core_prices_daily) LIMIT 1")
+    row = cur.fetchone()
+    sample_sid = row[0] if row else 1
+
+    cur.execute("SELECT pg_get_viewdef('feat.feat_triage'::regclass)")
+    triage_def = cur.fetchone()[0].rstrip().rstrip(";")
+
+    paths = {
+        "_price_series": ("""
+            SELECT trade_date, close FROM core.core_prices_daily
+            WHERE security_id = %s AND trade_date <= %s
+            ORDER BY trade_date DESC
+            LIMIT %s
+        """, (sample_sid, date.today(), 401)),
+        "latest trade date": ("SELECT MAX(trade_date) FROM core.core_prices_daily WHERE trade_date <= %s", (date.today(),)),
+        "latest feat as-of": ("SELECT MAX(as_of_date) FROM feat.feat_returns", ()),
+        "latest positions as-of": ("SELECT MAX(as_of_date) FROM core.core_positions", ()),
+        "triage refresh (feat.feat_triage definition)": (triage_def, ()),
+        "triage read": ("SELECT * FROM feat.feat_triage", ()),
+    }
+    problems = []
+    for name, (sql, params) in paths.items():
+        plan = explain(cur, sql, params)
+        conn.rollback()
+        print(summarize(name, plan))
+        if args.json:
+            print(json.dumps(plan, indent=2, default=str))
+        problems.extend(check_plan(name, plan))
+    conn.close()
+    if problems:
+        print("\nFAILED:\n  " + "\n  ".join(problems))
+        sys.exit(1)
+    print("\nOK: all access paths use partition pruning / indexes.")
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,4 @@
 CREATE SCHEMA IF NOT EXISTS raw;
 CREATE SCHEMA IF NOT EXISTS core;
 CREATE SCHEMA IF NOT EXISTS feat;
+CREATE SCHEMA IF NOT EXISTS ops;
@@ -0,0 +1,162 @@
+-- Storage layout: yearly range partitions for the date-keyed price and feature tables,
+-- BRIN indexes on the date columns and covering b-trees for the app / job access paths.
+-- Safe for re-run: each table is converted only while it is still a plain heap table.
+
+-- Create missing yearly partitions [from_year, to_year] of a date-partitioned parent.
+-- Existing (or detached-but-kept) partition tables are left alone. No-op for heap tables.
+CREATE OR REPLACE FUNCTION core.ensure_year_partitions(parent regclass, from_year INT, to_year INT)
+RETURNS INT LANGUAGE plpgsql AS $fn$
+DECLARE
+  parent_schema TEXT;
+  parent_name TEXT;
+  parent_kind "char";
+  part TEXT;
+  y INT;
+  created INT := 0;
+BEGIN
+  SELECT n.nspname, c.relname, c.relkind INTO parent_schema, parent_name, parent_kind
+  FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+  WHERE c.oid = parent;
+  IF parent_kind <> 'p' THEN
+    RETURN 0;
+  END IF;
+  FOR y IN from_year..to_year LOOP
+    part := format('%s_y%s', parent_name, y);
+    IF to_regclass(format('%I.%I', parent_schema, part)) IS NULL THEN
+      EXECUTE format('CREATE TABLE %I.%I PARTITION OF %s FOR VALUES FROM (%L) TO (%L)',
+                     parent_schema, part, parent, make_date(y, 1, 1), make_date(y + 1, 1, 1));
+      created := created + 1;
+    END IF;
+  END LOOP;
+  RETURN created;
+END $fn$;
+
+-- core.core_prices_daily -> partitioned by trade_date
+DO $$
+DECLARE
+  hi INT := EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'core.core_prices_daily'::regclass) = 'r' THEN
+    ALTER TABLE core.core_prices_daily RENAME TO core_prices_daily_heap;
+    CREATE TABLE core.core_prices_daily (
+        id INTEGER NOT NULL DEFAULT nextval('core.core_prices_daily_id_seq'),
+        security_id INTEGER NOT NULL REFERENCES core.core_security_master(id),
+        trade_date DATE NOT NULL,
+        open NUMERIC,
+        high NUMERIC,
+        low NUMERIC,
+        close NUMERIC NOT NULL,
+        volume BIGINT,
+        CONSTRAINT core_prices_daily_part_pkey PRIMARY KEY (id, trade_date),
+        CONSTRAINT core_prices_daily_part_security_date_key UNIQUE (security_id, trade_date)
+    ) PARTITION BY RANGE (trade_date);
+    CREATE TABLE core.core_prices_daily_hist PARTITION OF core.core_prices_daily
+        FOR VALUES FROM (MINVALUE) TO ('2000-01-01');
+    PERFORM core.ensure_year_partitions('core.core_prices_daily', 2000, hi);
+    INSERT INTO core.core_prices_daily (id, security_id, trade_date, open, high, low, close, volume)
+    SELECT id, security_id, trade_date, open, high, low, close, volume FROM core.core_prices_daily_heap;
+    ALTER SEQUENCE core.core_prices_daily_id_seq OWNED BY core.core_prices_daily.id;
+    DROP TABLE core.core_prices_daily_heap;
+  END IF;
+END $$;
+
+-- raw.raw_prices_daily -> partitioned by trade_date
+DO $$
+DECLARE
+  hi INT := EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'raw.raw_prices_daily'::regclass) = 'r' THEN
+    ALTER TABLE raw.raw_prices_daily RENAME TO raw_prices_daily_heap;
+    CREATE TABLE raw.raw_prices_daily (
+        id INTEGER NOT NULL DEFAULT nextval('raw.raw_prices_daily_id_seq'),
+        provider TEXT NOT NULL DEFAULT 'simfin',
+        asof_loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        source_hash TEXT,
+        payload JSONB,
+        ticker TEXT NOT NULL,
+        trade_date DATE NOT NULL,
+        open NUMERIC,
+        high NUMERIC,
+        low NUMERIC,
+        close NUMERIC,
+        volume BIGINT,
+        CONSTRAINT raw_prices_daily_part_pkey PRIMARY KEY (id, trade_date),
+        CONSTRAINT raw_prices_daily_part_ticker_date_hash_key UNIQUE (ticker, trade_date, source_hash)
+    ) PARTITION BY RANGE (trade_date);
+    CREATE TABLE raw.raw_prices_daily_hist PARTITION OF raw.raw_prices_daily
+        FOR VALUES FROM (MINVALUE) TO ('2000-01-01');
+    PERFORM core.ensure_year_partitions('raw.raw_prices_daily', 2000, hi);
+    INSERT INTO raw.raw_prices_daily (id, provider, asof_loaded_at, source_hash, payload, ticker, trade_date, open, high, low, close, volume)
+    SELECT id, provider, asof_loaded_at, source_hash, payload, ticker, trade_date, open, high, low, close, volume FROM raw.raw_prices_daily_heap;
+    ALTER SEQUENCE raw.raw_prices_daily_id_seq OWNED BY raw.raw_prices_daily.id;
+    DROP TABLE raw.raw_prices_daily_heap;
+  END IF;
+END $$;
+
+-- feat.feat_returns -> partitioned by as_of_date (columns include the phase 2 triage fields)
+DO $$
+DECLARE
+  hi INT := EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1;
+BEGIN
+  IF (SELECT relkind FROM pg_class WHERE oid = 'feat.feat_returns'::regclass) = 'r' THEN
+    ALTER TABLE feat.feat_returns RENAME TO feat_returns_heap;
+    CREATE TABLE feat.feat_returns (
+        id INTEGER NOT NULL DEFAULT nextval('feat.feat_returns_id_seq'),
+        security_id INTEGER NOT NULL,
+        as_of_date DATE NOT NULL,
+        return_24h NUMERIC,
+        return_7d NUMERIC,
+        return_mtd NUMERIC,
+        return_qtd NUMERIC,
+        return_ytd NUMERIC,
+        rolling_vol_20d NUMERIC,
+        drawdown NUMERIC,
+        vol_7d NUMERIC,
+        vol_60d NUMERIC,
+        vol_spike_ratio NUMERIC,
+        drawdown_52w NUMERIC,
+        what_changed_score NUMERIC,
+        CONSTRAINT feat_returns_part_pkey PRIMARY KEY (id, as_of_date),
+        CONSTRAINT feat_returns_part_security_date_key UNIQUE (security_id, as_of_date)
+    ) PARTITION BY RANGE (as_of_date);
+    CREATE TABLE feat.feat_returns_hist PARTITION OF feat.feat_returns
+        FOR VALUES FROM (MINVALUE) TO ('2000-01-01');
+    PERFORM core.ensure_year_partitions('feat.feat_returns', 2000, hi);
+    INSERT INTO feat.feat_returns (id, security_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
+        rolling_vol_20d, drawdown, vol_7d, vol_60d, vol_spike_ratio, drawdown_52w, what_changed_score)
+    SELECT id, security_id, as_of_date, return_24h, return_7d, return_mtd, return_qtd, return_ytd,
+        rolling_vol_20d, drawdown, vol_7d, vol_60d, vol_spike_ratio, drawdown_52w, what_changed_score
+    FROM feat.feat_returns_heap;
+    ALTER SEQUENCE feat.feat_returns_id_seq OWNED BY feat.feat_returns.id;
+    DROP TABLE feat.feat_returns_heap;
+  END IF;
+END $$;
+
+-- BRIN on the date columns: tiny, and enough to skip blocks for date-range scans inside a partition
+CREATE INDEX IF NOT EXISTS core_prices_daily_trade_date_brin ON core.core_prices_daily USING brin (trade_date) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS raw_prices_daily_trade_date_brin ON raw.raw_prices_daily USING brin (trade_date) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS raw_prices_daily_asof_loaded_brin ON raw.raw_prices_daily USING brin (asof_loaded_at) WITH (pages_per_range = 32);
+CREATE INDEX IF NOT EXISTS feat_returns_as_of_date_brin ON feat.feat_returns USING brin (as_of_date) WITH (pages_per_range = 32);
+
+-- _price_series: WHERE security_id = ? AND trade_date <= ? ORDER BY trade_date DESC LIMIT n -> index-only scan
+CREATE INDEX IF NOT EXISTS core_prices_daily_security_date_cover ON core.core_prices_daily (security_id, trade_date DESC) INCLUDE (close);
+-- job_feat_returns: MAX(trade_date) WHERE trade_date <= ?
+CREATE INDEX IF NOT EXISTS core_prices_daily_trade_date_idx ON core.core_prices_daily (trade_date);
+
+-- Triage join on (security_id, as_of_date = latest) + MAX(as_of_date) lookups. what_changed_score is deprecated
+-- (the score lives in feat.feat_scores): indexes built when it was still covered are rebuilt without it once.
+DO $$
+BEGIN
+  IF to_regclass('feat.feat_returns_as_of_security_cover') IS NOT NULL THEN
+    IF pg_get_indexdef(to_regclass('feat.feat_returns_as_of_security_cover')) LIKE '%what_changed_score%' THEN
+      DROP INDEX feat.feat_returns_as_of_security_cover;
+    END IF;
+  END IF;
+END $$;
+CREATE INDEX IF NOT EXISTS feat_returns_as_of_security_cover ON feat.feat_returns (as_of_date, security_id)
+    INCLUDE (return_24h, return_7d, return_mtd, return_qtd, return_ytd, vol_spike_ratio, drawdown_52w);
+CREATE INDEX IF NOT EXISTS core_positions_as_of_security_cover ON core.core_positions (as_of_date, security_id) INCLUDE (weight);
+CREATE INDEX IF NOT EXISTS feat_valuation_as_of_security_cover ON feat.feat_valuation (as_of_date, security_id) INCLUDE (pct_historical);
+CREATE INDEX IF NOT EXISTS feat_benchmark_returns_as_of_idx ON feat.feat_benchmark_returns (as_of_date);
+CREATE INDEX IF NOT EXISTS core_events_earnings_security_date_idx ON core.core_events_earnings (security_id, event_date);
+CREATE INDEX IF NOT EXISTS core_events_earnings_event_date_idx ON core.core_events_earnings (event_date);
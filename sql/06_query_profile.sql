@@ -0,0 +1,18 @@
+-- Ops: per-statement query profiles emitted by models.db.emit_profile_report (DB_PROFILE_SINK=table)
+CREATE SCHEMA IF NOT EXISTS ops;
+
+CREATE TABLE IF NOT EXISTS ops.query_profile (
+    id SERIAL PRIMARY KEY,
+    run_name TEXT NOT NULL,
+    run_at TIMESTAMPTZ NOT NULL,
+    fingerprint TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    total_ms NUMERIC,
+    mean_ms NUMERIC,
+    p95_ms NUMERIC,
+    max_ms NUMERIC,
+    rows BIGINT,
+    plan JSONB
+);
+
+CREATE INDEX IF NOT EXISTS query_profile_run_idx ON ops.query_profile (run_name, run_at);
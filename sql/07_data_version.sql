@@ -0,0 +1,24 @@
+-- Data-version stamps: jobs bump a scope when they publish, the app keys its caches on them
+CREATE TABLE IF NOT EXISTS feat.feat_data_version (
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    as_of_date DATE,
+    published_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Per-table stamps, bumped for every table a publish names: each app loader is keyed on the tables it reads
+CREATE TABLE IF NOT EXISTS feat.feat_table_version (
+    table_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 1,
+    scope TEXT NOT NULL,
+    published_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- One row, created with the database: files cached outside Postgres (dashboard snapshots, the price cube)
+-- are keyed on it, so a reset or re-created database, whose versions restart at 1, never serves the old files
+CREATE TABLE IF NOT EXISTS feat.feat_data_identity (
+    singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    identity UUID NOT NULL DEFAULT gen_random_uuid(),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+INSERT INTO feat.feat_data_identity DEFAULT VALUES ON CONFLICT DO NOTHING;
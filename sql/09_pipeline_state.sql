@@ -0,0 +1,13 @@
+-- Ops: per-stage state for jobs/pipeline.py (skip-if-fresh and resume from the failed node)
+CREATE SCHEMA IF NOT EXISTS ops;
+
+CREATE TABLE IF NOT EXISTS ops.pipeline_stage_state (
+    stage TEXT PRIMARY KEY,
+    status TEXT NOT NULL,                 -- running | success | failed | blocked
+    run_id TEXT NOT NULL,
+    input_fingerprint TEXT,               -- inputs of the last attempt
+    success_fingerprint TEXT,             -- inputs of the last successful run (compared for skip-if-fresh)
+    started_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ,
+    error TEXT
+);
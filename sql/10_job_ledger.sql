@@ -0,0 +1,54 @@
+-- Ops: job-run ledger written by models/ledger.py (one row per run, one per stage, latest watermark per source)
+CREATE SCHEMA IF NOT EXISTS ops;
+
+CREATE TABLE IF NOT EXISTS ops.job_run (
+    id BIGSERIAL PRIMARY KEY,
+    job TEXT NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    finished_at TIMESTAMPTZ,
+    duration_ms NUMERIC,
+    status TEXT NOT NULL DEFAULT 'running',   -- running | success | partial | failed
+    error TEXT,
+    host TEXT,
+    pid INTEGER
+);
+
+CREATE INDEX IF NOT EXISTS job_run_job_started_idx ON ops.job_run (job, started_at DESC);
+
+CREATE TABLE IF NOT EXISTS ops.job_stage (
+    id BIGSERIAL PRIMARY KEY,
+    run_id BIGINT NOT NULL REFERENCES ops.job_run(id) ON DELETE CASCADE,
+    stage TEXT NOT NULL,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ,
+    duration_ms NUMERIC,
+    status TEXT NOT NULL,
+    rows_read BIGINT NOT NULL DEFAULT 0,
+    rows_inserted BIGINT NOT NULL DEFAULT 0,
+    rows_updated BIGINT NOT NULL DEFAULT 0,
+    rows_skipped BIGINT NOT NULL DEFAULT 0,
+    bytes_fetched BIGINT NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    watermarks JSONB
+);
+
+CREATE INDEX IF NOT EXISTS job_stage_run_idx ON ops.job_stage (run_id);
+
+CREATE TABLE IF NOT EXISTS ops.job_watermark (
+    job TEXT NOT NULL,
+    source TEXT NOT NULL,
+    watermark TEXT NOT NULL,
+    run_id BIGINT,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (job, source)
+);
+
+-- Per-stage throughput over time, for spotting regressions
+CREATE OR REPLACE VIEW ops.job_stage_throughput AS
+SELECT r.job, s.stage, r.started_at, s.status, s.duration_ms,
+       s.rows_read, s.rows_inserted + s.rows_updated AS rows_written, s.bytes_fetched, s.errors,
+       (s.rows_inserted + s.rows_updated) / NULLIF(s.duration_ms / 1000.0, 0) AS rows_written_per_s,
+       s.bytes_fetched / NULLIF(s.duration_ms / 1000.0, 0) AS bytes_per_s
+FROM ops.job_stage s
+JOIN ops.job_run r ON r.id = s.run_id;
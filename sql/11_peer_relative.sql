@@ -0,0 +1,25 @@
+-- Peer-relative performance (jobs/feat_peer_relative.py): one row per (security, peer set, date).
+-- A security in several peer sets gets one row per set; the triage view averages across them.
+
+-- core_peer_sets is seeded by name from config/peer_sets.py (ON CONFLICT (name)). The baseline table allows
+-- repeated names: keep the newest set of each name (the last one seeded) before the name becomes unique.
+DO $$
+BEGIN
+  IF to_regclass('core.core_peer_sets_name_idx') IS NULL THEN
+    DELETE FROM core.core_peer_sets a USING core.core_peer_sets b WHERE a.name = b.name AND a.id < b.id;
+  END IF;
+END $$;
+CREATE UNIQUE INDEX IF NOT EXISTS core_peer_sets_name_idx ON core.core_peer_sets (name);
+
+CREATE TABLE IF NOT EXISTS feat.feat_peer_relative (
+    security_id INTEGER NOT NULL,
+    peer_set_id INTEGER NOT NULL,
+    as_of_date DATE NOT NULL,
+    peer_count INTEGER NOT NULL,
+    peer_median_24h NUMERIC, peer_median_7d NUMERIC, peer_median_mtd NUMERIC, peer_median_qtd NUMERIC, peer_median_ytd NUMERIC,
+    rel_return_24h NUMERIC, rel_return_7d NUMERIC, rel_return_mtd NUMERIC, rel_return_qtd NUMERIC, rel_return_ytd NUMERIC,
+    zscore_24h NUMERIC, zscore_7d NUMERIC, zscore_mtd NUMERIC, zscore_qtd NUMERIC, zscore_ytd NUMERIC,
+    PRIMARY KEY (security_id, peer_set_id, as_of_date)
+);
+
+CREATE INDEX IF NOT EXISTS feat_peer_relative_date_idx ON feat.feat_peer_relative (as_of_date, peer_set_id);
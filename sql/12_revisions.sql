@@ -0,0 +1,42 @@
+-- feat.feat_revisions keyed by estimate period, metric and window (jobs/feat_revisions.py). Safe for re-run.
+-- The original (security_id, as_of_date) key is replaced; the table was never populated under it.
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema='feat' AND table_name='feat_revisions' AND column_name='window_days') THEN
+    ALTER TABLE feat.feat_revisions
+        ADD COLUMN period_label TEXT NOT NULL DEFAULT '',
+        ADD COLUMN metric TEXT NOT NULL DEFAULT 'revenue',
+        ADD COLUMN window_days INTEGER NOT NULL DEFAULT 0,
+        ADD COLUMN estimate NUMERIC,
+        ADD COLUMN revisions_up INTEGER,
+        ADD COLUMN revisions_down INTEGER;
+    ALTER TABLE feat.feat_revisions DROP CONSTRAINT IF EXISTS feat_revisions_security_id_as_of_date_key;
+  END IF;
+END $$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS feat_revisions_key_idx
+    ON feat.feat_revisions (security_id, period_label, metric, window_days, as_of_date);
+
+-- Incremental runs find estimate snapshots written (inserted or updated) since the last watermark.
+-- updated_at is stamped by trigger with the row's write time, whatever the writer sets.
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema='core' AND table_name='core_estimates' AND column_name='updated_at') THEN
+    ALTER TABLE core.core_estimates ADD COLUMN updated_at TIMESTAMPTZ;
+    UPDATE core.core_estimates SET updated_at = created_at;
+    ALTER TABLE core.core_estimates ALTER COLUMN updated_at SET NOT NULL, ALTER COLUMN updated_at SET DEFAULT clock_timestamp();
+  END IF;
+END $$;
+
+CREATE OR REPLACE FUNCTION core.touch_updated_at() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at := clock_timestamp();
+  RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS core_estimates_touch ON core.core_estimates;
+CREATE TRIGGER core_estimates_touch BEFORE INSERT OR UPDATE ON core.core_estimates
+    FOR EACH ROW EXECUTE FUNCTION core.touch_updated_at();
+
+DROP INDEX IF EXISTS core.core_estimates_created_idx;
+CREATE INDEX IF NOT EXISTS core_estimates_updated_idx ON core.core_estimates (updated_at);
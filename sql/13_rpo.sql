@@ -0,0 +1,17 @@
+-- RPO extraction (jobs/feat_rpo.py) reads companyfacts payloads in place with JSONB path queries.
+-- Partial index: only versions that carry RPO facts, newest first per CIK (the job's DISTINCT ON order).
+-- The predicate must match RPO_FILTER in jobs/feat_rpo.py for the planner to use it.
+CREATE INDEX IF NOT EXISTS raw_sec_companyfacts_rpo_idx
+    ON raw.raw_sec_companyfacts (cik, asof_loaded_at DESC, id DESC)
+    WHERE payload @? '$.facts.*.RevenueRemainingPerformanceObligation';
+
+-- Provenance: filing date of the fact and the raw companyfacts row it came from
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema='feat' AND table_name='feat_rpo' AND column_name='filed') THEN
+    ALTER TABLE feat.feat_rpo ADD COLUMN filed DATE;
+  END IF;
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema='feat' AND table_name='feat_rpo' AND column_name='source_id') THEN
+    ALTER TABLE feat.feat_rpo ADD COLUMN source_id INTEGER;
+  END IF;
+END $$;
@@ -0,0 +1,31 @@
+-- Cross-sectional "what changed" scores (jobs/feat_scores.py): score + rank per security and date,
+-- each factor's contribution, and the precomputed top-K the app shows as biggest movers.
+CREATE TABLE IF NOT EXISTS feat.feat_scores (
+    security_id INTEGER NOT NULL,
+    as_of_date DATE NOT NULL,
+    score NUMERIC,
+    rank INTEGER,
+    top_factor TEXT,
+    PRIMARY KEY (security_id, as_of_date)
+);
+
+CREATE TABLE IF NOT EXISTS feat.feat_score_contributions (
+    security_id INTEGER NOT NULL,
+    as_of_date DATE NOT NULL,
+    factor TEXT NOT NULL,
+    value NUMERIC,          -- input after the factor's transform, before winsorizing
+    zscore NUMERIC,         -- winsorized z-score (0 when the input is missing)
+    contribution NUMERIC,   -- weight * zscore
+    PRIMARY KEY (security_id, as_of_date, factor)
+);
+
+CREATE TABLE IF NOT EXISTS feat.feat_top_movers (
+    as_of_date DATE NOT NULL,
+    rank INTEGER NOT NULL,
+    security_id INTEGER NOT NULL,
+    ticker TEXT,
+    score NUMERIC,
+    top_factor TEXT,
+    top_contribution NUMERIC,
+    PRIMARY KEY (as_of_date, rank)
+);
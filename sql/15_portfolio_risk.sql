@@ -0,0 +1,25 @@
+-- Portfolio risk (jobs/feat_portfolio_risk.py): VaR and expected shortfall of the book per method, horizon and
+-- confidence, as positive fractions of portfolio value, and each position's Euler contribution.
+CREATE TABLE IF NOT EXISTS feat.feat_portfolio_risk (
+    as_of_date DATE NOT NULL,
+    method TEXT NOT NULL,           -- monte_carlo | historical
+    horizon_days INTEGER NOT NULL,
+    confidence NUMERIC NOT NULL,
+    var NUMERIC,
+    es NUMERIC,
+    n_scenarios INTEGER,
+    n_positions INTEGER,
+    PRIMARY KEY (as_of_date, method, horizon_days, confidence)
+);
+
+CREATE TABLE IF NOT EXISTS feat.feat_portfolio_risk_components (
+    security_id INTEGER NOT NULL,
+    as_of_date DATE NOT NULL,
+    method TEXT NOT NULL,
+    horizon_days INTEGER NOT NULL,
+    confidence NUMERIC NOT NULL,
+    weight NUMERIC,
+    component_var NUMERIC,          -- sums to the portfolio VaR
+    component_es NUMERIC,           -- sums to the portfolio ES
+    PRIMARY KEY (as_of_date, method, horizon_days, confidence, security_id)
+);
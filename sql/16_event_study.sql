@@ -0,0 +1,38 @@
+-- Earnings event study (jobs/feat_event_study.py): per-event returns around each past earnings date and
+-- per-security move statistics used to pre-fill core_events_earnings.expected_move.
+CREATE TABLE IF NOT EXISTS feat.feat_event_returns (
+    event_id INTEGER NOT NULL,
+    event_window TEXT NOT NULL,
+    security_id INTEGER NOT NULL,
+    event_date DATE NOT NULL,
+    day0_date DATE,
+    return NUMERIC,
+    benchmark_return NUMERIC,
+    abnormal_return NUMERIC,            -- return - benchmark_return
+    PRIMARY KEY (event_id, event_window)
+);
+
+CREATE INDEX IF NOT EXISTS feat_event_returns_security_idx ON feat.feat_event_returns (security_id, event_window, event_date DESC);
+
+-- Statistics of |abnormal_return| over the most recent events, fractions
+CREATE TABLE IF NOT EXISTS feat.feat_event_moves (
+    security_id INTEGER NOT NULL,
+    event_window TEXT NOT NULL,
+    as_of_date DATE NOT NULL,
+    n_events INTEGER NOT NULL,
+    avg_abs_move NUMERIC,
+    p50_abs_move NUMERIC,
+    p75_abs_move NUMERIC,
+    p90_abs_move NUMERIC,
+    last_event_date DATE,
+    PRIMARY KEY (security_id, event_window)
+);
+
+-- manual = typed in the Earnings Control Room (never overwritten), event_study = pre-filled by the job
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema='core' AND table_name='core_events_earnings' AND column_name='expected_move_source') THEN
+    ALTER TABLE core.core_events_earnings ADD COLUMN expected_move_source TEXT;
+    UPDATE core.core_events_earnings SET expected_move_source = 'manual' WHERE expected_move IS NOT NULL;
+  END IF;
+END $$;
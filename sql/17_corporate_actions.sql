@@ -0,0 +1,52 @@
+-- Corporate actions (jobs/ingest_corporate_actions.py) and split / dividend adjusted prices.
+-- core_adjustment_factors holds, per security, the cumulative factor for each span between ex-dates:
+-- adjusted = close * factor for valid_from <= trade_date < valid_to (NULL valid_from = since the start).
+-- Dates on or after the latest ex-date have no row (factor 1).
+CREATE TABLE IF NOT EXISTS raw.raw_corporate_actions (
+    id SERIAL PRIMARY KEY,
+    provider TEXT NOT NULL DEFAULT 'simfin',
+    asof_loaded_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    source_hash TEXT,
+    ticker TEXT NOT NULL,
+    ex_date DATE NOT NULL,
+    action_type TEXT NOT NULL,          -- split | dividend
+    split_ratio NUMERIC,                -- new shares per old share (4 = 4-for-1, 0.1 = 1-for-10)
+    cash_amount NUMERIC,                -- dividend per share
+    UNIQUE (ticker, ex_date, action_type, source_hash)
+);
+
+CREATE TABLE IF NOT EXISTS core.core_corporate_actions (
+    id SERIAL PRIMARY KEY,
+    security_id INTEGER NOT NULL REFERENCES core.core_security_master(id),
+    ex_date DATE NOT NULL,
+    action_type TEXT NOT NULL,
+    split_ratio NUMERIC,
+    cash_amount NUMERIC,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    UNIQUE (security_id, ex_date, action_type)
+);
+
+CREATE TABLE IF NOT EXISTS core.core_adjustment_factors (
+    id SERIAL PRIMARY KEY,
+    security_id INTEGER NOT NULL,
+    valid_from DATE,
+    valid_to DATE NOT NULL,
+    factor NUMERIC NOT NULL,
+    UNIQUE (security_id, valid_to)
+);
+
+-- Cached adjusted close, kept in step with core_adjustment_factors; NULL = not adjusted (same as close)
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_schema='core' AND table_name='core_prices_daily' AND column_name='adj_close') THEN
+    ALTER TABLE core.core_prices_daily ADD COLUMN adj_close NUMERIC;
+  END IF;
+  -- Price readers now select COALESCE(adj_close, close): keep their scans index-only
+  IF to_regclass('core.core_prices_daily_security_date_cover') IS NOT NULL AND NOT EXISTS (
+      SELECT 1 FROM pg_index i JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+      WHERE i.indexrelid = 'core.core_prices_daily_security_date_cover'::regclass AND a.attname = 'adj_close') THEN
+    DROP INDEX core.core_prices_daily_security_date_cover;
+  END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS core_prices_daily_security_date_cover ON core.core_prices_daily (security_id, trade_date DESC) INCLUDE (close, adj_close);
@@ -0,0 +1,27 @@
+-- Data quality (jobs/dq_scan.py): current findings per check and row, and the quarantined rows that
+-- feature jobs leave out (models/quality.py). ref_date is the row's trade_date / period_end.
+CREATE TABLE IF NOT EXISTS ops.dq_findings (
+    id BIGSERIAL PRIMARY KEY,
+    run_id BIGINT,
+    check_name TEXT NOT NULL,
+    severity TEXT NOT NULL,             -- error | warn
+    table_name TEXT NOT NULL,
+    security_id INTEGER NOT NULL,
+    ref_date DATE NOT NULL,
+    value NUMERIC,
+    detail TEXT,
+    quarantined BOOLEAN NOT NULL DEFAULT FALSE,
+    found_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS dq_findings_table_date_idx ON ops.dq_findings (table_name, ref_date);
+CREATE INDEX IF NOT EXISTS dq_findings_check_idx ON ops.dq_findings (check_name, ref_date DESC);
+
+CREATE TABLE IF NOT EXISTS ops.dq_quarantine (
+    id BIGSERIAL PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    security_id INTEGER NOT NULL,
+    ref_date DATE NOT NULL,
+    check_name TEXT NOT NULL,
+    UNIQUE (table_name, security_id, ref_date)
+);
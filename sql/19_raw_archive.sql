@@ -0,0 +1,17 @@
+-- Archive manifest (jobs/compact_raw.py): one row per compressed file of superseded raw rows.
+-- Files are gzip JSON lines (one row_to_json per row) under <archive dir>/<table>/loaded=<date>/,
+-- loaded_date being the rows' asof_loaded_at date.
+CREATE TABLE IF NOT EXISTS ops.raw_archive (
+    id BIGSERIAL PRIMARY KEY,
+    run_id BIGINT,
+    table_name TEXT NOT NULL,
+    loaded_date DATE NOT NULL,
+    path TEXT NOT NULL UNIQUE,          -- relative to the archive dir
+    n_rows INTEGER NOT NULL,
+    min_id BIGINT NOT NULL,
+    max_id BIGINT NOT NULL,
+    sha256 TEXT NOT NULL,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS raw_archive_table_date_idx ON ops.raw_archive (table_name, loaded_date);
@@ -0,0 +1,32 @@
+-- Return attribution (jobs/feat_attribution.py), one row set per feat_returns date and period.
+-- Per position: contribution = weight * return (sums to feat_portfolio.return_<period>) and
+-- alpha_contribution = weight * (return - SPY return) (with the (cash) group, sums to alpha_vs_sp500_<period>).
+CREATE TABLE IF NOT EXISTS feat.feat_attribution_positions (
+    as_of_date DATE NOT NULL,
+    period TEXT NOT NULL,               -- 24h, 7d, mtd, qtd, ytd
+    security_id INTEGER NOT NULL,
+    weight NUMERIC,
+    return NUMERIC,
+    contribution NUMERIC,
+    alpha_contribution NUMERIC,
+    PRIMARY KEY (as_of_date, period, security_id)
+);
+
+-- Brinson-Fachler by grouping (sector, peer_set) against the equal-weighted universe:
+-- allocation + selection + interaction summed over a date / period / grouping = portfolio - benchmark return.
+CREATE TABLE IF NOT EXISTS feat.feat_attribution_groups (
+    as_of_date DATE NOT NULL,
+    period TEXT NOT NULL,
+    grouping TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    port_weight NUMERIC,
+    port_return NUMERIC,
+    bench_weight NUMERIC,
+    bench_return NUMERIC,
+    contribution NUMERIC,
+    alpha_contribution NUMERIC,
+    allocation NUMERIC,
+    selection NUMERIC,
+    interaction NUMERIC,
+    PRIMARY KEY (as_of_date, period, grouping, group_name)
+);
@@ -0,0 +1,71 @@
+-- Triage read model: one precomputed row per security for the Portfolio Monitor, built from the feature
+-- tables of the earlier files (returns, valuation, peer-relative, scores), so it runs last.
+-- Refreshed CONCURRENTLY by jobs/publish_dashboard.py after the feature jobs (and after earnings edits in
+-- the app), so page loads are a single scan of this view.
+-- This is the view's only definition. To change it, edit it here and bump the version in the check and the
+-- COMMENT below: a view built from another version is dropped and rebuilt once.
+DO $$
+BEGIN
+  IF to_regclass('feat.feat_triage') IS NOT NULL THEN
+    IF obj_description(to_regclass('feat.feat_triage'), 'pg_class') IS DISTINCT FROM 'triage v4' THEN
+      DROP MATERIALIZED VIEW feat.feat_triage;
+    END IF;
+  END IF;
+END $$;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS feat.feat_triage AS
+WITH latest AS (
+    SELECT (SELECT MAX(as_of_date) FROM feat.feat_returns) AS ret_date,
+           (SELECT MAX(as_of_date) FROM core.core_positions) AS pos_date,
+           (SELECT MAX(as_of_date) FROM feat.feat_valuation) AS val_date,
+           (SELECT MAX(as_of_date) FROM feat.feat_peer_relative) AS peer_date,
+           (SELECT MAX(as_of_date) FROM feat.feat_scores) AS score_date
+)
+SELECT m.id AS security_id,
+       m.ticker,
+       l.ret_date AS as_of_date,
+       COALESCE(p.weight, 0) AS weight,
+       r.return_24h, r.return_7d, r.return_mtd, r.return_qtd, r.return_ytd,
+       r.vol_spike_ratio, r.drawdown_52w, s.score AS what_changed_score,
+       e.earnings_dates,
+       COALESCE(v.pct_historical, 0) AS val_pct,
+       (rpo.security_id IS NOT NULL) AS has_rpo,
+       (est.security_id IS NOT NULL) AS has_estimates,
+       pr.peer_rel_7d,
+       pr.peer_z_7d,
+       s.top_factor
+FROM core.core_security_master m
+CROSS JOIN latest l
+LEFT JOIN core.core_positions p ON p.security_id = m.id AND p.as_of_date = l.pos_date
+LEFT JOIN feat.feat_returns r ON r.security_id = m.id AND r.as_of_date = l.ret_date
+-- Every earnings date from the as-of date on, ascending: the app picks the next one at query time, so an
+-- event that has passed since the last refresh is not shown as upcoming
+LEFT JOIN (
+    SELECT security_id, ARRAY_AGG(event_date ORDER BY event_date) AS earnings_dates
+    FROM core.core_events_earnings
+    WHERE event_date >= COALESCE((SELECT ret_date FROM latest), CURRENT_DATE)
+    GROUP BY security_id
+) e ON e.security_id = m.id
+LEFT JOIN feat.feat_valuation v ON v.security_id = m.id AND v.as_of_date = l.val_date
+LEFT JOIN (SELECT DISTINCT security_id FROM feat.feat_rpo) rpo ON rpo.security_id = m.id
+LEFT JOIN (SELECT DISTINCT security_id FROM core.core_estimates) est ON est.security_id = m.id
+LEFT JOIN (
+    SELECT security_id, AVG(rel_return_7d) AS peer_rel_7d, AVG(zscore_7d) AS peer_z_7d
+    FROM feat.feat_peer_relative
+    WHERE as_of_date = (SELECT peer_date FROM latest)
+    GROUP BY security_id
+) pr ON pr.security_id = m.id
+LEFT JOIN feat.feat_scores s ON s.security_id = m.id AND s.as_of_date = l.score_date
+WITH DATA;
+
+COMMENT ON MATERIALIZED VIEW feat.feat_triage IS 'triage v4';
+
+-- Required by REFRESH ... CONCURRENTLY
+CREATE UNIQUE INDEX IF NOT EXISTS feat_triage_security_idx ON feat.feat_triage (security_id);
+
+-- Monitor sort keys (app/data.py TRIAGE_SORTS): ORDER BY key DESC, security_id DESC LIMIT n with
+-- keyset pagination on (key, security_id) is a backward scan of one of these.
+CREATE INDEX IF NOT EXISTS feat_triage_what_changed_idx ON feat.feat_triage ((COALESCE(what_changed_score, 0)), security_id);
+CREATE INDEX IF NOT EXISTS feat_triage_dislocation_idx ON feat.feat_triage ((COALESCE(ABS(drawdown_52w), 0)), security_id);
+CREATE INDEX IF NOT EXISTS feat_triage_vol_spike_idx ON feat.feat_triage ((COALESCE(vol_spike_ratio, -1)), security_id);
+CREATE INDEX IF NOT EXISTS feat_triage_peer_z_idx ON feat.feat_triage ((COALESCE(ABS(peer_z_7d), 0)), security_id);
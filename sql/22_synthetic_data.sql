@@ -0,0 +1,7 @@
+-- Rows scripts/synthetic_data.py inserted outside the SYN* universe (benchmark closes filling gaps in a real
+-- series), so clear() deletes exactly those and leaves the real series alone.
+CREATE TABLE IF NOT EXISTS ops.synthetic_benchmark_prices (
+    benchmark_id INTEGER NOT NULL,
+    trade_date DATE NOT NULL,
+    PRIMARY KEY (benchmark_id, trade_date)
+);
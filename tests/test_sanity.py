@@ -31,6 +31,18 @@ def test_security_master_has_rows():
     assert n >= 0
     conn.close()
 
+def test_date_keyed_tables_partitioned():
+    from models.db import get_connection
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT c.oid::regclass::text, c.relkind FROM pg_class c
+        WHERE c.oid IN ('core.core_prices_daily'::regclass, 'raw.raw_prices_daily'::regclass, 'feat.feat_returns'::regclass)
+    """)
+    kinds = dict(cur.fetchall())
+    assert all(k == "p" for k in kinds.values()), kinds
+    conn.close()
+
 def test_ingest_simfin_runs():
     from jobs.ingest_simfin import job_ingest_simfin
     from config.tickers import DEFAULT_TICKERS
@@ -41,3 +53,310 @@ def test_feat_returns_runs():
     from jobs.feat_returns import job_feat_returns
     job_feat_returns()
     # No exception = pass
+
+def test_publish_dashboard_runs():
+    from jobs.publish_dashboard import job_publish_dashboard
+    job_publish_dashboard()
+    # No exception = pass
+
+def test_pipeline_dry_run():
+    from jobs.pipeline import run_pipeline, STAGES
+    result = run_pipeline(dry_run=True)
+    assert set(result) == set(STAGES)
+    assert "failed" not in result.values()
+
+def test_job_ledger_records_feat_returns():
+    from models.db import get_connection
+    from jobs.feat_returns import job_feat_returns
+    job_feat_returns()
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT id, status FROM ops.job_run WHERE job = 'feat_returns' ORDER BY id DESC LIMIT 1")
+    run_id, status = cur.fetchone()
+    assert status == "success"
+    cur.execute("SELECT stage FROM ops.job_stage WHERE run_id = %s", (run_id,))
+    assert {"security_returns", "benchmark_returns", "portfolio", "publish"} <= {r[0] for r in cur.fetchall()}
+    conn.close()
+
+def test_feat_peer_relative_runs():
+    from models.db import get_connection
+    from jobs.feat_peer_relative import job_feat_peer_relative
+    job_feat_peer_relative()
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM core.core_peer_sets")
+    assert cur.fetchone()[0] >= 1
+    # One row per membership with a return on the latest date, peer_count = the set's members with one
+    cur.execute("SELECT MAX(as_of_date) FROM feat.feat_returns WHERE as_of_date <= CURRENT_DATE")
+    latest = cur.fetchone()[0]
+    cur.execute("""
+        SELECT s.id, COUNT(DISTINCT r.security_id) FROM core.core_peer_sets s
+        CROSS JOIN LATERAL UNNEST(s.security_ids) AS m(security_id)
+        JOIN feat.feat_returns r ON r.security_id = m.security_id AND r.as_of_date = %s
+        GROUP BY s.id
+    """, (latest,))
+    expected = {sid: (n, n, n) for sid, n in cur.fetchall()}
+    cur.execute("""
+        SELECT peer_set_id, MIN(peer_count), MAX(peer_count), COUNT(*) FROM feat.feat_peer_relative
+        WHERE as_of_date = %s GROUP BY peer_set_id
+    """, (latest,))
+    assert {sid: tuple(r) for sid, *r in cur.fetchall()} == expected
+    conn.close()
+
+def test_feat_revisions_runs():
+    from jobs.feat_revisions import job_feat_revisions
+    job_feat_revisions(full=True)
+    # No exception = pass
+
+def test_feat_rpo_runs():
+    from jobs.feat_rpo import job_feat_rpo
+    job_feat_rpo(full=True)
+    # No exception = pass
+
+def test_feat_scores_runs():
+    from jobs.feat_scores import job_feat_scores
+    job_feat_scores()
+    # No exception = pass
+
+def test_price_cube_append():
+    from models import price_cube
+    from models.db import get_connection, database_identity
+    conn = get_connection()
+    version = price_cube.append(conn)
+    identity = database_identity(conn)
+    conn.close()
+    cube = price_cube.open_cube(identity)
+    if version is not None:
+        assert cube.version == version
+        assert cube.meta["database"] == identity
+        assert cube.close.shape == (len(cube.ids), len(cube.dates))
+
+def test_jobs_read_securities_missing_from_price_cube(tmp_path, monkeypatch):
+    from models import price_cube
+    from models.db import get_connection
+    from scripts.synthetic_data import populate, clear
+    from jobs.feat_returns import job_feat_returns
+    from jobs.feat_portfolio_risk import job_feat_portfolio_risk
+    conn = get_connection()
+    populate(conn, 6, 300)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT id FROM core.core_security_master WHERE ticker LIKE 'SYN%' ORDER BY id")
+        ids = [r[0] for r in cur.fetchall()]
+        cur.execute("SELECT MAX(trade_date) FROM core.core_prices_daily")
+        latest = cur.fetchone()[0]
+        # A cube current to the latest date but built before half the names were loaded
+        monkeypatch.setattr(price_cube, "CUBE_DIR", str(tmp_path))
+        load = price_cube._load
+
+        def load_first_half(c, since, security_ids):
+            df = load(c, since, security_ids)
+            return df[~df["security_id"].isin(ids[3:])]
+        monkeypatch.setattr(price_cube, "_load", load_first_half)
+        price_cube.append(conn)
+        cube = price_cube.open_cube()
+        assert cube.last_date == latest and (cube.rows(ids) >= 0).sum() == 3
+
+        job_feat_returns(latest)
+        cur.execute("SELECT COUNT(return_7d) FROM feat.feat_returns WHERE as_of_date = %s AND security_id = ANY(%s)", (latest, ids))
+        assert cur.fetchone()[0] == len(ids)
+        job_feat_portfolio_risk(as_of_date=latest, n_scenarios=20_000)
+        cur.execute("SELECT COUNT(DISTINCT security_id) FROM feat.feat_portfolio_risk_components WHERE as_of_date = %s AND security_id = ANY(%s)", (latest, ids))
+        assert cur.fetchone()[0] == len(ids)
+        conn.commit()
+    finally:
+        conn.rollback()
+        clear(conn)
+        conn.close()
+
+def test_feat_portfolio_risk_runs():
+    from jobs.feat_portfolio_risk import job_feat_portfolio_risk
+    job_feat_portfolio_risk(n_scenarios=20_000)
+    # No exception = pass
+
+def test_feat_event_study_runs():
+    from jobs.feat_event_study import job_feat_event_study
+    job_feat_event_study()
+    # No exception = pass
+
+def test_ingest_corporate_actions_runs():
+    from jobs.ingest_corporate_actions import job_ingest_corporate_actions
+    job_ingest_corporate_actions()
+    # No exception = pass
+
+def test_dq_scan_runs():
+    from jobs.dq_scan import job_dq_scan
+    job_dq_scan()
+    # No exception = pass
+
+def test_compact_raw_dry_run():
+    from jobs.compact_raw import job_compact_raw
+    archived = job_compact_raw(dry_run=True)
+    assert all(n >= 0 for n in archived.values())
+
+def test_stream_prices_replay_matches_feat_returns(tmp_path):
+    import asyncio
+    from datetime import date
+    from models.db import get_connection
+    from scripts.synthetic_data import populate, clear
+    from jobs.stream_prices import ReplaySource, run_stream, RETURN_COLUMNS, VOL_COLUMNS
+    from jobs.feat_returns import _price_series, returns_for_series, vol_and_drawdown
+    # A past session on a SYN universe of its own, so no real rows are written
+    session = date(2001, 6, 29)
+    conn = get_connection()
+    populate(conn, 3, 300, end=session)
+    try:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT m.id, m.ticker, p.close FROM core.core_security_master m
+            JOIN core.core_prices_daily p ON p.security_id = m.id AND p.trade_date = %s
+            WHERE m.ticker LIKE 'SYN%%' ORDER BY m.id
+        """, (session,))
+        closes = cur.fetchall()
+        assert len(closes) == 3
+        # A tick at each name's close for the session: the features feat_returns computes from that close
+        replay = tmp_path / "ticks.csv"
+        replay.write_text("ticker,price\n" + "".join(f"{t},{float(c)}\n" for _, t, c in closes) + "SYNXXXXX,1.0\n")
+        stats = asyncio.run(run_stream(ReplaySource(str(replay)), session=session))
+        assert stats["ticks"] == 4 and stats["unknown"] == 1 and stats["rows"] == 3
+        cols = RETURN_COLUMNS + VOL_COLUMNS
+        for sid, _, _ in closes:
+            series = _price_series(cur, sid, session, 400)
+            expected = {**returns_for_series(series, session), **vol_and_drawdown(series)}
+            cur.execute(f"SELECT {', '.join(cols)} FROM feat.feat_returns WHERE security_id = %s AND as_of_date = %s", (sid, session))
+            got = dict(zip(cols, cur.fetchone()))
+            for c in cols:
+                if expected[c] is None:
+                    assert got[c] is None, c
+                else:
+                    assert abs(float(got[c]) - expected[c]) < 1e-5, (c, got[c], expected[c])
+        conn.commit()
+    finally:
+        conn.rollback()
+        with conn.cursor() as cur:
+            for table in ("feat.feat_portfolio", "feat.feat_benchmark_returns"):
+                cur.execute(f"DELETE FROM {table} WHERE as_of_date = %s", (session,))
+        conn.commit()
+        clear(conn)
+        conn.close()
+
+def test_feat_attribution_runs():
+    from jobs.feat_attribution import job_feat_attribution
+    job_feat_attribution()
+    # No exception = pass
+
+def test_snapshot_without_upcoming_earnings(tmp_path, monkeypatch):
+    from datetime import date
+    import pandas as pd
+    from models import snapshot as snap
+    from app.data import triage_page_from_snapshot
+    monkeypatch.setattr(snap, "SNAPSHOT_DIR", str(tmp_path))
+    triage = pd.DataFrame({
+        "security_id": [1, 2], "ticker": ["AAA", "BBB"], "as_of_date": [date(2024, 1, 2)] * 2, "weight": [0.1, 0.02],
+        "return_24h": [0.01, -0.02], "return_7d": [0.03, 0.01], "return_mtd": [0.0, 0.0], "return_qtd": [0.0, 0.0],
+        "return_ytd": [0.0, 0.0], "vol_spike_ratio": [1.2, 0.8], "drawdown_52w": [-0.1, -0.3], "what_changed_score": [2.0, 1.0],
+        "earnings_dates": [None, None], "val_pct": [0.5, 0.5], "has_rpo": [False, True], "has_estimates": [True, False],
+        "peer_rel_7d": [None, None], "peer_z_7d": [None, None], "top_factor": ["ret_7d", "vol_spike"],
+    })
+    frames = {"kpis": pd.DataFrame(columns=snap.KPI_COLUMNS), "triage": triage,
+              "calendar": pd.DataFrame(columns=snap.CALENDAR_COLUMNS), "top_movers": pd.DataFrame(columns=snap.TOP_MOVER_COLUMNS)}
+    snap.write_frames(frames, 1, "test")
+    tables = snap.open_snapshot(1, "test")
+    assert str(tables["triage"].schema.field("earnings_dates").type) == "list<item: date32[day]>"
+    page = triage_page_from_snapshot(tables["triage"], "what_changed", False, False, 10)
+    assert list(page["Ticker"]) == ["AAA", "BBB"] and page["Next earnings"].isna().all()
+    assert triage_page_from_snapshot(tables["triage"], "what_changed", True, False, 10).empty
+
+def test_portfolio_risk_components_add_up():
+    import numpy as np
+    from jobs.feat_portfolio_risk import tail_risk, monte_carlo, historical
+    rng = np.random.default_rng(7)
+    returns = rng.normal(0.0, 0.01, (250, 5)) + rng.normal(0.0, 0.01, (250, 1))
+    weights = np.array([0.3, 0.25, 0.2, 0.15, 0.1])
+    prices = 100.0 * np.cumprod(1.0 + returns, axis=0)
+    confidences = [0.95, 0.99]
+    mc = monte_carlo(returns, weights, n=20_000, chunk=3_000, seed=11, confidences=confidences)
+    hist = historical(prices, weights, 5, confidences=confidences)
+    for out in (mc, hist):
+        for c, (var, es, comp_var, comp_es) in out.items():
+            assert var > 0 and es >= var
+            assert np.isclose(comp_var.sum(), var) and np.isclose(comp_es.sum(), es)
+    # ES is the mean loss at or beyond VaR, whichever way the scenarios are blocked
+    pnl = (prices[5:] / prices[:-5] - 1.0) @ weights
+    scenarios = prices[5:] / prices[:-5] - 1.0
+    blocks = [(0, 100, lambda sel: scenarios[:100][sel] * weights), (100, len(pnl), lambda sel: scenarios[100:][sel] * weights)]
+    for c, (var, es, comp_var, comp_es) in tail_risk(pnl, blocks, confidences).items():
+        assert np.isclose(var, -np.quantile(pnl, 1 - c))
+        assert np.isclose(es, -pnl[pnl <= -var].mean())
+        assert np.allclose(comp_es, hist[c][3]) and np.isclose(comp_var.sum(), var)
+
+def test_attribution_effects_add_up():
+    import numpy as np
+    from jobs.feat_attribution import membership, position_attribution, group_attribution
+    rng = np.random.default_rng(3)
+    ids = np.array([11, 12, 13, 14, 15, 16])
+    # Overlapping groups, one name in none (-> other); the last date holds 10% cash
+    member, names = membership(ids, {11: ["tech"], 12: ["tech", "semis"], 13: ["semis"], 14: ["energy"], 15: ["energy"]})
+    assert np.allclose(member.sum(axis=1), 1.0) and len(names) == 4
+    weights = np.array([[0.3, 0.2, 0.1, 0.2, 0.1, 0.1], [0.0, 0.4, 0.2, 0.2, 0.2, 0.0], [0.2, 0.2, 0.2, 0.1, 0.1, 0.1]])
+    weights[2] *= 0.9
+    returns = rng.normal(0.0, 0.03, (2, 3, 6))
+    returns[0, 1, 1] = returns[1, 2, 4] = np.nan
+    bench = rng.normal(0.0, 0.02, (2, 3))
+    pos = position_attribution(weights, returns, bench)
+    grp = group_attribution(weights, returns, bench, member)
+    portfolio = np.nansum(weights * returns, axis=-1)
+    assert np.allclose(np.nansum(pos["contribution"], axis=-1), portfolio)
+    assert np.allclose(grp["contribution"].sum(axis=-1), portfolio)
+    assert np.allclose(grp["alpha_contribution"].sum(axis=-1), portfolio - bench)
+    assert np.allclose(grp["port_weight"].sum(axis=-1), 1.0) and np.allclose(grp["bench_weight"].sum(axis=-1), 1.0)
+    effects = grp["allocation"] + grp["selection"] + grp["interaction"]
+    assert np.allclose(effects.sum(axis=-1), portfolio - np.nanmean(returns, axis=-1))
+
+def test_score_frame_winsorizes_and_earnings_never_lowers():
+    import numpy as np
+    import pandas as pd
+    from jobs.feat_scores import score_frame
+    rng = np.random.default_rng(5)
+    n = 200
+    inputs = pd.DataFrame({
+        "security_id": np.arange(1, n + 1), "return_24h": rng.normal(0, 0.02, n), "return_7d": rng.normal(0, 0.05, n),
+        "vol_spike_ratio": rng.lognormal(0, 0.3, n), "drawdown_52w": -rng.uniform(0, 0.5, n), "peer_z_7d": rng.normal(0, 1, n),
+        "revision_30d": rng.normal(0, 0.02, n), "days_to_earnings": np.where(np.arange(n) % 2 == 0, rng.integers(0, 60, n), np.nan),
+    })
+    inputs.loc[0, "return_7d"] = 5.0
+    values, z, contrib = score_frame(inputs)
+    # The outlier is clipped: making it ten times larger changes no z-score
+    bigger = inputs.copy()
+    bigger.loc[0, "return_7d"] = 50.0
+    assert np.allclose(score_frame(bigger)[1], z)
+    assert values.loc[1, "move_7d"] == 5.0 and z.loc[1, "move_7d"] < 5.0
+    assert np.isclose(z.loc[1, "move_7d"], z["move_7d"].max())
+    # An upcoming event never lowers a score; one beyond the horizon counts as none
+    sid = 2
+    scores = {}
+    for days in (np.nan, 45, 20, 5, 0):
+        x = inputs.copy()
+        x.loc[x["security_id"] == sid, "days_to_earnings"] = days
+        scores[days] = score_frame(x)[2].sum(axis=1)[sid]
+    assert np.isclose(scores[45], scores[np.nan])
+    assert scores[np.nan] <= scores[20] <= scores[5] <= scores[0]
+
+def test_peer_relative_overlapping_memberships():
+    import numpy as np
+    import pandas as pd
+    from jobs.feat_peer_relative import peer_relative, PERIODS, MIN_PEERS
+    # Security 3 sits in both sets; set 2 has too few names with a return for z-scores
+    members = pd.DataFrame({"peer_set_id": [1, 1, 1, 1, 2, 2, 2, 1], "security_id": [1, 2, 3, 4, 3, 5, 6, 1]})
+    returns = pd.DataFrame({"security_id": [1, 2, 3, 4, 5]})
+    for i, p in enumerate(PERIODS):
+        returns[f"return_{p}"] = [0.01 * (i + 1), -0.02, 0.03, 0.05, 0.04]
+    out = peer_relative(members, returns).set_index(["peer_set_id", "security_id"]).sort_index()
+    assert list(out.index) == [(1, 1), (1, 2), (1, 3), (1, 4), (2, 3), (2, 5)]
+    assert (out.loc[1, "peer_count"] == 4).all() and (out.loc[2, "peer_count"] == 2).all() and MIN_PEERS > 2
+    r1 = returns.set_index("security_id")["return_7d"].loc[[1, 2, 3, 4]]
+    assert np.isclose(out.loc[(1, 3), "peer_median_7d"], r1.median())
+    assert np.isclose(out.loc[(1, 3), "rel_return_7d"], 0.03 - r1.median())
+    assert np.isclose(out.loc[(1, 3), "zscore_7d"], (0.03 - r1.mean()) / r1.std())
+    assert np.isclose(out.loc[(2, 3), "rel_return_7d"], 0.03 - 0.035)
+    assert out.loc[2, [f"zscore_{p}" for p in PERIODS]].isna().all().all()